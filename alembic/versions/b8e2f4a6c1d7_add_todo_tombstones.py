@@ -0,0 +1,51 @@
+"""add todo tombstones
+
+Revision ID: b8e2f4a6c1d7
+Revises: a3d5c8e1f7b9
+Create Date: 2026-10-17 20:12:09.684213
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b8e2f4a6c1d7"
+down_revision: Union[str, None] = "a3d5c8e1f7b9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "todo_tombstones",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("todo_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_todo_tombstones_deleted_at"),
+        "todo_tombstones",
+        ["deleted_at"],
+        unique=False,
+    )
+    # The updated todos of the feed are read through ix_todos_user_id_updated_at_id
+    op.create_index(
+        "ix_todo_tombstones_user_id_deleted_at_todo_id",
+        "todo_tombstones",
+        ["user_id", "deleted_at", "todo_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_todo_tombstones_user_id_deleted_at_todo_id", table_name="todo_tombstones"
+    )
+    op.drop_index(op.f("ix_todo_tombstones_deleted_at"), table_name="todo_tombstones")
+    op.drop_table("todo_tombstones")
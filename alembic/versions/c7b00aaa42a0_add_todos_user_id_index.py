@@ -0,0 +1,47 @@
+"""add todos user_id index and drop duplicate title index
+
+Revision ID: c7b00aaa42a0
+Revises: 562f8281d2ff
+Create Date: 2026-10-17 09:12:44.318207
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c7b00aaa42a0"
+down_revision: Union[str, None] = "562f8281d2ff"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Indexes are built/dropped concurrently so that large todos tables stay
+    # writable; on PostgreSQL this cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_todos_user_id_id",
+            "todos",
+            ["user_id", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        # ix_todo_title duplicates ix_todos_title (both on todos.title).
+        op.drop_index("ix_todo_title", table_name="todos", postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_todo_title",
+            "todos",
+            ["title"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_todos_user_id_id", table_name="todos", postgresql_concurrently=True
+        )
@@ -0,0 +1,60 @@
+"""add todos filter, sort and title search indexes
+
+Revision ID: e4a1f6b2c9d3
+Revises: c7b00aaa42a0
+Create Date: 2026-10-17 15:40:12.503128
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e4a1f6b2c9d3"
+down_revision: Union[str, None] = "c7b00aaa42a0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The todo list of a user filtered by done / sorted by a timestamp, id breaking the ties
+INDEXES = {
+    "ix_todos_user_id_done_id": ["user_id", "done", "id"],
+    "ix_todos_user_id_created_at_id": ["user_id", "created_at", "id"],
+    "ix_todos_user_id_updated_at_id": ["user_id", "updated_at", "id"],
+}
+
+
+def upgrade() -> None:
+    is_postgresql = op.get_bind().dialect.name == "postgresql"
+    if is_postgresql:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Indexes are built concurrently so that large todos tables stay writable; on
+    # PostgreSQL this cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.create_index(
+                name, "todos", columns, unique=False, postgresql_concurrently=True
+            )
+        # Case-insensitive title searches (ILIKE 'prefix%' and ILIKE '%part%');
+        # SQLite scans the todos of the user instead.
+        if is_postgresql:
+            op.create_index(
+                "ix_todos_title_trgm",
+                "todos",
+                ["title"],
+                unique=False,
+                postgresql_using="gin",
+                postgresql_ops={"title": "gin_trgm_ops"},
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        if op.get_bind().dialect.name == "postgresql":
+            op.drop_index(
+                "ix_todos_title_trgm", table_name="todos", postgresql_concurrently=True
+            )
+        for name in reversed(INDEXES):
+            op.drop_index(name, table_name="todos", postgresql_concurrently=True)
@@ -6,21 +6,39 @@ Modules:
     contextlib: Provides utilities for working with context managers.
     fastapi: FastAPI framework for building APIs.
     anyio: Provides asynchronous I/O capabilities.
+    app.middleware.admission: Admission control (load shedding) middleware.
+    app.middleware.compression: Response compression middleware.
     app.middleware.logger: Custom logging middleware.
+    app.middleware.metrics: Request metrics middleware.
     .utils.headers: Utility for injecting default headers.
     .core.config: Configuration settings for the application.
+    .core.server: Graceful shutdown of the server.
+    .database.config: Database engine, closed on shutdown.
+    .database.maintenance: Sweep of the expired idempotency keys and tombstones.
     .api: API routes.
     .utils.logger: Logger utility.
 """
 
+import asyncio
+import functools
 from contextlib import asynccontextmanager
+from datetime import timedelta
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from anyio import to_thread
+from app.middleware.admission import AdmissionMiddleware
+from app.middleware.compression import CompressionMiddleware
 from app.middleware.logger import LogMiddleware
+from app.middleware.metrics import MetricsMiddleware
 from .utils.headers import default_headers_injection
 from .core.config import get_app_config
+from .core.server import install_drain_handler
+from .database.config import MAX_OVERFLOW, POOL_SIZE, SessionLocal, engine, replicas
+from .database.maintenance import sweep_periodically
 from .api import router
+from .api.todos.services import delete_expired_tombstones
+from .api.metrics import api as metrics
+from .utils.dependencies import idempotency
 from .utils.logger import logger
 
 # Load application configuration
@@ -49,11 +67,44 @@ async def lifespan(_: FastAPI):
     limiter = to_thread.current_default_thread_limiter()
     limiter.total_tokens = 1000
 
+    # Keep serving for a while after SIGTERM, until the load balancer saw us leave
+    install_drain_handler(app_config.APP_DRAIN_SECONDS_)
+
+    # Delete the expired idempotency keys and tombstones in the background
+    sweepers = [
+        asyncio.create_task(
+            sweep_periodically(
+                idempotency.sweep,
+                SessionLocal,
+                app_config.IDEMPOTENCY_SWEEP_INTERVAL_SECONDS_,
+                "idempotency keys",
+            )
+        ),
+        asyncio.create_task(
+            sweep_periodically(
+                functools.partial(
+                    delete_expired_tombstones,
+                    retention=timedelta(days=app_config.CHANGES_RETENTION_DAYS_),
+                ),
+                SessionLocal,
+                app_config.CHANGES_SWEEP_INTERVAL_SECONDS_,
+                "todo tombstones",
+            )
+        ),
+    ]
+
     # Yield control back to FastAPI
     yield
 
     # Shutdown code
     logger.info("Shutting down...")
+    for sweeper in sweepers:
+        sweeper.cancel()
+    # Let the sweepers unwind and release their sessions before the engines close
+    await asyncio.gather(*sweepers, return_exceptions=True)
+    await engine.dispose()
+    if replicas is not None:
+        await replicas.dispose()
 
 
 def create_app() -> FastAPI:
@@ -78,6 +129,33 @@ def create_app() -> FastAPI:
         dependencies=[Depends(default_headers_injection)],
     )
 
+    # Compress the responses with the encoding accepted by the client
+    if app_config.COMPRESSION_ENABLED_:
+        app.add_middleware(
+            CompressionMiddleware,
+            encodings=app_config.COMPRESSION_ENCODINGS_,
+            minimum_size=app_config.COMPRESSION_MINIMUM_SIZE_,
+            levels=app_config.COMPRESSION_LEVELS_,
+            cache_max_bytes=app_config.COMPRESSION_CACHE_MAX_BYTES_,
+        )
+
+    # Shed the requests above the adaptive concurrency limits (innermost, so the
+    # rejections are logged, counted and get the CORS headers)
+    if app_config.ADMISSION_ENABLED_:
+        app.add_middleware(
+            AdmissionMiddleware,
+            min_limit=app_config.ADMISSION_MIN_LIMIT_,
+            max_limit=app_config.ADMISSION_MAX_LIMIT_
+            or POOL_SIZE + max(MAX_OVERFLOW, 0),
+            latency_target=app_config.ADMISSION_LATENCY_TARGET_MS_ / 1000,
+            retry_after=app_config.ADMISSION_RETRY_AFTER_SECONDS_,
+            exempt_paths=(
+                f"{API_PREFIX}/{app_config.API_VERSION_}/health",
+                metrics.ENDPOINT,
+            ),
+            routes=app.routes,
+        )
+
     # Add CORS middleware
     app.add_middleware(
         CORSMiddleware,
@@ -88,6 +166,15 @@ def create_app() -> FastAPI:
     )
 
     # Add custom logging middleware
-    app.add_middleware(LogMiddleware)
+    app.add_middleware(
+        LogMiddleware,
+        sample_rate=app_config.LOG_SAMPLE_RATE_,
+        server_timing=app_config.LOG_SERVER_TIMING_,
+    )
+
+    # Expose the metrics (outermost middleware, so the duration covers the others)
+    if app_config.METRICS_ENABLED_:
+        app.include_router(router=metrics.router, tags=["Metrics"])
+        app.add_middleware(MetricsMiddleware)
 
     return app
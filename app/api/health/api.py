@@ -1,10 +1,53 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Response, status
+
+from app.core.config import get_app_config
+from app.core.server import draining
+from app.database.config import MAX_OVERFLOW, POOL_SIZE, engine
+from .services import ReadinessProbe
+
+app_config = get_app_config()
 
 router = APIRouter()
 
 ENDPOINT = "/health"
+LIVENESS_ENDPOINT = "/health/live"
+READINESS_ENDPOINT = "/health/ready"
+
+readiness_probe = ReadinessProbe(
+    engine,
+    max_connections=POOL_SIZE + MAX_OVERFLOW if MAX_OVERFLOW >= 0 else None,
+    ttl=app_config.HEALTH_CACHE_TTL_SECONDS_,
+    timeout=app_config.HEALTH_DB_TIMEOUT_SECONDS_,
+    max_pool_usage=app_config.HEALTH_MAX_POOL_USAGE_,
+)
+
+
+def get_readiness_probe() -> ReadinessProbe:
+    return readiness_probe
 
 
-@router.get(ENDPOINT, response_model=dict, summary="Application Health Check")
+@router.get(ENDPOINT, response_model=str, summary="Application Health Check")
 async def application_healthcheck() -> str:
+    # Legacy body, kept for the existing checks: same semantics as the liveness
     return "Healthy"
+
+
+@router.get(LIVENESS_ENDPOINT, response_model=dict, summary="Application Liveness")
+async def application_liveness() -> dict:
+    # The process is able to answer: no dependency is checked here, so a database
+    # outage does not get every instance restarted.
+    return {"status": "ok"}
+
+
+@router.get(READINESS_ENDPOINT, response_model=dict, summary="Application Readiness")
+async def application_readiness(
+    response: Response, probe: ReadinessProbe = Depends(get_readiness_probe)
+) -> dict:
+    if draining.is_set():
+        # Shutting down: tell the load balancer to stop sending requests here
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "draining"}
+    result = await probe.check()
+    if result["status"] != "ready":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return result
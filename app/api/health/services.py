@@ -0,0 +1,121 @@
+"""This module contains the readiness probe of the application."""
+
+import asyncio
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from alembic.config import Config as AlembicConfig
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.utils.logger import logger
+
+ROOT = Path(__file__).resolve().parents[3]
+
+
+@lru_cache()
+def migration_heads() -> tuple:
+    """The head revisions of the Alembic migrations shipped with the application."""
+    alembic_config = AlembicConfig(str(ROOT / "alembic.ini"))
+    alembic_config.set_main_option("script_location", str(ROOT / "alembic"))
+    return tuple(sorted(ScriptDirectory.from_config(alembic_config).get_heads()))
+
+
+def _current_heads(connection) -> tuple:
+    return tuple(sorted(MigrationContext.configure(connection).get_current_heads()))
+
+
+class ReadinessProbe:
+    """
+    Checks that the application can serve requests.
+
+    The checks are, in order:
+        - pool: less than `max_pool_usage` of the pool connections are checked out.
+        - database: a `SELECT 1` on a pool connection answers within `timeout` seconds.
+        - migrations: the database is at the head revision of the migrations.
+
+    The result is cached for `ttl` seconds and concurrent probes wait for the same
+    run, so frequent probes from many instances do not add load on the database.
+
+    Args:
+        engine: The engine whose pool and database are checked.
+        max_connections: Connections the pool can open (size plus overflow); None
+            when unlimited, which disables the pool check.
+        ttl: How long a result is reused, in seconds.
+        timeout: Maximum duration of the database checks, in seconds.
+        max_pool_usage: Fraction of `max_connections` checked out above which the
+            application is not ready.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        max_connections: Optional[int],
+        ttl: float = 2.0,
+        timeout: float = 1.0,
+        max_pool_usage: float = 0.9,
+    ) -> None:
+        self.engine = engine
+        self.max_connections = max_connections
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_pool_usage = max_pool_usage
+        self._result = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def check(self) -> dict:
+        if time.monotonic() < self._expires_at:
+            return self._result
+        async with self._lock:
+            if time.monotonic() >= self._expires_at:
+                self._result = await self._run_checks()
+                self._expires_at = time.monotonic() + self.ttl
+        return self._result
+
+    async def _run_checks(self) -> dict:
+        checks = {"pool": self._check_pool()}
+        if checks["pool"]["status"] == "ok":
+            checks.update(await self._check_database())
+        ready = all(check["status"] == "ok" for check in checks.values())
+        return {"status": "ready" if ready else "not ready", "checks": checks}
+
+    def _check_pool(self) -> dict:
+        checked_out = self.engine.pool.checkedout()
+        if self.max_connections is None:
+            return {"status": "ok", "checked_out": checked_out}
+        usage = checked_out / self.max_connections
+        return {
+            "status": "ok" if usage < self.max_pool_usage else "saturated",
+            "checked_out": checked_out,
+            "max_connections": self.max_connections,
+        }
+
+    async def _check_database(self) -> dict:
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.timeout):
+                async with self.engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+                    duration_ms = round((time.perf_counter() - start) * 1000, 3)
+                    current = await connection.run_sync(_current_heads)
+        except TimeoutError:
+            return {"database": {"status": "timeout", "timeout_s": self.timeout}}
+        except Exception as e:
+            # The error message may contain connection details, so it is only logged
+            logger.error("Readiness database check failed", exc_info=True)
+            return {"database": {"status": "error", "detail": type(e).__name__}}
+
+        head = migration_heads()
+        return {
+            "database": {"status": "ok", "duration_ms": duration_ms},
+            "migrations": {
+                "status": "ok" if current == head else "outdated",
+                "current": list(current),
+                "head": list(head),
+            },
+        }
@@ -0,0 +1,31 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.database.config import engine
+from app.utils.dependencies import cache
+from app.utils.logger import handler
+from app.utils.metrics import (
+    REGISTRY,
+    cache_collector,
+    log_queue_collector,
+    pool_collector,
+    thread_limiter_collector,
+)
+
+router = APIRouter()
+
+ENDPOINT = "/metrics"
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY.add_collector(pool_collector(engine.pool))
+REGISTRY.add_collector(thread_limiter_collector)
+REGISTRY.add_collector(log_queue_collector(handler))
+if cache is not None:
+    REGISTRY.add_collector(cache_collector(cache))
+
+
+@router.get(ENDPOINT, response_class=PlainTextResponse, summary="Application Metrics")
+async def application_metrics() -> PlainTextResponse:
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -1,60 +1,257 @@
-from typing import List
+from datetime import datetime, timedelta
+from typing import Callable, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
 
-from .schemas import Todo, TodoCreate, TodoUpdate
+from .schemas import (
+    DEFAULT_CHANGES_LIMIT,
+    DEFAULT_STATS_DAYS,
+    MAX_CHANGES_LIMIT,
+    GlobalTodoStats,
+    Todo,
+    TodoBatchCreate,
+    TodoBatchDelete,
+    TodoBatchResult,
+    TodoBatchUpdate,
+    TodoChanges,
+    TodoCreate,
+    TodoFilters,
+    TodoSort,
+    TodoStats,
+    TodoUpdate,
+)
 from .services import TodoService
-from app.utils.dependencies import get_db
-from sqlalchemy.orm import Session
+from app.core.config import get_app_config
+from app.database.idempotency import Idempotent
+from app.utils.cache import CacheBackend
+from app.utils.dependencies import (
+    get_cache,
+    get_coalesce,
+    get_db,
+    get_idempotency,
+    get_pinned,
+    get_read_db,
+    get_read_sessionmaker,
+    get_stats_cache,
+)
+from app.utils.etag import check_etag, resources_etag
+from app.utils.export import MEDIA_TYPES, ExportFormat
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, Page
+from app.utils.responses import (
+    ClosingStreamingResponse,
+    dependency_headers,
+    model_response,
+)
+from app.utils.singleflight import Coalesce
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 router = APIRouter()
+app_config = get_app_config()
 
 
-def get_todo_service(db: Session = Depends(get_db)) -> TodoService:
-    return TodoService(db)
+async def get_todo_service(
+    db: AsyncSession = Depends(get_db),
+    cache: Optional[CacheBackend] = Depends(get_cache),
+    read_db: AsyncSession = Depends(get_read_db),
+    pinned: bool = Depends(get_pinned),
+    stats_cache: CacheBackend = Depends(get_stats_cache),
+) -> TodoService:
+    return TodoService(db, cache, read_db, pinned, stats_cache)
+
+
+async def get_todo_filters(
+    done: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    updated_after: Optional[datetime] = None,
+    updated_before: Optional[datetime] = None,
+    title_prefix: Optional[str] = Query(None, min_length=1, max_length=100),
+    search: Optional[str] = Query(None, min_length=1, max_length=100),
+    sort: TodoSort = TodoSort.ID,
+) -> TodoFilters:
+    return TodoFilters(
+        done=done,
+        created_after=created_after,
+        created_before=created_before,
+        updated_after=updated_after,
+        updated_before=updated_before,
+        title_prefix=title_prefix,
+        search=search,
+        sort=sort,
+    )
 
 
 @router.post("/users/{user_id}/todos", response_model=Todo)
-def create_todo(
+async def create_todo(
     user_id: int,
     todo: TodoCreate,
+    response: Response,
+    todo_service: TodoService = Depends(get_todo_service),
+    idempotent: Idempotent = Depends(get_idempotency),
+) -> Response:
+    async def create() -> Response:
+        created_todo = await todo_service.create_todo(todo, user_id)
+        return model_response(created_todo, response)
+
+    return await idempotent(create)
+
+
+@router.post("/users/{user_id}/todos:batch", response_model=TodoBatchResult)
+async def create_todos(
+    user_id: int,
+    batch: TodoBatchCreate,
+    response: Response,
+    todo_service: TodoService = Depends(get_todo_service),
+    idempotent: Idempotent = Depends(get_idempotency),
+) -> Response:
+    """
+    Creates all the todos of the batch, or none of them: an item the database
+    rejects fails the whole batch with a 400.
+    """
+
+    async def create() -> Response:
+        created_todos = await todo_service.create_todos(batch, user_id)
+        return model_response(created_todos, response)
+
+    return await idempotent(create)
+
+
+@router.patch("/users/{user_id}/todos:batch", response_model=TodoBatchResult)
+async def update_todos(
+    user_id: int,
+    batch: TodoBatchUpdate,
+    response: Response,
+    todo_service: TodoService = Depends(get_todo_service),
+) -> Response:
+    updated_todos = await todo_service.update_todos(batch, user_id)
+    return model_response(updated_todos, response)
+
+
+@router.delete("/users/{user_id}/todos:batch", response_model=TodoBatchResult)
+async def delete_todos(
+    user_id: int,
+    batch: TodoBatchDelete,
+    response: Response,
+    todo_service: TodoService = Depends(get_todo_service),
+) -> Response:
+    deleted_todos = await todo_service.delete_todos(batch, user_id)
+    return model_response(deleted_todos, response)
+
+
+@router.get("/users/{user_id}/todos", response_model=Page[Todo])
+async def get_todos(
+    user_id: int,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    filters: TodoFilters = Depends(get_todo_filters),
+    todo_service: TodoService = Depends(get_todo_service),
+    coalesce: Coalesce = Depends(get_coalesce),
+) -> Response:
+    flight = await coalesce(
+        lambda: todo_service.get_todo_by_user_id(user_id, cursor, limit, filters)
+    )
+    todos = flight.value
+    check_etag(request, response, resources_etag(todos.items, todos.next_cursor))
+    # Rendered after the ETag check: a 304 skips the serialization
+    return model_response(flight.body, response)
+
+
+@router.get("/users/{user_id}/todos:export", response_class=ClosingStreamingResponse)
+async def export_todos(
+    user_id: int,
+    response: Response,
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    todo_service: TodoService = Depends(get_todo_service),
+    sessions: Callable[[], AsyncSession] = Depends(get_read_sessionmaker),
+) -> ClosingStreamingResponse:
+    filename = f"todos-{user_id}.{export_format.value}"
+    export = ClosingStreamingResponse(
+        todo_service.export_todos(user_id, export_format, sessions),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+    export.raw_headers.extend(dependency_headers(response))
+    return export
+
+
+# Declared before /users/{user_id}/todos/{todo_id}, which would match it as well
+@router.get("/users/{user_id}/todos/stats", response_model=TodoStats)
+async def get_todo_stats(
+    user_id: int,
+    response: Response,
+    days: int = Query(DEFAULT_STATS_DAYS, ge=1, le=365),
+    todo_service: TodoService = Depends(get_todo_service),
+    coalesce: Coalesce = Depends(get_coalesce),
+) -> Response:
+    flight = await coalesce(lambda: todo_service.get_todo_stats(user_id, days))
+    return model_response(flight.body, response)
+
+
+# Declared before /users/{user_id}/todos/{todo_id} as well
+@router.get("/users/{user_id}/todos/changes", response_model=TodoChanges)
+async def get_todo_changes(
+    user_id: int,
+    response: Response,
+    since: Optional[str] = None,
+    limit: int = Query(DEFAULT_CHANGES_LIMIT, ge=1, le=MAX_CHANGES_LIMIT),
     todo_service: TodoService = Depends(get_todo_service),
-) -> Todo:
-    created_todo = todo_service.create_todo(todo, user_id)
-    return created_todo
+) -> Response:
+    changes = await todo_service.get_todo_changes(
+        user_id,
+        since,
+        limit,
+        app_config.CHANGES_SETTLE_SECONDS_,
+        timedelta(days=app_config.CHANGES_RETENTION_DAYS_),
+    )
+    return model_response(changes, response)
 
 
-@router.get("/users/{user_id}/todos", response_model=List[Todo])
-def get_todos(
-    user_id: int, todo_service: TodoService = Depends(get_todo_service)
-) -> List[Todo]:
-    todos = todo_service.get_todo_by_user_id(user_id)
-    return todos
+@router.get("/todos/stats", response_model=GlobalTodoStats)
+async def get_global_todo_stats(
+    response: Response,
+    days: int = Query(DEFAULT_STATS_DAYS, ge=1, le=365),
+    todo_service: TodoService = Depends(get_todo_service),
+    coalesce: Coalesce = Depends(get_coalesce),
+) -> Response:
+    flight = await coalesce(lambda: todo_service.get_global_todo_stats(days))
+    return model_response(flight.body, response)
 
 
 @router.get("/users/{user_id}/todos/{todo_id}", response_model=Todo)
-def get_todo_by_id(
-    user_id: int, todo_id: int, todo_service: TodoService = Depends(get_todo_service)
-) -> Todo:
-    todo = todo_service.get_todo_by_id(todo_id, user_id)
-    return todo
+async def get_todo_by_id(
+    user_id: int,
+    todo_id: int,
+    request: Request,
+    response: Response,
+    todo_service: TodoService = Depends(get_todo_service),
+    coalesce: Coalesce = Depends(get_coalesce),
+) -> Response:
+    flight = await coalesce(lambda: todo_service.get_todo_by_id(todo_id, user_id))
+    check_etag(request, response, resources_etag([flight.value]))
+    return model_response(flight.body, response)
 
 
 @router.put("/users/{user_id}/todos/{todo_id}", response_model=Todo)
-def update_todo(
+async def update_todo(
     user_id: int,
     todo_id: int,
     todo: TodoUpdate,
+    response: Response,
     todo_service: TodoService = Depends(get_todo_service),
-) -> Todo:
-    updated_todo = todo_service.update_todo(todo_id, todo, user_id)
-    return updated_todo
+) -> Response:
+    updated_todo = await todo_service.update_todo(todo_id, todo, user_id)
+    return model_response(updated_todo, response)
 
 
-@router.delete("/users/{user_id}/todos/{todo_id}")
-def delete_todo(
-    user_id: int, todo_id: int, todo_service: TodoService = Depends(get_todo_service)
-) -> dict:
-    deleted_todo = todo_service.delete_todo(todo_id, user_id)
-    return deleted_todo
+@router.delete("/users/{user_id}/todos/{todo_id}", response_model=dict)
+async def delete_todo(
+    user_id: int,
+    todo_id: int,
+    response: Response,
+    todo_service: TodoService = Depends(get_todo_service),
+) -> Response:
+    deleted_todo = await todo_service.delete_todo(todo_id, user_id)
+    return model_response(deleted_todo, response)
@@ -4,6 +4,7 @@ This module contains the SQLAlchemy model for the Todo resource.
 
 from app.database.config import DBBase
 from sqlalchemy import (
+    DDL,
     Column,
     Integer,
     String,
@@ -12,10 +13,11 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
     Index,
+    event,
 )
 from sqlalchemy.orm import relationship
 
-from datetime import datetime, timezone
+from app.utils.common import utcnow
 
 
 class Todo(DBBase):
@@ -25,20 +27,64 @@ class Todo(DBBase):
     title = Column(String(100), nullable=False, index=True)
     description = Column(Text, nullable=True)
     done = Column(Boolean, nullable=False, default=False)
-    created_at = Column(
-        DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
-    )
+    created_at = Column(DateTime, nullable=False, default=utcnow)
     updated_at = Column(
         DateTime,
         nullable=False,
-        default=lambda: datetime.now(timezone.utc),
-        onupdate=lambda: datetime.now(timezone.utc),
+        default=utcnow,
+        onupdate=utcnow,
     )
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
     user = relationship("User", back_populates="todos")
 
-    __table_args__ = (Index("ix_todo_title", "title"),)
+    # Every todo lookup is scoped to a user and ordered/filtered by id, or by a
+    # timestamp then id for the sorted lists. The trigram index serves the
+    # case-insensitive title searches (PostgreSQL only).
+    __table_args__ = (
+        Index("ix_todos_user_id_id", "user_id", "id"),
+        Index("ix_todos_user_id_done_id", "user_id", "done", "id"),
+        Index("ix_todos_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_todos_user_id_updated_at_id", "user_id", "updated_at", "id"),
+        Index(
+            "ix_todos_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     def __repr__(self):
         return f"<Todo id={self.id} title={self.title} done={self.done}>"
+
+
+class TodoTombstone(DBBase):
+    """A deleted todo, kept for the change feed during the retention period."""
+
+    __tablename__ = "todo_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    # Not a foreign key: the todo is gone (and its id may be reused on SQLite)
+    todo_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=utcnow, index=True)
+
+    # The deletions of a user after a position of the change feed
+    __table_args__ = (
+        Index(
+            "ix_todo_tombstones_user_id_deleted_at_todo_id",
+            "user_id",
+            "deleted_at",
+            "todo_id",
+        ),
+    )
+
+    def __repr__(self):
+        return f"<TodoTombstone todo_id={self.todo_id} deleted_at={self.deleted_at}>"
+
+
+event.listen(
+    Todo.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
@@ -3,8 +3,9 @@ Pydantic schemas for Todo model
 """
 
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
+from enum import Enum
 
 
 class TodoBase(BaseModel):
@@ -38,3 +39,115 @@ class Todo(TodoInDBBase):
 
 class TodoInDB(TodoInDBBase):
     pass
+
+
+class TodoSort(str, Enum):
+    """Order of a todo list: a column, descending when prefixed with `-`."""
+
+    ID = "id"
+    ID_DESC = "-id"
+    CREATED_AT = "created_at"
+    CREATED_AT_DESC = "-created_at"
+    UPDATED_AT = "updated_at"
+    UPDATED_AT_DESC = "-updated_at"
+
+    @property
+    def column(self) -> str:
+        return self.value.lstrip("-")
+
+    @property
+    def descending(self) -> bool:
+        return self.value.startswith("-")
+
+
+class TodoFilters(BaseModel):
+    """Filters and order of a todo list; the datetime bounds are inclusive/exclusive."""
+
+    done: Optional[bool] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    updated_after: Optional[datetime] = None
+    updated_before: Optional[datetime] = None
+    # Case-insensitive match of the beginning / of any part of the title
+    title_prefix: Optional[str] = None
+    search: Optional[str] = None
+    sort: TodoSort = TodoSort.ID
+
+
+# Default window of the recent activity of the stats, in days
+DEFAULT_STATS_DAYS = 7
+
+
+class TodoStats(BaseModel):
+    total: int
+    done: int
+    open: int
+    # Fraction of the todos that are done (0 without todos)
+    completion_rate: float
+    # Todos created / last updated during the last `recent_days` days
+    recent_days: int
+    created_recently: int
+    updated_recently: int
+    last_activity_at: Optional[datetime] = None
+
+
+class GlobalTodoStats(TodoStats):
+    # Users having at least one todo
+    users: int
+
+
+# Changes returned by a call of the change feed, by default and at most
+DEFAULT_CHANGES_LIMIT = 100
+MAX_CHANGES_LIMIT = 1000
+
+
+class TodoChange(BaseModel):
+    id: int
+    changed_at: datetime
+    deleted: bool = False
+    # The current todo when it was created or updated (None when deleted)
+    todo: Optional[Todo] = None
+
+
+class TodoChanges(BaseModel):
+    """Changes of the todos of a user, oldest first, to apply in order."""
+
+    changes: List[TodoChange]
+    # Token of the next call (`since`): where this one stopped
+    next_token: str
+    # Whether more changes are already available after `next_token`
+    has_more: bool
+
+
+# Maximum number of todos accepted by a single batch request
+MAX_BATCH_SIZE = 1000
+
+
+class TodoBatchCreate(BaseModel):
+    items: List[TodoCreate] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class TodoBatchUpdateItem(TodoUpdate):
+    id: int
+
+
+class TodoBatchUpdate(BaseModel):
+    items: List[TodoBatchUpdateItem] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_SIZE
+    )
+
+
+class TodoBatchDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class TodoBatchItemResult(BaseModel):
+    index: int
+    status_code: int
+    id: Optional[int] = None
+    todo: Optional[Todo] = None
+    detail: Optional[str] = None
+
+
+class TodoBatchResult(BaseModel):
+    items: List[TodoBatchItemResult]
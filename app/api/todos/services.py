@@ -1,84 +1,700 @@
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, Optional
+
+import anyio
 from fastapi import HTTPException, status
 
-from sqlalchemy.orm import Session
+from sqlalchemy import (
+    Select,
+    case,
+    delete,
+    distinct,
+    func,
+    insert,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.utils.cache import (
+    CacheBackend,
+    cached,
+    global_todo_stats_key,
+    renew_todos_generation,
+    todos_generation,
+    todos_key,
+    user_key,
+)
+from app.utils.export import (
+    EXPORT_BATCH_SIZE,
+    ExportFormat,
+    encode_header,
+    encode_rows,
+)
+from app.utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    Page,
+    decode_cursor,
+    encode_cursor,
+    keyset_paginate,
+)
+from .models import Todo as TodoModel, TodoTombstone
+
+from .schemas import (
+    DEFAULT_CHANGES_LIMIT,
+    DEFAULT_STATS_DAYS,
+    GlobalTodoStats,
+    TodoBatchCreate,
+    TodoBatchDelete,
+    TodoBatchItemResult,
+    TodoBatchResult,
+    TodoBatchUpdate,
+    TodoChange,
+    TodoChanges,
+    TodoCreate,
+    TodoFilters,
+    TodoStats,
+    Todo,
+    TodoUpdate,
+)
+
+# Columns that can be changed through a batch update
+BATCH_UPDATE_FIELDS = ("title", "description", "done")
+
+# Columns of the exports, in the order of the fields of the Todo responses
+EXPORT_FIELDS = tuple(Todo.model_fields)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # The timestamp columns hold naive UTC datetimes
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _change_token(
+    last: Optional[TodoChange],
+    synced_at: datetime,
+    position: Optional[tuple] = None,
+) -> str:
+    """
+    Token of the change feed: the position of the last change sent (or `position`
+    when there was none) and the time since which the client needs the deletions.
+    """
+    if last is not None:
+        position = (last.changed_at, last.id, last.deleted)
+    changed_at, todo_id, deleted = position or (None, None, False)
+    return encode_cursor(
+        changed_at=changed_at.isoformat() if changed_at else None,
+        id=todo_id,
+        deleted=deleted,
+        synced_at=synced_at.isoformat(),
+    )
+
+
+def _decode_change_token(token: str) -> tuple[Optional[tuple], datetime]:
+    position = decode_cursor(token)
+    try:
+        # Compared with the naive UTC timestamps of the tables
+        synced_at = _naive_utc(datetime.fromisoformat(position["synced_at"]))
+        if position["changed_at"] is None:
+            return None, synced_at
+        changed_at = _naive_utc(datetime.fromisoformat(position["changed_at"]))
+        todo_id, deleted = position["id"], position["deleted"]
+        if (
+            not isinstance(todo_id, int)
+            or isinstance(todo_id, bool)
+            or not isinstance(deleted, bool)
+        ):
+            raise ValueError
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token"
+        )
+    return (changed_at, todo_id, deleted), synced_at
+
+
+async def delete_expired_tombstones(db: AsyncSession, retention: timedelta) -> int:
+    """Deletes the tombstones older than `retention`; returns how many were deleted."""
+    result = await db.execute(
+        delete(TodoTombstone).where(
+            TodoTombstone.deleted_at
+            < _naive_utc(datetime.now(timezone.utc)) - retention
+        )
+    )
+    await db.commit()
+    return result.rowcount
 
-from .models import Todo as TodoModel
 
-from .schemas import TodoCreate, Todo, TodoUpdate
+def filter_todos(statement: Select, filters: TodoFilters) -> Select:
+    """
+    Adds the conditions of `filters` to a SELECT of todos.
+
+    The title searches are case-insensitive LIKE patterns (the user input is
+    escaped): ILIKE on PostgreSQL, served by the pg_trgm index of the title, and a
+    lower() LIKE scan of the rows of the user on SQLite.
+    """
+    if filters.done is not None:
+        statement = statement.where(TodoModel.done == filters.done)
+    for column, lower, upper in (
+        (TodoModel.created_at, filters.created_after, filters.created_before),
+        (TodoModel.updated_at, filters.updated_after, filters.updated_before),
+    ):
+        if lower is not None:
+            statement = statement.where(column >= _naive_utc(lower))
+        if upper is not None:
+            statement = statement.where(column < _naive_utc(upper))
+    if filters.title_prefix:
+        statement = statement.where(
+            TodoModel.title.istartswith(filters.title_prefix, autoescape=True)
+        )
+    if filters.search:
+        statement = statement.where(
+            TodoModel.title.icontains(filters.search, autoescape=True)
+        )
+    return statement
 
 
 class TodoService:
-    def __init__(self, db: Session) -> None:
+    def __init__(
+        self,
+        db: AsyncSession,
+        cache: Optional[CacheBackend] = None,
+        read_db: Optional[AsyncSession] = None,
+        pinned: bool = False,
+        stats_cache: Optional[CacheBackend] = None,
+    ) -> None:
         self.db = db
+        self.cache = cache
+        # Cache of the global stats, used even when the lookups are not cached
+        self.stats_cache = stats_cache
+        # Session of the read-only methods, possibly on a replica
+        self.read_db = read_db if read_db is not None else db
+        # Whether the client must read its own writes: the cache is not read for it
+        self.pinned = pinned
+
+    async def _cached(self, key: Optional[str], schema, loader):
+        # Only the primary fills the cache: a lagging replica could store entries
+        # older than the last invalidation
+        return await cached(
+            self.cache,
+            key,
+            schema,
+            loader,
+            lookup=not self.pinned,
+            fill=self.read_db is self.db,
+        )
+
+    async def _cache_key(self, user_id: int, *parts) -> Optional[str]:
+        if self.cache is None:
+            return None
+        generation = await todos_generation(self.cache, user_id)
+        return todos_key(user_id, generation, *parts)
+
+    async def _invalidate(self, user_id: int) -> None:
+        # The user response embeds its todos, so it is invalidated as well
+        if self.cache is not None:
+            await self.cache.delete(user_key(user_id))
+            await renew_todos_generation(self.cache, user_id)
+
+    async def _get_todo_model(self, todo_id: int, user_id: int) -> TodoModel:
+        result = await self.read_db.execute(
+            select(TodoModel).where(
+                TodoModel.id == todo_id, TodoModel.user_id == user_id
+            )
+        )
+        todo = result.scalars().first()
+        if not todo:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found"
+            )
+        return todo
 
-    def create_todo(self, todo_in: TodoCreate, user_id: int) -> Todo:
+    async def create_todo(self, todo_in: TodoCreate, user_id: int) -> Todo:
         try:
-            todo = TodoModel(
-                title=todo_in.title,
-                description=todo_in.description,
-                done=todo_in.done,
-                user_id=user_id,
-            )
-            self.db.add(todo)
-            self.db.commit()
-            self.db.refresh(todo)
-            return todo
+            result = await self.db.execute(
+                insert(TodoModel)
+                .values(
+                    title=todo_in.title,
+                    description=todo_in.description,
+                    done=todo_in.done,
+                    user_id=user_id,
+                )
+                .returning(TodoModel)
+            )
+            todo = Todo.model_validate(result.scalars().one())
+            await self.db.commit()
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Error creating todo: {e}",
             )
+        await self._invalidate(user_id)
+        return todo
+
+    async def get_todos(
+        self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> Page[Todo]:
+        todos, next_cursor = await keyset_paginate(
+            self.read_db, select(TodoModel), TodoModel.id, cursor, limit
+        )
+        return Page[Todo](
+            items=[Todo.model_validate(todo) for todo in todos],
+            next_cursor=next_cursor,
+        )
 
-    def get_todos(self, skip: int = 0, limit: int = 10) -> [Todo]:
-        todos = self.db.query(TodoModel).offset(skip).limit(limit).all()
-        return [Todo.model_validate(todo) for todo in todos]
+    async def get_todo_by_id(self, todo_id: int, user_id: int) -> Todo:
+        async def load_todo() -> Todo:
+            return Todo.model_validate(await self._get_todo_model(todo_id, user_id))
 
-    def get_todo_by_id(self, todo_id: int, user_id: int) -> Todo:
-        todo = (
-            self.db.query(TodoModel)
-            .filter(TodoModel.id == todo_id, TodoModel.user_id == user_id)
-            .first()
+        key = await self._cache_key(user_id, "item", todo_id)
+        return await self._cached(key, Todo, load_todo)
+
+    async def get_todo_by_user_id(
+        self,
+        user_id: int,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        filters: Optional[TodoFilters] = None,
+    ) -> Page[Todo]:
+        filters = filters or TodoFilters()
+        sort = filters.sort
+        # id is always the tie-breaker of the order
+        sort_key = None if sort.column == "id" else getattr(TodoModel, sort.column)
+
+        async def load_todos() -> Page[Todo]:
+            todos, next_cursor = await keyset_paginate(
+                self.read_db,
+                filter_todos(
+                    select(TodoModel).where(TodoModel.user_id == user_id), filters
+                ),
+                TodoModel.id,
+                cursor,
+                limit,
+                sort_key=sort_key,
+                descending=sort.descending,
+            )
+            return Page[Todo](
+                items=[Todo.model_validate(todo) for todo in todos],
+                next_cursor=next_cursor,
+            )
+
+        key = await self._cache_key(
+            user_id,
+            "page",
+            cursor or "",
+            limit,
+            filters.model_dump_json(exclude_defaults=True),
         )
-        if not todo:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found"
+        return await self._cached(key, Page[Todo], load_todos)
+
+    async def get_todo_changes(
+        self,
+        user_id: int,
+        since: Optional[str] = None,
+        limit: int = DEFAULT_CHANGES_LIMIT,
+        settle_seconds: float = 0.0,
+        retention: Optional[timedelta] = None,
+    ) -> TodoChanges:
+        """
+        The todos of a user created, updated or deleted after the token `since` (the
+        `next_token` of the previous call; None to get all the todos), oldest first.
+
+        Updates are read from the (user_id, updated_at, id) index of the todos and
+        deletions from the tombstones, each by keyset, and merged in the order of
+        (changed_at, id, deleted). Changes younger than `settle_seconds` are left for
+        the next call: a transaction committing later than its timestamps (or a
+        worker with a late clock) cannot slip behind a token already sent.
+
+        Raises:
+            HTTPException: 410 Gone when the client did not sync for longer than the
+                `retention` of the tombstones: it must sync again without a token.
+        """
+        now = _naive_utc(datetime.now(timezone.utc))
+        position, synced_at = None, None
+        if since is not None:
+            position, synced_at = _decode_change_token(since)
+            if retention is not None and synced_at < now - retention:
+                raise HTTPException(
+                    status_code=status.HTTP_410_GONE,
+                    detail="Changes are no longer available for this token, sync again without it",
+                )
+        until = now - timedelta(seconds=settle_seconds)
+
+        updated = select(TodoModel).where(
+            TodoModel.user_id == user_id, TodoModel.updated_at <= until
+        )
+        deleted = select(TodoTombstone).where(
+            TodoTombstone.user_id == user_id, TodoTombstone.deleted_at <= until
+        )
+        if position is not None:
+            changed_at, todo_id, after_deletion = position
+            bound = tuple_(changed_at, todo_id)
+            updated = updated.where(tuple_(TodoModel.updated_at, TodoModel.id) > bound)
+            deletion = tuple_(TodoTombstone.deleted_at, TodoTombstone.todo_id)
+            # At the same (changed_at, id), a deletion comes after an update
+            deleted = deleted.where(
+                deletion > bound if after_deletion else deletion >= bound
+            )
+
+        # Read from the primary: a replica lagging behind the settle window would
+        # let the token move past changes it has not received yet
+        todos = await self.db.scalars(
+            updated.order_by(TodoModel.updated_at, TodoModel.id).limit(limit + 1)
+        )
+        tombstones = await self.db.scalars(
+            deleted.order_by(TodoTombstone.deleted_at, TodoTombstone.todo_id).limit(
+                limit + 1
+            )
+        )
+        changes = sorted(
+            [
+                TodoChange(
+                    id=todo.id,
+                    changed_at=_naive_utc(todo.updated_at),
+                    todo=Todo.model_validate(todo),
+                )
+                for todo in todos
+            ]
+            + [
+                TodoChange(
+                    id=tombstone.todo_id,
+                    changed_at=_naive_utc(tombstone.deleted_at),
+                    deleted=True,
+                )
+                for tombstone in tombstones
+            ],
+            key=lambda change: (change.changed_at, change.id, change.deleted),
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        last = changes[-1] if changes else None
+        # The client needs the deletions since its previous sync (or none before a
+        # sync from scratch) until it caught up, when it has every change until `until`
+        if synced_at is None or not has_more:
+            synced_at = until
+        return TodoChanges(
+            changes=changes,
+            next_token=_change_token(last, synced_at, position),
+            has_more=has_more,
+        )
+
+    async def _count_todos(self, statement: Select, days: int) -> dict:
+        """Runs the aggregates of the stats, restricted by the WHERE of `statement`."""
+        since = _naive_utc(datetime.now(timezone.utc)) - timedelta(days=days)
+        result = await self.read_db.execute(
+            statement.add_columns(
+                func.count().label("total"),
+                func.count().filter(TodoModel.done.is_(True)).label("done"),
+                func.count()
+                .filter(TodoModel.created_at >= since)
+                .label("created_recently"),
+                func.count()
+                .filter(TodoModel.updated_at >= since)
+                .label("updated_recently"),
+                func.max(TodoModel.updated_at).label("last_activity_at"),
+            )
+        )
+        counts = dict(result.mappings().one())
+        return {
+            **counts,
+            "open": counts["total"] - counts["done"],
+            "completion_rate": (
+                round(counts["done"] / counts["total"], 4) if counts["total"] else 0.0
+            ),
+            "recent_days": days,
+        }
+
+    async def get_todo_stats(
+        self, user_id: int, days: int = DEFAULT_STATS_DAYS
+    ) -> TodoStats:
+        """
+        Counts the todos of a user by status, with its recent activity.
+
+        One aggregate query over the rows of the user; the result is cached with the
+        other todo entries of the user, so it is recomputed after each write only.
+        """
+
+        async def load_stats() -> TodoStats:
+            statement = select().where(TodoModel.user_id == user_id)
+            return TodoStats.model_validate(await self._count_todos(statement, days))
+
+        key = await self._cache_key(user_id, "stats", days)
+        return await self._cached(key, TodoStats, load_stats)
+
+    async def get_global_todo_stats(
+        self, days: int = DEFAULT_STATS_DAYS
+    ) -> GlobalTodoStats:
+        """
+        Counts the todos of all users by status, with the recent activity.
+
+        This scans the whole table, so the result is kept in the stats cache for its
+        TTL instead of being invalidated by every write.
+        """
+
+        async def load_stats() -> GlobalTodoStats:
+            statement = select(
+                func.count(distinct(TodoModel.user_id)).label("users")
+            ).select_from(TodoModel)
+            return GlobalTodoStats.model_validate(
+                await self._count_todos(statement, days)
+            )
+
+        # Only expired, never invalidated: filling it from a replica is fine too
+        return await cached(
+            self.stats_cache,
+            global_todo_stats_key(days),
+            GlobalTodoStats,
+            load_stats,
+            lookup=not self.pinned,
+        )
+
+    async def export_todos(
+        self,
+        user_id: int,
+        export_format: ExportFormat,
+        sessions: Callable[[], AsyncSession],
+    ) -> AsyncIterator[bytes]:
+        """
+        Streams all todos of a user, encoded in chunks of `EXPORT_BATCH_SIZE` rows.
+
+        The rows are read through a server-side cursor, as plain tuples (no ORM
+        objects, no validation), so the memory used does not depend on the number of
+        todos. The generator runs after the endpoint returned, so it uses its own
+        session from `sessions`; the session is closed even when the client
+        disconnects and the stream is cancelled.
+        """
+        session = sessions()
+        result = None
+        try:
+            header = encode_header(EXPORT_FIELDS, export_format)
+            if header:
+                yield header
+            result = await session.stream(
+                select(*(getattr(TodoModel, field) for field in EXPORT_FIELDS))
+                .where(TodoModel.user_id == user_id)
+                .order_by(TodoModel.id)
+                .execution_options(yield_per=EXPORT_BATCH_SIZE)
             )
-        return Todo.model_validate(todo)
+            async for rows in result.partitions():
+                yield encode_rows(rows, EXPORT_FIELDS, export_format)
+        finally:
+            # Not interrupted by the cancellation, so the connection goes back to the pool
+            with anyio.CancelScope(shield=True):
+                if result is not None:
+                    await result.close()
+                await session.close()
 
-    def get_todo_by_user_id(self, user_id: int) -> [Todo]:
-        todos = self.db.query(TodoModel).filter(TodoModel.user_id == user_id).all()
-        return [Todo.model_validate(todo) for todo in todos]
+    async def update_todo(
+        self, todo_id: int, todo_in: TodoUpdate, user_id: int
+    ) -> Todo:
+        values = todo_in.model_dump(exclude_none=True)
+        if not values:
+            return await self.get_todo_by_id(todo_id, user_id)
 
-    def update_todo(self, todo_id: int, todo_in: TodoUpdate, user_id: int) -> Todo:
-        todo = (
-            self.db.query(TodoModel)
-            .filter(TodoModel.id == todo_id, TodoModel.user_id == user_id)
-            .first()
+        result = await self.db.execute(
+            update(TodoModel)
+            .where(TodoModel.id == todo_id, TodoModel.user_id == user_id)
+            .values(**values)
+            .returning(TodoModel)
         )
+        todo = result.scalars().first()
         if not todo:
+            await self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found"
             )
+        updated_todo = Todo.model_validate(todo)
+        await self.db.commit()
+        await self._invalidate(user_id)
+        return updated_todo
 
-        todo.title = todo_in.title or todo.title
-        todo.description = todo_in.description or todo.description
-        todo.done = todo_in.done or todo.done
-
-        self.db.commit()
-        self.db.refresh(todo)
-        return Todo.model_validate(todo)
-
-    def delete_todo(self, todo_id: int, user_id: int) -> dict:
-        todo = (
-            self.db.query(TodoModel)
-            .filter(TodoModel.id == todo_id, TodoModel.user_id == user_id)
-            .first()
+    async def delete_todo(self, todo_id: int, user_id: int) -> dict:
+        result = await self.db.execute(
+            delete(TodoModel)
+            .where(TodoModel.id == todo_id, TodoModel.user_id == user_id)
+            .returning(TodoModel.id)
         )
-        if not todo:
+        if result.scalar_one_or_none() is None:
+            await self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found"
             )
-        self.db.delete(todo)
-        self.db.commit()
+        await self._add_tombstones([todo_id], user_id)
+        await self.db.commit()
+        await self._invalidate(user_id)
         return {"detail": "Todo deleted successfully"}
+
+    async def _add_tombstones(self, todo_ids: list, user_id: int) -> None:
+        """Records the deletions for the change feed, in the deleting transaction."""
+        if todo_ids:
+            deleted_at = _naive_utc(datetime.now(timezone.utc))
+            await self.db.execute(
+                insert(TodoTombstone),
+                [
+                    {"todo_id": todo_id, "user_id": user_id, "deleted_at": deleted_at}
+                    for todo_id in todo_ids
+                ],
+            )
+
+    async def create_todos(
+        self, batch_in: TodoBatchCreate, user_id: int
+    ) -> TodoBatchResult:
+        """Creates all todos of the batch with a single multi-row INSERT ... RETURNING."""
+        try:
+            result = await self.db.scalars(
+                insert(TodoModel).returning(TodoModel, sort_by_parameter_order=True),
+                [
+                    {
+                        "title": todo_in.title,
+                        "description": todo_in.description,
+                        "done": todo_in.done,
+                        "user_id": user_id,
+                    }
+                    for todo_in in batch_in.items
+                ],
+            )
+            todos = [Todo.model_validate(todo) for todo in result.all()]
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Error creating todos: {e}",
+            )
+        await self._invalidate(user_id)
+        return TodoBatchResult(
+            items=[
+                TodoBatchItemResult(
+                    index=index,
+                    status_code=status.HTTP_201_CREATED,
+                    id=todo.id,
+                    todo=todo,
+                )
+                for index, todo in enumerate(todos)
+            ]
+        )
+
+    async def update_todos(
+        self, batch_in: TodoBatchUpdate, user_id: int
+    ) -> TodoBatchResult:
+        """
+        Applies all updates of the batch with a single UPDATE ... RETURNING.
+
+        Each column is set through a `CASE id WHEN ... END` expression, so every item
+        only changes the fields it provides. Items whose todo does not exist (or
+        belongs to another user) and repeated ids are reported individually.
+        """
+        results = {}
+        changes = {}
+        for index, item in enumerate(batch_in.items):
+            if item.id in changes:
+                results[index] = TodoBatchItemResult(
+                    index=index,
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    id=item.id,
+                    detail="Duplicate todo id in batch",
+                )
+                continue
+            changes[item.id] = (index, item)
+
+        values = {}
+        for field in BATCH_UPDATE_FIELDS:
+            whens = {
+                todo_id: getattr(item, field)
+                for todo_id, (_, item) in changes.items()
+                if getattr(item, field) is not None
+            }
+            if whens:
+                column = getattr(TodoModel, field)
+                values[field] = case(whens, value=TodoModel.id, else_=column)
+
+        criteria = (TodoModel.user_id == user_id, TodoModel.id.in_(changes))
+        if values:
+            statement = (
+                update(TodoModel).where(*criteria).values(**values).returning(TodoModel)
+            )
+        else:
+            # Nothing to change: only report which todos exist
+            statement = select(TodoModel).where(*criteria)
+
+        try:
+            result = await self.db.scalars(statement)
+            updated = {todo.id: Todo.model_validate(todo) for todo in result.all()}
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Error updating todos: {e}",
+            )
+        await self._invalidate(user_id)
+
+        for todo_id, (index, _) in changes.items():
+            todo = updated.get(todo_id)
+            results[index] = (
+                TodoBatchItemResult(
+                    index=index, status_code=status.HTTP_200_OK, id=todo_id, todo=todo
+                )
+                if todo
+                else TodoBatchItemResult(
+                    index=index,
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    id=todo_id,
+                    detail="Todo not found",
+                )
+            )
+        return TodoBatchResult(items=[results[index] for index in sorted(results)])
+
+    async def delete_todos(
+        self, batch_in: TodoBatchDelete, user_id: int
+    ) -> TodoBatchResult:
+        """Deletes all todos of the batch with a single DELETE ... WHERE id IN (...) RETURNING id."""
+        try:
+            result = await self.db.scalars(
+                delete(TodoModel)
+                .where(TodoModel.user_id == user_id, TodoModel.id.in_(batch_in.ids))
+                .returning(TodoModel.id)
+            )
+            deleted = set(result.all())
+            await self._add_tombstones(sorted(deleted), user_id)
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Error deleting todos: {e}",
+            )
+        await self._invalidate(user_id)
+
+        results = []
+        seen = set()
+        for index, todo_id in enumerate(batch_in.ids):
+            if todo_id in seen:
+                results.append(
+                    TodoBatchItemResult(
+                        index=index,
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        id=todo_id,
+                        detail="Duplicate todo id in batch",
+                    )
+                )
+            elif todo_id in deleted:
+                results.append(
+                    TodoBatchItemResult(
+                        index=index, status_code=status.HTTP_200_OK, id=todo_id
+                    )
+                )
+            else:
+                results.append(
+                    TodoBatchItemResult(
+                        index=index,
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        id=todo_id,
+                        detail="Todo not found",
+                    )
+                )
+            seen.add(todo_id)
+        return TodoBatchResult(items=results)
@@ -1,10 +1,25 @@
 """This module contains the API endpoints for the example module."""
 
-from fastapi import APIRouter, Depends
-
-from app.utils.dependencies import get_db
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+
+from app.database.idempotency import Idempotent
+from app.utils.cache import CacheBackend
+from app.utils.dependencies import (
+    get_cache,
+    get_coalesce,
+    get_db,
+    get_idempotency,
+    get_pinned,
+    get_read_db,
+)
+from app.utils.etag import check_etag, resources_etag
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, Page
+from app.utils.responses import model_response
+from app.utils.singleflight import Coalesce
 from .services import UserService
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 from .schemas import User, UserCreate, UserUpdate
@@ -14,47 +29,81 @@ PATH = "/users"
 DETAIL_PATH = "/user/{user_id}"
 
 
-def get_user_service(db: Session = Depends(get_db)) -> UserService:
-    return UserService(db)
+async def get_user_service(
+    db: AsyncSession = Depends(get_db),
+    cache: Optional[CacheBackend] = Depends(get_cache),
+    read_db: AsyncSession = Depends(get_read_db),
+    pinned: bool = Depends(get_pinned),
+) -> UserService:
+    return UserService(db, cache, read_db, pinned)
 
 
 @router.post(PATH, response_model=User, summary="Create a new user")
 async def create_user(
-    user: UserCreate, user_service: UserService = Depends(get_user_service)
-) -> User:
-    created_user = user_service.create_user(user)
-    return created_user
+    user: UserCreate,
+    response: Response,
+    user_service: UserService = Depends(get_user_service),
+    idempotent: Idempotent = Depends(get_idempotency),
+) -> Response:
+    async def create() -> Response:
+        created_user = await user_service.create_user(user)
+        return model_response(created_user, response)
 
+    return await idempotent(create)
 
-@router.get(PATH, response_model=list[User], summary="Get all users")
+
+@router.get(PATH, response_model=Page[User], summary="Get all users")
 async def get_users(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     user_service: UserService = Depends(get_user_service),
-) -> list[User]:
-    users = user_service.get_users()
-    return users
+    coalesce: Coalesce = Depends(get_coalesce),
+) -> Response:
+    flight = await coalesce(lambda: user_service.get_users(cursor, limit))
+    users = flight.value
+    resources = [resource for user in users.items for resource in (user, *user.todos)]
+    check_etag(request, response, resources_etag(resources, users.next_cursor))
+    # Rendered after the ETag check: a 304 skips the serialization
+    return model_response(flight.body, response)
 
 
 @router.get(DETAIL_PATH, response_model=User, summary="Get a user by ID")
 async def get_user(
-    user_id: int, user_service: UserService = Depends(get_user_service)
-) -> User:
-    user = user_service.get_user(user_id)
-    return user
+    user_id: int,
+    request: Request,
+    response: Response,
+    user_service: UserService = Depends(get_user_service),
+    coalesce: Coalesce = Depends(get_coalesce),
+) -> Response:
+    flight = await coalesce(lambda: user_service.get_user(user_id))
+    user = flight.value
+    # The todos are embedded in the user, so they are part of its version
+    check_etag(request, response, resources_etag([user, *user.todos]))
+    return model_response(flight.body, response)
 
 
 @router.put(DETAIL_PATH, response_model=UserUpdate, summary="Update a user by ID")
 async def update_user(
     user_id: int,
     user: UserUpdate,
+    response: Response,
     user_service: UserService = Depends(get_user_service),
-) -> User:
-    updated_user = user_service.update_user(user_id, user)
-    return updated_user
+) -> Response:
+    updated_user = await user_service.update_user(user_id, user)
+    # Only the fields of the response model are returned
+    return model_response(
+        updated_user.model_dump(mode="json", include=set(UserUpdate.model_fields)),
+        response,
+    )
 
 
 @router.delete(DETAIL_PATH, response_model=dict, summary="Delete a user by ID")
 async def delete_user(
-    user_id: int, user_service: UserService = Depends(get_user_service)
-) -> dict:
-    deleted_user = user_service.delete_user(user_id)
-    return deleted_user
+    user_id: int,
+    response: Response,
+    user_service: UserService = Depends(get_user_service),
+) -> Response:
+    deleted_user = await user_service.delete_user(user_id)
+    return model_response(deleted_user, response)
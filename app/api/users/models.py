@@ -2,11 +2,11 @@
 This module contains the SQLAlchemy model for the User resource.
 """
 
-from datetime import datetime, timezone
 from sqlalchemy import Column, Integer, String, DateTime
 from sqlalchemy.orm import relationship
 
 from app.database.config import DBBase
+from app.utils.common import utcnow
 
 
 class User(DBBase):
@@ -15,14 +15,12 @@ class User(DBBase):
     id = Column(Integer, primary_key=True)
     name = Column(String(100), nullable=False)
     email = Column(String(100), nullable=False, unique=True, index=True)
-    created_at = Column(
-        DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
-    )
+    created_at = Column(DateTime, nullable=False, default=utcnow)
     updated_at = Column(
         DateTime,
         nullable=False,
-        default=lambda: datetime.now(timezone.utc),
-        onupdate=lambda: datetime.now(timezone.utc),
+        default=utcnow,
+        onupdate=utcnow,
     )
 
     todos = relationship("Todo", back_populates="user", cascade="all, delete-orphan")
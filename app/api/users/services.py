@@ -1,67 +1,145 @@
 """This module contains the services i.e. the functions that interact with the db for this example module."""
 
-from typing import List
+from typing import Optional
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
+from app.utils.cache import CacheBackend, cached, renew_todos_generation, user_key
+from app.utils.pagination import DEFAULT_PAGE_SIZE, Page, keyset_paginate
+from app.api.todos.models import Todo as TodoModel, TodoTombstone
 from .models import User as UserModel
 
 from .schemas import User, UserCreate, UserUpdate
 
 
 class UserService:
-    def __init__(self, db: Session) -> None:
+    def __init__(
+        self,
+        db: AsyncSession,
+        cache: Optional[CacheBackend] = None,
+        read_db: Optional[AsyncSession] = None,
+        pinned: bool = False,
+    ) -> None:
         self.db = db
+        self.cache = cache
+        # Session of the read-only methods, possibly on a replica
+        self.read_db = read_db if read_db is not None else db
+        # Whether the client must read its own writes: the cache is not read for it
+        self.pinned = pinned
 
-    def create_user(self, user_in: UserCreate) -> User:
+    async def _cached(self, key: Optional[str], schema, loader):
+        # Only the primary fills the cache: a lagging replica could store entries
+        # older than the last invalidation
+        return await cached(
+            self.cache,
+            key,
+            schema,
+            loader,
+            lookup=not self.pinned,
+            fill=self.read_db is self.db,
+        )
+
+    @staticmethod
+    def _select_users():
+        # User.todos is embedded in the response schema, so it is always loaded
+        # with a single batched SELECT ... WHERE user_id IN (...) per query
+        # instead of one lazy load per user.
+        return select(UserModel).options(selectinload(UserModel.todos))
+
+    async def _get_user_model(self, user_id: int) -> UserModel:
+        result = await self.read_db.execute(
+            self._select_users().where(UserModel.id == user_id)
+        )
+        user = result.scalars().first()
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+            )
+        return user
+
+    async def create_user(self, user_in: UserCreate) -> User:
         try:
-            user = UserModel(
-                name=user_in.name,
-                email=user_in.email,
+            result = await self.db.execute(
+                insert(UserModel)
+                .values(name=user_in.name, email=user_in.email)
+                .returning(*UserModel.__table__.columns)
             )
-            self.db.add(user)
-            self.db.commit()
-            self.db.refresh(user)
-            return User.model_validate(user)
+            user = result.mappings().one()
+            await self.db.commit()
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Error creating user: {e}",
             )
+        # A user that was just inserted cannot have todos yet
+        return User.model_validate({**user, "todos": []})
 
-    def get_users(self, skip: int = 0, limit: int = 10) -> List[User]:
-        users = self.db.query(UserModel).offset(skip).limit(limit).all()
-        return [User.model_validate(user) for user in users]
+    async def get_users(
+        self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> Page[User]:
+        users, next_cursor = await keyset_paginate(
+            self.read_db, self._select_users(), UserModel.id, cursor, limit
+        )
+        return Page[User](
+            items=[User.model_validate(user) for user in users],
+            next_cursor=next_cursor,
+        )
 
-    def get_user(self, user_id: int) -> User:
-        user = self.db.query(UserModel).filter(UserModel.id == user_id).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
-            )
-        return User.model_validate(user)
+    async def get_user(self, user_id: int) -> User:
+        async def load_user() -> User:
+            return User.model_validate(await self._get_user_model(user_id))
+
+        return await self._cached(user_key(user_id), User, load_user)
+
+    async def update_user(self, user_id: int, user_in: UserUpdate) -> User:
+        values = user_in.model_dump(exclude_none=True)
+        if not values:
+            return await self.get_user(user_id)
 
-    def update_user(self, user_id: int, user_in: UserUpdate) -> User:
-        user = self.db.query(UserModel).filter(UserModel.id == user_id).first()
+        # UPDATE ... RETURNING plus the batched todos SELECT of selectinload
+        statement = (
+            select(UserModel)
+            .from_statement(
+                update(UserModel)
+                .where(UserModel.id == user_id)
+                .values(**values)
+                .returning(UserModel)
+            )
+            .options(selectinload(UserModel.todos))
+        )
+        result = await self.db.execute(statement)
+        user = result.scalars().first()
         if not user:
+            await self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
             )
+        updated_user = User.model_validate(user)
+        await self.db.commit()
+        if self.cache is not None:
+            await self.cache.delete(user_key(user_id))
+        return updated_user
 
-        user.name = user_in.name or user.name
-        user.email = user_in.email or user.email
-
-        self.db.commit()
-        self.db.refresh(user)
-        return User.model_validate(user)
-
-    def delete_user(self, user_id: int) -> dict:
-        user = self.db.query(UserModel).filter(UserModel.id == user_id).first()
-        if not user:
+    async def delete_user(self, user_id: int) -> dict:
+        # todos.user_id has no ON DELETE CASCADE, so the todos of the user are
+        # deleted first, in the same transaction. Its change feed goes away with it.
+        await self.db.execute(delete(TodoModel).where(TodoModel.user_id == user_id))
+        await self.db.execute(
+            delete(TodoTombstone).where(TodoTombstone.user_id == user_id)
+        )
+        result = await self.db.execute(
+            delete(UserModel).where(UserModel.id == user_id).returning(UserModel.id)
+        )
+        if result.scalar_one_or_none() is None:
+            await self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
             )
-        self.db.delete(user)
-        self.db.commit()
+        await self.db.commit()
+        if self.cache is not None:
+            await self.cache.delete(user_key(user_id))
+            await renew_todos_generation(self.cache, user_id)
         return {"detail": "User deleted successfully"}
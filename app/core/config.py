@@ -1,6 +1,8 @@
 """This module contains the configuration settings for the FastAPI application."""
 
 from functools import lru_cache
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -15,12 +17,121 @@ class Config(BaseSettings):
     OPEN_API_URL_: str = "/api/openapi.json"
     CORS_ORIGIN_: list = ["*"]
 
+    # Server Config (production mode: python main.py --production)
+    # Worker processes (0: one per CPU core available to the process)
+    APP_WORKERS_: int = 0
+    # After SIGTERM, keep serving this long while failing the readiness probe
+    APP_DRAIN_SECONDS_: float = 5.0
+    # Maximum time given to the in-flight requests once the server stops
+    APP_GRACEFUL_TIMEOUT_SECONDS_: float = 20.0
+
+    # Logging Config
+    LOG_LEVEL_: str = "DEBUG"
+    # Log 1 in N successful requests (errors are always logged)
+    LOG_SAMPLE_RATE_: int = 1
+    # Maximum number of records waiting to be written by the log listener
+    LOG_QUEUE_SIZE_: int = 10000
+    # What to do when the log queue is full: "drop" the record or "block" the caller
+    LOG_QUEUE_FULL_POLICY_: Literal["drop", "block"] = "drop"
+    # JSON serializer of the log records: "json" or "orjson" (speedups extra)
+    LOG_SERIALIZER_: Literal["json", "orjson"] = "json"
+    # Maximum number of records written to the stream at once
+    LOG_BATCH_SIZE_: int = 100
+    # Send the number and duration of the SQL statements in a Server-Timing header
+    LOG_SERVER_TIMING_: bool = True
+    # Log the SQL statements taking at least this long (in milliseconds)
+    LOG_SLOW_QUERY_MS_: float = 200.0
+
+    # Metrics Config
+    # Expose the Prometheus metrics on /metrics
+    METRICS_ENABLED_: bool = True
+
+    # Admission Config
+    # Reject requests (503 + Retry-After) above an adaptive number of in-flight
+    # reads/writes per worker, instead of queueing them for a database connection
+    ADMISSION_ENABLED_: bool = True
+    # Lowest limit of each request class, and highest number of requests of both
+    # classes at once (0: the connections of the pool)
+    ADMISSION_MIN_LIMIT_: int = 4
+    ADMISSION_MAX_LIMIT_: int = 0
+    # The limits decrease when a response takes longer than this to start
+    ADMISSION_LATENCY_TARGET_MS_: float = 500.0
+    # Seconds after which the rejected clients should retry
+    ADMISSION_RETRY_AFTER_SECONDS_: int = 1
+
+    # Change Feed Config
+    # Changes younger than this are left for the next sync, so that a transaction
+    # committing late (or a worker with a late clock) cannot be skipped
+    CHANGES_SETTLE_SECONDS_: float = 2.0
+    # How long the deletions are kept (clients that did not sync for longer start over)
+    CHANGES_RETENTION_DAYS_: int = 30
+    # Interval between the deletions of the expired tombstones
+    CHANGES_SWEEP_INTERVAL_SECONDS_: float = 3600.0
+
+    # Compression Config
+    # Compress the responses with the encoding negotiated with Accept-Encoding
+    COMPRESSION_ENABLED_: bool = True
+    # Encodings offered, by preference ("zstd" and "br" need the compression extra)
+    COMPRESSION_ENCODINGS_: list = ["zstd", "br", "gzip"]
+    # Bodies smaller than this (in bytes) are sent uncompressed
+    COMPRESSION_MINIMUM_SIZE_: int = 1024
+    # Compression level by encoding (JSON object, e.g. '{"gzip": 6, "br": 4, "zstd": 3}')
+    COMPRESSION_LEVELS_: dict = {}
+    # Total size of the compressed bodies kept per worker for the hot payloads (0: none)
+    COMPRESSION_CACHE_MAX_BYTES_: int = 16 * 1024 * 1024
+
+    # Idempotency Config
+    # How long the responses of the POST requests with an Idempotency-Key are replayed
+    IDEMPOTENCY_TTL_SECONDS_: float = 86400.0
+    # Interval between the deletions of the expired keys
+    IDEMPOTENCY_SWEEP_INTERVAL_SECONDS_: float = 300.0
+
+    # Coalescing Config
+    # Routes (endpoint names) whose concurrent identical requests share one fetch per
+    # worker, with how long (seconds) a completed fetch is still served (JSON object)
+    COALESCE_ROUTES_: dict = {
+        "get_user": 0.0,
+        "get_users": 0.0,
+        "get_todos": 0.0,
+        "get_todo_by_id": 0.0,
+        "get_todo_stats": 0.0,
+        "get_global_todo_stats": 0.0,
+    }
+
+    # Health Config
+    # How long a readiness result is reused by the following probes
+    HEALTH_CACHE_TTL_SECONDS_: float = 2.0
+    # Maximum duration of the readiness database checks
+    HEALTH_DB_TIMEOUT_SECONDS_: float = 1.0
+    # Not ready above this fraction of the pool connections checked out
+    HEALTH_MAX_POOL_USAGE_: float = 0.9
+
+    # Cache Config
+    # Read-through cache of the user/todo lookups: "none", "memory" (per worker) or "redis"
+    CACHE_BACKEND_: str = "none"
+    CACHE_TTL_SECONDS_: float = 30.0
+    CACHE_MAX_ENTRIES_: int = 10000
+    CACHE_REDIS_URL_: str = "redis://localhost:6379/0"
+    # How long each worker reuses the global todo stats (a full-table aggregate),
+    # whatever the cache backend
+    STATS_CACHE_TTL_SECONDS_: float = 5.0
+
     # DB Config
     POSTGRES_USER_: str = "postgres"
     POSTGRES_PASSWORD_: str = "postgres"
     POSTGRES_DB_: str = "fapoc"
     POSTGRES_HOST_: str = "localhost"
     POSTGRES_PORT_: int = 5432
+    # Connections of the whole server, split evenly between its worker processes
+    DB_POOL_SIZE_: int = 40
+    # Connections opened beyond the pool size, also split (-1 for no limit)
+    DB_MAX_OVERFLOW_: int = 20
+    # SQLAlchemy URLs of the read replicas (JSON list) serving the read-only queries
+    DB_REPLICA_URLS_: list = []
+    # How a replica is chosen: "round_robin" or "least_connections"
+    DB_REPLICA_STRATEGY_: str = "round_robin"
+    # After a write, the reads of the same client go to the primary for this long
+    DB_READ_YOUR_WRITES_SECONDS_: float = 5.0
 
 
 @lru_cache()
@@ -0,0 +1,85 @@
+"""This module contains the development and production launchers of the application."""
+
+import asyncio
+import importlib.util
+import os
+import signal
+import threading
+
+import uvicorn
+
+from app.core.config import get_app_config
+
+app_config = get_app_config()
+
+# Set once the process received SIGTERM: it still serves requests for
+# APP_DRAIN_SECONDS_ but reports itself as not ready.
+draining = threading.Event()
+
+
+def available_cpus() -> int:
+    """CPU cores this process may run on (its affinity, e.g. a container cpuset)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def install_drain_handler(delay: float) -> None:
+    """
+    Delays the handling of SIGTERM by `delay` seconds.
+
+    Must be called from the event loop of the server (e.g. in the lifespan), after
+    the server installed its own handler. On SIGTERM, `draining` is set so the
+    readiness probe fails and the load balancer stops sending new requests; the
+    server's handler (which stops accepting connections and waits for the in-flight
+    requests) only runs after the delay. Any other signal, or a second SIGTERM,
+    is handled right away.
+    """
+    # Signal handlers can only be set from the main thread
+    if delay <= 0 or threading.current_thread() is not threading.main_thread():
+        return
+    loop = asyncio.get_running_loop()
+    server_handler = signal.getsignal(signal.SIGTERM)
+    if not callable(server_handler):
+        return
+
+    def handle_sigterm(sig, frame) -> None:
+        if draining.is_set():
+            server_handler(sig, frame)
+            return
+        draining.set()
+        loop.call_soon_threadsafe(loop.call_later, delay, server_handler, sig, frame)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+
+def run_development() -> None:
+    uvicorn.run(
+        app="main:app",  # The application instance to run
+        host=app_config.APP_HOST_,  # Host address to bind the server
+        port=app_config.APP_PORT_,  # Port number to bind the server
+        log_config=None,  # Logging configuration (None to use default)
+        reload=True,  # Enable auto-reload for code changes
+    )
+
+
+def run_production() -> None:
+    workers = app_config.APP_WORKERS_ or available_cpus()
+    # The worker processes read their settings from the environment: this is how
+    # they know how many they are, to split the database connections between them.
+    os.environ["APP_WORKERS_"] = str(workers)
+
+    uvicorn.run(
+        app="main:app",
+        host=app_config.APP_HOST_,
+        port=app_config.APP_PORT_,
+        workers=workers,
+        # uvloop and httptools are installed with fastapi[standard] except on
+        # platforms without wheels, where the pure Python versions are used.
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        http="httptools" if importlib.util.find_spec("httptools") else "h11",
+        log_config=None,
+        access_log=False,  # Requests are logged by the LogMiddleware
+        proxy_headers=True,
+        timeout_graceful_shutdown=app_config.APP_GRACEFUL_TIMEOUT_SECONDS_,
+    )
@@ -1,20 +1,68 @@
 """This module contains the database configuration for the application."""
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import time
+
+from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import get_app_config
+from app.database.instrumentation import instrument_engine
+from app.database.routing import ReplicaSet
+from app.utils.metrics import DB_POOL_WAIT
 
 app_config = get_app_config()
 
-POSTGRES_DATABASE_URL = f"postgresql://{app_config.POSTGRES_USER_}:{app_config.POSTGRES_PASSWORD_}@{app_config.POSTGRES_HOST_}:{app_config.POSTGRES_PORT_}/{app_config.POSTGRES_DB_}"
+POSTGRES_DATABASE_URL = f"postgresql+asyncpg://{app_config.POSTGRES_USER_}:{app_config.POSTGRES_PASSWORD_}@{app_config.POSTGRES_HOST_}:{app_config.POSTGRES_PORT_}/{app_config.POSTGRES_DB_}"
+
+
+def per_worker(connections: int, workers: int) -> int:
+    """Share of a worker in `connections` split between `workers` processes."""
+    if connections <= 0:
+        return connections
+    return max(connections // max(workers, 1), 1)
+
+
+# The size of the connection pool of this worker
+POOL_SIZE = per_worker(app_config.DB_POOL_SIZE_, app_config.APP_WORKERS_)
+# The maximum number of connections that can be opened beyond the pool size. -1 for no limit.
+MAX_OVERFLOW = per_worker(app_config.DB_MAX_OVERFLOW_, app_config.APP_WORKERS_)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Connection pool recording how long every checkout waited for a connection."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+
+def build_engine(url: str):
+    engine = create_async_engine(
+        url=url,
+        poolclass=TimedQueuePool,
+        pool_pre_ping=True,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+    )
+    instrument_engine(engine.sync_engine, slow_query_ms=app_config.LOG_SLOW_QUERY_MS_)
+    return engine
+
+
+# The primary, receiving the writes and the reads that must see them
+engine = build_engine(POSTGRES_DATABASE_URL)
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False)
 
-engine = create_engine(
-    url=POSTGRES_DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=100,  # The size of the connection pool
-    max_overflow=50,  # The maximum number of connections that can be opened beyond the pool size. Set to -1 for no limit.
+# The read replicas (None when not configured), each with its own pool
+replicas = (
+    ReplicaSet(
+        [build_engine(url) for url in app_config.DB_REPLICA_URLS_],
+        strategy=app_config.DB_REPLICA_STRATEGY_,
+    )
+    if app_config.DB_REPLICA_URLS_
+    else None
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-DBBase = declarative_base()
+DBBase = declarative_base(cls=AsyncAttrs)
@@ -0,0 +1,264 @@
+"""This module contains the idempotency keys of the POST requests and their stored responses."""
+
+import asyncio
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+import anyio
+from fastapi import HTTPException, Request, Response, status
+from pydantic import BaseModel
+from sqlalchemy import Column, DateTime, Integer, String, Text, delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.config import DBBase
+from app.utils.cache import CacheBackend, idempotency_key
+from app.utils.logger import logger
+from app.utils.metrics import IDEMPOTENT_REPLAYS
+from app.utils.responses import dependency_headers
+
+# Header of the client-generated key identifying the attempts of one request
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+# Header marking the responses replayed from a previous execution
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+# An endpoint, as called by the idempotent runner
+Endpoint = Callable[[], Awaitable[Response]]
+# Runner returned by the dependency: executes the endpoint once per idempotency key
+Idempotent = Callable[[Endpoint], Awaitable[Response]]
+
+
+class IdempotencyKey(DBBase):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(MAX_KEY_LENGTH), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    # NULL until the response is stored (committed with the created rows, the key is
+    # never released: retries get a 409 instead of creating them again)
+    status_code = Column(Integer, nullable=True)
+    body = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey key={self.key} status_code={self.status_code}>"
+
+
+class StoredResponse(BaseModel):
+    fingerprint: str
+    status_code: int
+    body: str
+
+
+def _utcnow() -> datetime:
+    # Naive UTC, like the DateTime columns store it
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+async def fingerprint(request: Request) -> str:
+    """Hash of what makes two requests the same: method, path and body."""
+    digest = hashlib.sha256(f"{request.method} {request.url.path}\n".encode())
+    digest.update(await request.body())
+    return digest.hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Runs the POST endpoints at most once per `Idempotency-Key` header.
+
+    The first request with a key inserts it in the session of the endpoint without
+    committing it, so the key is committed with the rows the endpoint creates, or
+    rolled back with them when it fails (or its worker dies) and can be retried.
+    The response of the endpoint is then stored when it succeeds (2xx), and the
+    retries with the same key and request get it back without calling the endpoint.
+    Duplicates arriving while it runs in the same worker wait for its result; in
+    another worker they wait for its transaction, then get a 409 and are replayed
+    on their next retry. Reusing a key for another request is a 422.
+
+    Args:
+        ttl: How long the responses are replayed, in seconds.
+        cache: Optional cache in front of the database for the completed responses.
+    """
+
+    def __init__(self, ttl: float, cache: Optional[CacheBackend] = None) -> None:
+        self.ttl = ttl
+        self.cache = cache
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    async def run(
+        self, db: AsyncSession, request: Request, response: Response, call: Endpoint
+    ) -> Response:
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if key is None:
+            return await call()
+        if not 0 < len(key) <= MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{IDEMPOTENCY_KEY_HEADER} must have 1 to {MAX_KEY_LENGTH} characters",
+            )
+        request_fingerprint = await fingerprint(request)
+
+        while key in self._in_flight:
+            stored = await asyncio.shield(self._in_flight[key])
+            if stored is not None:
+                IDEMPOTENT_REPLAYS.inc("coalesced")
+                return _replay(stored, request_fingerprint, response)
+            # The other execution failed and released the key: take it over
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        stored = None
+        locked = False
+        try:
+            stored = await self._lookup(db, key, request_fingerprint)
+            if stored is not None:
+                return _replay(stored, request_fingerprint, response)
+            await self._lock(db, key, request_fingerprint)
+            locked = True
+            result = await call()
+            if 200 <= result.status_code < 300:
+                completed = StoredResponse(
+                    fingerprint=request_fingerprint,
+                    status_code=result.status_code,
+                    body=bytes(result.body).decode(),
+                )
+                try:
+                    await self._save(db, key, completed)
+                    stored = completed
+                except Exception as e:
+                    # The rows and the key are committed: the retries get a 409
+                    # rather than creating them again, so the response still goes out
+                    logger.error(f"Failed to store the idempotent response: {e}")
+            return result
+        finally:
+            try:
+                if locked and stored is None:
+                    # Rolls back the key if the endpoint did not commit it (failed
+                    # before or without committing): the request can be retried
+                    with anyio.CancelScope(shield=True):
+                        await db.rollback()
+            finally:
+                del self._in_flight[key]
+                future.set_result(stored)
+
+    async def _lookup(
+        self, db: AsyncSession, key: str, request_fingerprint: str
+    ) -> Optional[StoredResponse]:
+        """The stored response of `key`; raises a 409 while another request holds it."""
+        if self.cache is not None:
+            data = await self.cache.get(idempotency_key(key))
+            if data is not None:
+                IDEMPOTENT_REPLAYS.inc("cache")
+                return StoredResponse.model_validate_json(data)
+
+        table = IdempotencyKey.__table__
+        row = (
+            (await db.execute(select(table).where(table.c.key == key)))
+            .mappings()
+            .one_or_none()
+        )
+        if row is None or row["expires_at"] <= _utcnow():
+            return None
+        if row["status_code"] is None:
+            raise _in_progress(row["fingerprint"], request_fingerprint)
+        IDEMPOTENT_REPLAYS.inc("database")
+        stored = StoredResponse(
+            fingerprint=row["fingerprint"],
+            status_code=row["status_code"],
+            body=row["body"],
+        )
+        await self._cache(key, stored)
+        return stored
+
+    async def _lock(self, db: AsyncSession, key: str, request_fingerprint: str) -> None:
+        """
+        Inserts `key` (replacing it if it expired) in the open transaction of `db`,
+        committed by the endpoint. The uncommitted row makes the same insert of
+        another worker wait for the end of this transaction.
+        """
+        table = IdempotencyKey.__table__
+        now = _utcnow()
+        try:
+            await db.execute(
+                delete(table).where(table.c.key == key, table.c.expires_at <= now)
+            )
+            await db.execute(
+                table.insert().values(
+                    key=key,
+                    fingerprint=request_fingerprint,
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=self.ttl),
+                )
+            )
+        except IntegrityError:
+            # Taken by another worker in the meantime
+            await db.rollback()
+            raise _in_progress(None, request_fingerprint) from None
+
+    async def _save(self, db: AsyncSession, key: str, stored: StoredResponse) -> None:
+        table = IdempotencyKey.__table__
+        await db.execute(
+            update(table)
+            .where(table.c.key == key)
+            .values(
+                status_code=stored.status_code,
+                body=stored.body,
+                expires_at=_utcnow() + timedelta(seconds=self.ttl),
+            )
+        )
+        await db.commit()
+        await self._cache(key, stored)
+
+    async def _cache(self, key: str, stored: StoredResponse) -> None:
+        if self.cache is not None:
+            await self.cache.set(
+                idempotency_key(key),
+                stored.model_dump_json().encode(),
+                min(self.cache.ttl, self.ttl),
+            )
+
+    async def sweep(self, db: AsyncSession) -> int:
+        """Deletes the expired keys; returns how many were deleted."""
+        table = IdempotencyKey.__table__
+        result = await db.execute(delete(table).where(table.c.expires_at <= _utcnow()))
+        await db.commit()
+        return result.rowcount
+
+
+def _in_progress(
+    stored_fingerprint: Optional[str], request_fingerprint: str
+) -> HTTPException:
+    if stored_fingerprint not in (None, request_fingerprint):
+        return _mismatch()
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=(
+            f"A request with this {IDEMPOTENCY_KEY_HEADER} was already processed, "
+            "its response is not available yet"
+        ),
+        headers={"Retry-After": "1"},
+    )
+
+
+def _mismatch() -> HTTPException:
+    return HTTPException(
+        status_code=422,
+        detail=f"{IDEMPOTENCY_KEY_HEADER} was already used by another request",
+    )
+
+
+def _replay(
+    stored: StoredResponse, request_fingerprint: str, response: Response
+) -> Response:
+    if stored.fingerprint != request_fingerprint:
+        raise _mismatch()
+    result = Response(
+        stored.body,
+        status_code=stored.status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"},
+    )
+    result.raw_headers.extend(dependency_headers(response))
+    return result
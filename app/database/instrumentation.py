@@ -0,0 +1,83 @@
+"""This module contains the instrumentation of the SQL statements sent by the engine."""
+
+import re
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.utils.logger import logger
+
+# Longest SQL text written in a slow-query log record
+MAX_LOGGED_SQL_LENGTH = 2000
+
+_WHITESPACE = re.compile(r"\s+")
+# A parenthesized list of bound parameters: (?, ?), ($1, $2) or (%(a)s, %(b)s)
+_PARAMETER = r"\s*(?:\?|\$\d+|%\(\w+\)s|:\w+)\s*"
+_PARAMETER_LIST = re.compile(rf"\((?:{_PARAMETER},)*{_PARAMETER}\)")
+_REPEATED_LISTS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+
+
+class QueryStats:
+    """Statements sent to the database while handling one request."""
+
+    def __init__(self, req: Optional[dict] = None) -> None:
+        self.req = req
+        self.count = 0
+        self.duration = 0.0
+
+    def as_dict(self) -> dict:
+        return {"queries": self.count, "duration_ms": round(self.duration * 1000, 3)}
+
+
+# Stats of the request being handled, set by the LogMiddleware
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    Normalizes a statement for the slow-query log.
+
+    The whitespace is collapsed and the lists of bound parameters (IN lists, the
+    rows of a multi-row INSERT) are shortened to `(...)`, so the same query always
+    produces the same text whatever the number of parameters.
+    """
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _PARAMETER_LIST.sub("(...)", statement)
+    statement = _REPEATED_LISTS.sub("(...)", statement)
+    return statement[:MAX_LOGGED_SQL_LENGTH]
+
+
+def instrument_engine(engine: Engine, slow_query_ms: float) -> None:
+    """
+    Times every statement executed by `engine` (the `sync_engine` of an AsyncEngine).
+
+    The count and duration of the statements are added to the `QueryStats` of the
+    current request, and statements taking `slow_query_ms` or more are logged.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        # Kept on the execution context, so a failed statement leaves nothing behind
+        context.query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        duration = time.perf_counter() - context.query_start
+        stats = query_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.duration += duration
+        if duration * 1000 >= slow_query_ms:
+            extra = {
+                "query": {
+                    "sql": normalize_sql(statement),
+                    "duration_ms": round(duration * 1000, 3),
+                    "executemany": many,
+                }
+            }
+            if stats is not None and stats.req is not None:
+                extra["req"] = stats.req
+            logger.warning("Slow query", extra=extra)
@@ -0,0 +1,29 @@
+"""This module contains the periodic deletion of the expired rows (idempotency keys, tombstones)."""
+
+import asyncio
+from typing import Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.utils.logger import logger
+
+
+async def sweep_periodically(
+    sweep: Callable[[AsyncSession], Awaitable[int]],
+    sessions: Callable[[], AsyncSession],
+    interval: float,
+    name: str,
+) -> None:
+    """
+    Runs `sweep` (deleting the expired `name`, returning how many) in a new session
+    every `interval` seconds, until cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with sessions() as db:
+                deleted = await sweep(db)
+            if deleted:
+                logger.debug(f"Deleted {deleted} expired {name}")
+        except Exception as e:
+            logger.error(f"Failed to delete the expired {name}: {e}")
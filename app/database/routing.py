@@ -0,0 +1,84 @@
+"""This module contains the routing of the read-only queries to the database replicas."""
+
+import itertools
+import time
+from typing import Optional, Sequence
+
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+# Strategies choosing the replica of a session
+ROUND_ROBIN = "round_robin"
+LEAST_CONNECTIONS = "least_connections"
+
+# Cookie pinning a client to the primary after a write, holding the UNIX time
+# until which its reads must see its own writes
+READ_YOUR_WRITES_COOKIE = "primary_until"
+
+# Methods that do not change anything, so they do not pin the client to the primary
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class ReplicaSet:
+    """
+    The read replicas of the database.
+
+    Args:
+        engines: One engine per replica.
+        strategy: How a replica is chosen for a session: `round_robin`, or
+            `least_connections` (the replica with the fewest checked-out connections).
+    """
+
+    def __init__(
+        self, engines: Sequence[AsyncEngine], strategy: str = ROUND_ROBIN
+    ) -> None:
+        if not engines:
+            raise ValueError("A replica set needs at least one engine")
+        if strategy not in (ROUND_ROBIN, LEAST_CONNECTIONS):
+            raise ValueError(f"Unknown replica selection strategy: {strategy}")
+        self.engines = list(engines)
+        self.strategy = strategy
+        self._sessionmakers = {
+            engine: async_sessionmaker(bind=engine, autoflush=False)
+            for engine in self.engines
+        }
+        self._next = itertools.cycle(self.engines)
+
+    def choose(self) -> AsyncEngine:
+        if self.strategy == LEAST_CONNECTIONS:
+            return min(self.engines, key=lambda engine: engine.pool.checkedout())
+        return next(self._next)
+
+    def session(self) -> AsyncSession:
+        return self._sessionmakers[self.choose()]()
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+
+def pinned_to_primary(request: Request) -> bool:
+    """Whether the client wrote recently enough that its reads must go to the primary."""
+    try:
+        return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def pin_to_primary(response: Response, seconds: float) -> None:
+    """Sends the reads of the client to the primary for the next `seconds`."""
+    response.set_cookie(
+        READ_YOUR_WRITES_COOKIE,
+        str(round(time.time() + seconds, 3)),
+        max_age=max(int(seconds), 1),
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def wants_primary(request: Request, replicas: Optional[ReplicaSet]) -> bool:
+    return (
+        replicas is None
+        or request.method not in SAFE_METHODS
+        or pinned_to_primary(request)
+    )
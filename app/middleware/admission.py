@@ -0,0 +1,183 @@
+"""Middleware bounding the requests processed at once (admission control)"""
+
+import json
+import time
+from typing import Iterable, Optional, Sequence
+
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.middleware.metrics import UNMATCHED_ROUTE
+from app.utils.metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_LIMIT,
+    ADMISSION_REJECTED,
+)
+
+# Request classes, limited separately so a burst of writes does not starve the reads
+READ = "read"
+WRITE = "write"
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class AdaptiveLimit:
+    """
+    Concurrency limit adjusted from the observed latency (AIMD).
+
+    Every request completing within `latency_target` seconds while at least half of
+    the limit is in use raises the limit by `1 / limit` (about +1 per round trip
+    of the whole limit). A slower or failed request multiplies it by `backoff`, at
+    most once per `latency_target`, so one burst of slow responses only counts once.
+    The limit stays between `min_limit` and `max_limit`.
+    """
+
+    def __init__(
+        self,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        backoff: float = 0.9,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._decreased_at = 0.0
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, latency: float, failed: bool = False) -> None:
+        busy = self.in_flight >= self.limit / 2
+        self.in_flight -= 1
+        now = time.monotonic()
+        if failed or latency > self.latency_target:
+            if now - self._decreased_at >= self.latency_target:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._decreased_at = now
+        elif busy:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware rejecting the requests above the adaptive limit of their
+    class (reads or writes) with a 503 and a `Retry-After` header, instead of
+    letting them queue for a database connection until they time out.
+
+    Both classes together never exceed `max_limit` (the database connections), and
+    each class is limited to `max_limit - min_limit`, so the other one always keeps
+    at least `min_limit` slots.
+
+    The latency driving the limits is the time until the response starts, so long
+    streamed bodies do not count as slow responses; a request holds its slot until
+    its body is sent.
+
+    A rejected request never reaches the router, so its route is matched here
+    against `routes` and stored in the scope, like the router does: the request
+    metrics and the rejection counter are labelled with the route template.
+
+    Args:
+        app: The ASGI application to wrap.
+        min_limit: Lowest concurrency limit of each class.
+        max_limit: Highest number of requests processed at once, both classes together.
+        latency_target: Responses starting later than this (in seconds) lower the limit.
+        retry_after: Value of the `Retry-After` header of the rejected requests (in seconds).
+        exempt_paths: Path prefixes never rejected (health checks, metrics).
+        routes: Routes of the application, matched only for the rejected requests.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        retry_after: int = 1,
+        exempt_paths: Iterable[str] = (),
+        routes: Sequence[BaseRoute] = (),
+    ) -> None:
+        self.app = app
+        self.max_limit = max_limit
+        self.in_flight = 0
+        class_limit = max(min_limit, max_limit - min_limit)
+        self.limits = {
+            name: AdaptiveLimit(min_limit, class_limit, latency_target)
+            for name in (READ, WRITE)
+        }
+        self.retry_after = retry_after
+        self.exempt_paths = tuple(exempt_paths)
+        self.routes = routes
+        for name, limit in self.limits.items():
+            ADMISSION_LIMIT.set(limit.limit, name)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        name = READ if scope["method"] in READ_METHODS else WRITE
+        limit = self.limits[name]
+        if self.in_flight >= self.max_limit or not limit.try_acquire():
+            route = self._match_route(scope)
+            if route is not None:
+                scope["route"] = route
+            ADMISSION_REJECTED.inc(
+                route.path if route is not None else UNMATCHED_ROUTE, name
+            )
+            await self._reject(send)
+            return
+
+        self.in_flight += 1
+        ADMISSION_IN_FLIGHT.inc(name)
+        start = time.perf_counter()
+        latency = None
+        failed = True
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal latency, failed
+            if message["type"] == "http.response.start":
+                latency = time.perf_counter() - start
+                failed = message["status"] >= 500
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if latency is None:
+                latency = time.perf_counter() - start
+            limit.release(latency, failed)
+            self.in_flight -= 1
+            ADMISSION_IN_FLIGHT.dec(name)
+            ADMISSION_LIMIT.set(limit.limit, name)
+
+    def _match_route(self, scope: Scope) -> Optional[BaseRoute]:
+        # Same precedence as the router: the first full match, else the first
+        # partial one (path matched, method not allowed)
+        partial = None
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match is Match.FULL:
+                return route
+            if match is Match.PARTIAL and partial is None:
+                partial = route
+        return partial
+
+    async def _reject(self, send: Send) -> None:
+        body = json.dumps({"detail": "Server overloaded, retry later"}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
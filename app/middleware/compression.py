@@ -0,0 +1,300 @@
+"""Middleware compressing the responses (gzip, brotli, zstd) negotiated with Accept-Encoding"""
+
+import zlib
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.metrics import COMPRESSED_RESPONSES
+
+try:
+    import brotli
+except ImportError:  # brotli is optional (compression extra)
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional (compression extra)
+    zstandard = None
+
+# Media types worth compressing (JSON responses, NDJSON and CSV exports)
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class Encoding:
+    """A content coding: one-shot and streamed compression at a given level."""
+
+    name = ""
+    default_level = 0
+
+    def __init__(self, level: Optional[int] = None) -> None:
+        self.level = self.default_level if level is None else level
+
+    def compress(self, body: bytes) -> bytes:
+        raise NotImplementedError
+
+    def stream(self) -> "Stream":
+        raise NotImplementedError
+
+
+class Gzip(Encoding):
+    name = "gzip"
+    default_level = 6
+
+    def compress(self, body: bytes) -> bytes:
+        return zlib.compress(body, self.level, wbits=31)
+
+    def stream(self) -> "Stream":
+        compressor = zlib.compressobj(self.level, wbits=31)
+        return Stream(
+            lambda chunk: (
+                compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            ),
+            compressor.flush,
+        )
+
+
+class Brotli(Encoding):
+    name = "br"
+    default_level = 4
+
+    def compress(self, body: bytes) -> bytes:
+        return brotli.compress(body, quality=self.level)
+
+    def stream(self) -> "Stream":
+        compressor = brotli.Compressor(quality=self.level)
+        return Stream(
+            lambda chunk: compressor.process(chunk) + compressor.flush(),
+            compressor.finish,
+        )
+
+
+class Zstd(Encoding):
+    name = "zstd"
+    default_level = 3
+
+    def __init__(self, level: Optional[int] = None) -> None:
+        super().__init__(level)
+        self._compressor = zstandard.ZstdCompressor(level=self.level)
+
+    def compress(self, body: bytes) -> bytes:
+        return self._compressor.compress(body)
+
+    def stream(self) -> "Stream":
+        compressor = zstandard.ZstdCompressor(level=self.level).compressobj()
+        return Stream(
+            lambda chunk: (
+                compressor.compress(chunk)
+                + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            ),
+            compressor.flush,
+        )
+
+
+class Stream:
+    """Compression of a streamed body: every chunk is flushed to the client as it comes."""
+
+    def __init__(self, compress, finish) -> None:
+        self.compress = compress
+        self.finish = finish
+
+
+ENCODINGS = {"gzip": Gzip, "br": Brotli, "zstd": Zstd}
+
+
+def available_encodings() -> set[str]:
+    """The encodings whose library is installed."""
+    return {
+        name
+        for name, module in (("gzip", zlib), ("br", brotli), ("zstd", zstandard))
+        if module is not None
+    }
+
+
+def negotiate(accept_encoding: str, encodings: Iterable[str]) -> Optional[str]:
+    """
+    The encoding of the response: the one of `encodings` (in order of preference)
+    with the highest quality in the `Accept-Encoding` header, None for no encoding.
+    """
+    qualities = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        qualities[name.strip().lower()] = quality
+    default = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for name in encodings:
+        quality = qualities.get(name, default)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+class CompressedBodies:
+    """
+    LRU cache of compressed bodies, so that the hot payloads (the same page served
+    again from the database, the cache or a coalesced fetch) are not compressed
+    again. Bounded by the total size of the compressed bodies.
+
+    The keys are the encoding, the path and query and the ETag of the response:
+    the ETag already identifies the representation, where hashing the body would
+    cost about as much as compressing it with zstd.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._bodies: OrderedDict[tuple, bytes] = OrderedDict()
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        body = self._bodies.get(key)
+        if body is not None:
+            self._bodies.move_to_end(key)
+        return body
+
+    def set(self, key: tuple, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        previous = self._bodies.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._bodies[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._bodies.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing the compressible responses with the encoding
+    negotiated with the `Accept-Encoding` header of the request.
+
+    Bodies sent at once are compressed when they reach `minimum_size`; the ones with
+    an ETag go through a cache of the compressed bodies. Streamed bodies (exports)
+    are compressed chunk by chunk. Responses that already have a `Content-Encoding`
+    are left untouched.
+
+    Args:
+        app: The ASGI application to wrap.
+        encodings: Names of the encodings offered, by preference (`zstd`, `br`,
+            `gzip`); the ones whose library is not installed are ignored.
+        minimum_size: Smaller bodies are sent uncompressed (in bytes).
+        levels: Compression level of each encoding, by name (library default if missing).
+        cache_max_bytes: Total size of the cached compressed bodies (0 disables the cache).
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        encodings: Iterable[str] = ("zstd", "br", "gzip"),
+        minimum_size: int = 1024,
+        levels: Optional[dict] = None,
+        cache_max_bytes: int = 0,
+    ) -> None:
+        self.app = app
+        levels = levels or {}
+        available = available_encodings()
+        self.encodings = {
+            name: ENCODINGS[name](levels.get(name))
+            for name in encodings
+            if name in available
+        }
+        self.minimum_size = minimum_size
+        self.cache = CompressedBodies(cache_max_bytes) if cache_max_bytes > 0 else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        name = negotiate(
+            Headers(scope=scope).get("accept-encoding", ""), self.encodings
+        )
+        start: Optional[Message] = None
+        stream: Optional[Stream] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, stream, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                else:
+                    # Cached representations depend on the Accept-Encoding header
+                    MutableHeaders(raw=message["headers"]).add_vary_header(
+                        "Accept-Encoding"
+                    )
+                    passthrough = name is None or "content-encoding" in headers
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if stream is None and start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                if not more_body:
+                    # The whole body at once
+                    if len(body) >= self.minimum_size:
+                        body = self._compress(name, body, scope, headers.get("etag"))
+                        headers["Content-Encoding"] = name
+                        headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    start = None
+                    return
+                # A streamed body: compressed as it comes, without a length
+                del headers["Content-Length"]
+                headers["Content-Encoding"] = name
+                await send(start)
+                start = None
+                stream = self.encodings[name].stream()
+                COMPRESSED_RESPONSES.inc(name, "streamed")
+
+            if stream is None:
+                await send(message)
+                return
+            chunk = stream.compress(body) if body else b""
+            if not more_body:
+                chunk += stream.finish()
+            if chunk or not more_body:
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": more_body,
+                    }
+                )
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compress(
+        self, name: str, body: bytes, scope: Scope, etag: Optional[str]
+    ) -> bytes:
+        if self.cache is None or etag is None:
+            COMPRESSED_RESPONSES.inc(name, "compressed")
+            return self.encodings[name].compress(body)
+        key = (name, scope["path"], scope["query_string"], etag)
+        compressed = self.cache.get(key)
+        if compressed is None:
+            COMPRESSED_RESPONSES.inc(name, "compressed")
+            compressed = self.encodings[name].compress(body)
+            self.cache.set(key, compressed)
+        else:
+            COMPRESSED_RESPONSES.inc(name, "cached")
+        return compressed
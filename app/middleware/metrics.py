@@ -0,0 +1,58 @@
+"""Middleware recording the request metrics"""
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.metrics import (
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS,
+    HTTP_REQUESTS_IN_FLIGHT,
+)
+
+# Route label of the requests that did not match any route (e.g. 404s), so
+# arbitrary paths cannot create new label sets.
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware counting the HTTP requests and recording their duration.
+
+    Requests are labelled with the path template of the route that handled them
+    (e.g. `/user/{user_id}`), which the router stores in the scope. Depending on the
+    FastAPI version, the template includes the prefix of the included router.
+
+    Args:
+        app: The ASGI application to wrap.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            status_code = 500
+            raise
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route = route.path if route is not None else UNMATCHED_ROUTE
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method, route, status_code)
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method, route)
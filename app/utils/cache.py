@@ -0,0 +1,195 @@
+"""This module contains the read-through cache used by the services."""
+
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Type, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class CacheStats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def as_dict(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class CacheBackend:
+    """Interface of the cache backends: an async key/value store of bytes with a TTL."""
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self.stats = CacheStats()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """
+    In-process LRU cache with a TTL per entry.
+
+    The cache is local to the worker process: invalidations done by one worker are
+    not seen by the others, so entries may be stale for up to `ttl` seconds when
+    running several workers.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 30.0) -> None:
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry[1]
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache stored in Redis (or any server speaking the Redis protocol).
+
+    Args:
+        client: A `redis.asyncio.Redis` compatible client.
+        ttl: Default time to live of the entries, in seconds.
+        prefix: Prefix of every key, to share a Redis database between applications.
+
+    Evictions are done by the Redis server and are not counted by `stats`.
+    """
+
+    def __init__(self, client, ttl: float = 30.0, prefix: str = "fapoc:") -> None:
+        super().__init__(ttl)
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = await self.client.get(self.prefix + key)
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        await self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+
+async def cached(
+    cache: Optional[CacheBackend],
+    key: str,
+    schema: Type[T],
+    loader: Callable[[], Awaitable[T]],
+    lookup: bool = True,
+    fill: bool = True,
+) -> T:
+    """
+    Returns the `schema` instance cached under `key`, loading and caching it on a miss.
+
+    `lookup=False` always loads (clients that must read their own writes) and
+    `fill=False` does not cache what was loaded (reads from a replica, which may be
+    older than the last invalidation).
+    """
+    if cache is None:
+        return await loader()
+    if lookup:
+        data = await cache.get(key)
+        if data is not None:
+            return schema.model_validate_json(data)
+    value = await loader()
+    if fill:
+        await cache.set(key, value.model_dump_json().encode())
+    return value
+
+
+# Cache keys. Every cached todo entry of a user (single todos and list pages) is
+# namespaced by a per-user generation token; replacing the token invalidates all of
+# them at once. A missing token is replaced by a new random one, so a token evicted
+# from the cache can never make old entries visible again.
+
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def idempotency_key(key: str) -> str:
+    return f"idempotency:{key}"
+
+
+def global_todo_stats_key(*parts) -> str:
+    # Not invalidated by the writes: stale for at most the TTL of the cache
+    return ":".join(["todo-stats", *map(str, parts)])
+
+
+def _todos_generation_key(user_id: int) -> str:
+    return f"todos-generation:{user_id}"
+
+
+def todos_key(user_id: int, generation: str, *parts) -> str:
+    return ":".join(["todos", str(user_id), generation, *map(str, parts)])
+
+
+async def todos_generation(cache: CacheBackend, user_id: int) -> str:
+    generation = await cache.get(_todos_generation_key(user_id))
+    if generation is None:
+        return await renew_todos_generation(cache, user_id)
+    return generation.decode()
+
+
+async def renew_todos_generation(cache: CacheBackend, user_id: int) -> str:
+    generation = uuid.uuid4().hex
+    # The token outlives the entries it namespaces
+    await cache.set(_todos_generation_key(user_id), generation.encode(), cache.ttl * 2)
+    return generation
+
+
+def build_cache(config) -> Optional[CacheBackend]:
+    """Builds the cache backend selected by `CACHE_BACKEND_` ("none", "memory" or "redis")."""
+    if config.CACHE_BACKEND_ == "memory":
+        return MemoryCache(
+            max_entries=config.CACHE_MAX_ENTRIES_, ttl=config.CACHE_TTL_SECONDS_
+        )
+    if config.CACHE_BACKEND_ == "redis":
+        from redis.asyncio import Redis
+
+        return RedisCache(
+            Redis.from_url(config.CACHE_REDIS_URL_), ttl=config.CACHE_TTL_SECONDS_
+        )
+    return None
@@ -1,7 +1,13 @@
 """Common utility functions"""
 
 import uuid
+from datetime import datetime, timezone
 
 
 def unique_email():
     return f"{uuid.uuid4()}@example.com"
+
+
+def utcnow() -> datetime:
+    # Naive UTC: the DateTime columns are naive, and asyncpg rejects aware values for them
+    return datetime.now(timezone.utc).replace(tzinfo=None)
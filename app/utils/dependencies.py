@@ -1,12 +1,116 @@
 """This module contains common dependencies used in the application"""
 
-from app.database.config import SessionLocal
+import functools
+from typing import Callable, Optional
 
+from fastapi import Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-def get_db():
-    """This function starts a db session"""
-    db = SessionLocal()
-    try:
+from app.core.config import get_app_config
+from app.database.config import SessionLocal, replicas
+from app.database.idempotency import Idempotent, IdempotencyStore
+from app.database.routing import (
+    SAFE_METHODS,
+    ReplicaSet,
+    pin_to_primary,
+    pinned_to_primary,
+    wants_primary,
+)
+from app.utils.cache import CacheBackend, MemoryCache, build_cache
+from app.utils.singleflight import Coalesce, build_single_flights, fly, request_key
+
+app_config = get_app_config()
+
+cache = build_cache(app_config)
+
+# One entry per window of the global stats (1 to 365 days)
+stats_cache = MemoryCache(max_entries=365, ttl=app_config.STATS_CACHE_TTL_SECONDS_)
+
+single_flights = build_single_flights(app_config.COALESCE_ROUTES_)
+
+idempotency = IdempotencyStore(
+    ttl=app_config.IDEMPOTENCY_TTL_SECONDS_,
+    cache=cache,
+)
+
+
+async def get_db():
+    """This function starts an async db session"""
+    async with SessionLocal() as db:
+        yield db
+
+
+async def get_replicas() -> Optional[ReplicaSet]:
+    """This function returns the read replicas (None when not configured)"""
+    return replicas
+
+
+async def get_read_db(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    replicas: Optional[ReplicaSet] = Depends(get_replicas),
+):
+    """
+    This function starts the session of the read-only queries: on a replica, unless
+    the request writes or the client wrote recently (then it is the primary session)
+    """
+    if request.method not in SAFE_METHODS and replicas is not None:
+        pin_to_primary(response, app_config.DB_READ_YOUR_WRITES_SECONDS_)
+    if wants_primary(request, replicas):
         yield db
-    finally:
-        db.close()
+        return
+    async with replicas.session() as read_db:
+        yield read_db
+
+
+async def get_read_sessionmaker(
+    request: Request, replicas: Optional[ReplicaSet] = Depends(get_replicas)
+) -> Callable[[], AsyncSession]:
+    """
+    This function returns the factory of the read-only sessions used after the
+    endpoint returned (streamed responses), routed like get_read_db
+    """
+    if wants_primary(request, replicas):
+        return SessionLocal
+    return replicas.session
+
+
+async def get_pinned(request: Request) -> bool:
+    """
+    This function tells whether the client wrote recently and must read its own
+    writes from the primary (then the services do not read the cache for it)
+    """
+    return pinned_to_primary(request)
+
+
+async def get_cache() -> Optional[CacheBackend]:
+    """This function returns the cache shared by the services (None when disabled)"""
+    return cache
+
+
+async def get_stats_cache() -> CacheBackend:
+    """This function returns the per-worker cache of the global todo stats"""
+    return stats_cache
+
+
+async def get_idempotency(
+    request: Request, response: Response, db: AsyncSession = Depends(get_db)
+) -> Idempotent:
+    """
+    This function returns the runner of a POST endpoint: called with the endpoint,
+    it executes it once per Idempotency-Key header and replays its response
+    """
+    return functools.partial(idempotency.run, db, request, response)
+
+
+async def get_coalesce(request: Request) -> Coalesce:
+    """
+    This function returns the runner of the fetch of a read endpoint: shared with the
+    identical requests in flight when the route is coalesced (COALESCE_ROUTES_),
+    except for the clients that must read their own writes from the primary
+    """
+    single_flight = single_flights.get(request.scope["endpoint"].__name__)
+    if single_flight is None or pinned_to_primary(request):
+        return fly
+    return functools.partial(single_flight.do, request_key(request))
@@ -0,0 +1,54 @@
+"""This module contains the ETag helpers used for conditional GET requests."""
+
+import hashlib
+from typing import Iterable, Optional
+
+from fastapi import HTTPException, Request, Response, status
+
+
+def resources_etag(resources: Iterable, *extra: Optional[str]) -> str:
+    """
+    Builds a weak ETag from the `id` and `updated_at` of the given resources.
+
+    Every write bumps `updated_at`, so the ETag changes whenever one of the
+    resources changes or the set of resources does, without serializing them.
+    `extra` values (e.g. the next cursor of a page) are hashed as well.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for resource in resources:
+        digest.update(f"{resource.id}@{resource.updated_at.isoformat()};".encode())
+    for value in extra:
+        digest.update(f"{value or ''};".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an `If-None-Match` header with an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == opaque_tag for tag in if_none_match.split(",")
+    )
+
+
+def check_etag(request: Request, response: Response, etag: str) -> None:
+    """
+    Sets the ETag of the response and answers 304 when the client already has it.
+
+    Args:
+        request: The incoming request.
+        response: The response of the endpoint (where the default headers are set).
+        etag: The ETag of the current representation.
+
+    Raises:
+        HTTPException: 304 Not Modified, with the headers of the response, when the
+            ETag matches the `If-None-Match` header of the request.
+    """
+    response.headers["ETag"] = etag
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=dict(response.headers)
+        )
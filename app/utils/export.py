@@ -0,0 +1,51 @@
+"""This module contains the encoders of the streamed exports (NDJSON and CSV)."""
+
+import csv
+import io
+from datetime import datetime
+from enum import Enum
+from typing import Any, Iterable, Sequence
+
+from pydantic_core import to_json
+
+# Rows fetched from the database (and encoded into one chunk) at a time
+EXPORT_BATCH_SIZE = 1000
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+}
+
+
+def _csv_value(value: Any) -> Any:
+    # Same representation as in the JSON responses
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_header(fields: Sequence[str], export_format: ExportFormat) -> bytes:
+    """The first chunk of an export: the header line of a CSV, nothing for NDJSON."""
+    if export_format == ExportFormat.CSV:
+        return encode_rows([fields], fields, export_format)
+    return b""
+
+
+def encode_rows(
+    rows: Iterable[Sequence], fields: Sequence[str], export_format: ExportFormat
+) -> bytes:
+    """Encodes rows (value tuples in the order of `fields`) into one chunk."""
+    if export_format == ExportFormat.NDJSON:
+        return b"".join(to_json(dict(zip(fields, row))) + b"\n" for row in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
@@ -1,13 +1,34 @@
 """This module contains the logger configuration for the application."""
 
+import atexit
 import json
 import logging
+import queue
 from logging import Formatter
+from logging.handlers import QueueHandler, QueueListener
+
+from app.core.config import get_app_config
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup
+    orjson = None
+
+app_config = get_app_config()
 
 
 class JsonFormatter(Formatter):
-    def __init__(self) -> None:
+    def __init__(self, serializer: str = "json") -> None:
         super(JsonFormatter, self).__init__()
+        if serializer == "orjson":
+            # Fail at startup rather than silently logging with json
+            if orjson is None:
+                raise ImportError(
+                    'The "orjson" log serializer requires orjson (speedups extra)'
+                )
+            self.dumps = lambda obj: orjson.dumps(obj, default=str).decode()
+        else:
+            self.dumps = json.dumps
 
     def format(self, record) -> str:
         json_record = {}
@@ -16,15 +37,94 @@ class JsonFormatter(Formatter):
             json_record["req"] = record.__dict__["req"]
         if "res" in record.__dict__:
             json_record["res"] = record.__dict__["res"]
+        if "query" in record.__dict__:
+            json_record["query"] = record.__dict__["query"]
         if record.levelno == logging.ERROR and record.exc_info:
             json_record["err"] = self.formatException(record.exc_info)
-        return json.dumps(json_record)
+        return self.dumps(json_record)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    QueueHandler for a bounded queue.
+
+    Only the log message is resolved on the calling thread (the event loop); the
+    JSON formatting and the I/O happen on the listener thread. When the queue is
+    full the record is either dropped (and counted in `dropped`) or the caller
+    blocks until there is room, depending on `block`.
+    """
+
+    def __init__(self, log_queue: queue.Queue, block: bool = False) -> None:
+        super().__init__(log_queue)
+        self.block = block
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.block:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """
+    StreamHandler used by the queue listener to write records in batches.
+
+    Formatted records are buffered and written with a single write once
+    `batch_size` records are pending or the queue has been drained.
+    """
+
+    def __init__(
+        self, log_queue: queue.Queue, batch_size: int = 100, stream=None
+    ) -> None:
+        super().__init__(stream)
+        self.log_queue = log_queue
+        self.batch_size = max(batch_size, 1)
+        self._buffer = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._buffer.append(self.format(record) + self.terminator)
+            if len(self._buffer) >= self.batch_size or self.log_queue.empty():
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            if self._buffer:
+                self.stream.write("".join(self._buffer))
+                self._buffer.clear()
+            super().flush()
+        finally:
+            self.release()
+
+
+log_queue = queue.Queue(maxsize=app_config.LOG_QUEUE_SIZE_)
+handler = BoundedQueueHandler(
+    log_queue, block=app_config.LOG_QUEUE_FULL_POLICY_ == "block"
+)
+
+stream_handler = BatchStreamHandler(log_queue, batch_size=app_config.LOG_BATCH_SIZE_)
+stream_handler.setFormatter(JsonFormatter(app_config.LOG_SERIALIZER_))
 
+listener = QueueListener(log_queue, stream_handler)
+listener.start()
+# Drain the queue and flush the pending batch on interpreter exit
+atexit.register(listener.stop)
 
 logger = logging.root
-handler = logging.StreamHandler()
-handler.setFormatter(JsonFormatter())
 logger.handlers = [handler]
-logger.setLevel(logging.DEBUG)
+logger.setLevel(app_config.LOG_LEVEL_)
 
 logging.getLogger("uvicorn.access").disabled = True
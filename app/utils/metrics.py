@@ -0,0 +1,282 @@
+"""
+This module contains the application metrics, exposed in the Prometheus text format.
+
+Recording a value is a dict lookup and an addition on the event loop thread (no lock,
+no allocation once a label set has been seen), so it costs about a microsecond.
+Runtime values (pool, thread limiter, cache) are collected when the metrics are
+scraped instead of being tracked on every request.
+"""
+
+from bisect import bisect_left
+from typing import Callable, Iterable, Iterator
+
+from anyio import to_thread
+
+# Latency buckets of the histograms, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield from self.samples()
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def set(self, value: float, *labels) -> None:
+        # Counters tracked by another component are copied when collected
+        self.values[labels] = value
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    """
+    Histogram with fixed buckets.
+
+    Every label set keeps the (non cumulative) count of each bucket plus the sum of
+    the observations; the cumulative `_bucket` samples are computed when rendered.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}
+
+    def observe(self, value: float, *labels) -> None:
+        series = self.values.get(labels)
+        if series is None:
+            # One slot per bucket, one for +Inf, then the sum
+            series = self.values[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterator[str]:
+        for labels, series in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), series):
+                cumulative += count
+                extra = f'le="{_number(bound)}"'
+                yield (
+                    f"{self.name}_bucket{_labels(self.label_names, labels, extra)} "
+                    f"{cumulative}"
+                )
+            label_text = _labels(self.label_names, labels)
+            yield f"{self.name}_sum{label_text} {_number(series[-1])}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class Registry:
+    """The metrics of the application and the collectors refreshing them on scrape."""
+
+    def __init__(self) -> None:
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            collector()
+        lines = [line for metric in self.metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests by method, route and status code.",
+        ("method", "route", "status_code"),
+    )
+)
+HTTP_REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Duration of the HTTP requests by method and route.",
+        ("method", "route"),
+    )
+)
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(
+    Gauge("http_requests_in_flight", "HTTP requests being processed.")
+)
+DB_POOL_WAIT = REGISTRY.register(
+    Histogram(
+        "db_pool_wait_seconds",
+        "Time spent acquiring a database connection from the pool (including "
+        "the pre-ping and opening new connections).",
+    )
+)
+DB_POOL = REGISTRY.register(
+    Gauge(
+        "db_pool_connections",
+        "Connections of the database pool by state (checked_out, checked_in, "
+        "overflow) and its configured size.",
+        ("state",),
+    )
+)
+THREAD_LIMITER = REGISTRY.register(
+    Gauge(
+        "threadpool_tokens",
+        "Tokens of the anyio default thread limiter (borrowed and total).",
+        ("state",),
+    )
+)
+ADMISSION_LIMIT = REGISTRY.register(
+    Gauge(
+        "admission_limit",
+        "Adaptive concurrency limit of the requests by class (read, write).",
+        ("class",),
+    )
+)
+ADMISSION_IN_FLIGHT = REGISTRY.register(
+    Gauge(
+        "admission_in_flight",
+        "Requests admitted and being processed by class (read, write).",
+        ("class",),
+    )
+)
+ADMISSION_REJECTED = REGISTRY.register(
+    Counter(
+        "admission_rejected_total",
+        "Requests rejected with a 503 above the concurrency limit, by route and class.",
+        ("route", "class"),
+    )
+)
+IDEMPOTENT_REPLAYS = REGISTRY.register(
+    Counter(
+        "idempotent_replays_total",
+        "Responses replayed for a known Idempotency-Key, by source (cache, "
+        "database, coalesced with the request in progress).",
+        ("source",),
+    )
+)
+COALESCED_REQUESTS = REGISTRY.register(
+    Counter(
+        "coalesced_requests_total",
+        "Reads of the coalesced routes by result: executed (fetched from the "
+        "services), coalesced (shared an in-flight fetch) or stale (reused a "
+        "completed one).",
+        ("route", "result"),
+    )
+)
+COMPRESSED_RESPONSES = REGISTRY.register(
+    Counter(
+        "compressed_responses_total",
+        "Compressed responses by encoding and result: compressed, cached (body "
+        "compressed earlier) or streamed.",
+        ("encoding", "result"),
+    )
+)
+LOG_RECORDS_DROPPED = REGISTRY.register(
+    Counter(
+        "log_records_dropped_total",
+        "Log records dropped because the log queue was full (LOG_QUEUE_FULL_POLICY_=drop).",
+    )
+)
+CACHE_OPERATIONS = REGISTRY.register(
+    Counter(
+        "cache_operations_total",
+        "Read-through cache lookups and evictions by result (hits, misses, evictions).",
+        ("result",),
+    )
+)
+
+
+def pool_collector(pool) -> Callable[[], None]:
+    """Collects the connection counts of a SQLAlchemy `QueuePool`."""
+
+    def collect() -> None:
+        DB_POOL.set(pool.size(), "size")
+        DB_POOL.set(pool.checkedout(), "checked_out")
+        DB_POOL.set(pool.checkedin(), "checked_in")
+        # Negative while the pool itself has not been filled yet
+        DB_POOL.set(max(pool.overflow(), 0), "overflow")
+
+    return collect
+
+
+def thread_limiter_collector() -> None:
+    """Collects the utilization of the anyio default thread limiter (in the event loop)."""
+    limiter = to_thread.current_default_thread_limiter()
+    THREAD_LIMITER.set(limiter.borrowed_tokens, "borrowed")
+    THREAD_LIMITER.set(limiter.total_tokens, "total")
+
+
+def log_queue_collector(handler) -> Callable[[], None]:
+    """Collects the records dropped by a `BoundedQueueHandler`."""
+
+    def collect() -> None:
+        LOG_RECORDS_DROPPED.set(handler.dropped)
+
+    return collect
+
+
+def cache_collector(cache) -> Callable[[], None]:
+    """Collects the counters of a cache backend's `stats`."""
+
+    def collect() -> None:
+        for result, value in cache.stats.as_dict().items():
+            CACHE_OPERATIONS.set(value, result)
+
+    return collect
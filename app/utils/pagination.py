@@ -0,0 +1,112 @@
+"""This module contains the keyset (cursor) pagination helpers used by the list endpoints."""
+
+import base64
+import binascii
+import json
+from datetime import datetime, timezone
+from typing import Any, Generic, List, Optional, TypeVar
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(**position) -> str:
+    """Encodes the position of the last row of a page into an opaque cursor."""
+    payload = json.dumps(position, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decodes a cursor produced by `encode_cursor`, raising a 400 if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        position = None
+    if not isinstance(position, dict):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    return position
+
+
+def _cursor_value(position: dict, column: InstrumentedAttribute) -> Any:
+    value = position.get(column.key)
+    try:
+        if column.type.python_type is datetime and isinstance(value, str):
+            value = datetime.fromisoformat(value)
+            # The timestamp columns hold naive UTC datetimes
+            if value.tzinfo is not None:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            return value
+    except ValueError:
+        pass
+    # bool is an int subclass, but not a valid key
+    if (
+        column.type.python_type is int
+        and isinstance(value, int)
+        and not isinstance(value, bool)
+    ):
+        return value
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+    )
+
+
+async def keyset_paginate(
+    db: AsyncSession,
+    statement: Select,
+    key: InstrumentedAttribute,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    sort_key: Optional[InstrumentedAttribute] = None,
+    descending: bool = False,
+) -> tuple[list, Optional[str]]:
+    """
+    Runs `statement` as one page ordered by the unique integer column `key`.
+
+    Rows are selected with `key > :last_seen ORDER BY key LIMIT :limit + 1`, so every
+    page is an index range scan no matter how deep it is. The extra row only tells
+    whether a next page exists.
+
+    With a `sort_key` (an integer or datetime column), rows are ordered by it first
+    and `key` only breaks the ties: the page condition becomes the row comparison
+    `(sort_key, key) > (:sort_key, :key)`, matched by an index on both columns.
+    `descending` reverses the order.
+
+    Returns:
+        tuple: The rows of the page and the cursor of the next page (None on the last page).
+    """
+    columns = (key,) if sort_key is None else (sort_key, key)
+    if cursor is not None:
+        position = decode_cursor(cursor)
+        last_seen = [_cursor_value(position, column) for column in columns]
+        bound = tuple_(*columns) if len(columns) > 1 else key
+        last_seen = tuple_(*last_seen) if len(columns) > 1 else last_seen[0]
+        statement = statement.where(
+            bound < last_seen if descending else bound > last_seen
+        )
+
+    order_by = [column.desc() if descending else column for column in columns]
+    result = await db.execute(statement.order_by(*order_by).limit(limit + 1))
+    rows = result.scalars().all()
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(
+        **{column.key: getattr(rows[-1], column.key) for column in columns}
+    )
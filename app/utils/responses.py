@@ -0,0 +1,72 @@
+"""This module contains the response of the endpoints returning already validated models."""
+
+from typing import Any, Optional
+
+import anyio
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+def render_json(content: Any) -> bytes:
+    """Serializes a Pydantic model or plain JSON types to JSON bytes."""
+    if isinstance(content, BaseModel):
+        # The serializer of the model itself, faster than inferring its type
+        return content.__pydantic_serializer__.to_json(content)
+    return to_json(content)
+
+
+class ModelResponse(Response):
+    """
+    JSON response of a content that needs no validation: Pydantic models built by
+    the services, plain JSON types, or bytes already serialized by `render_json`.
+
+    Returning a `Response` makes FastAPI skip the `response_model` of the route
+    (which is still used by the OpenAPI schema), so the content is neither validated
+    nor converted to a dict again: Pydantic serializes it once, straight to bytes.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return render_json(content)
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    Streaming response closing its body iterator however the stream ends.
+
+    When the client disconnects, Starlette cancels the task sending the body but
+    leaves the iterator suspended at its `yield`: its cleanup (e.g. returning a
+    database connection) would only run when it is garbage collected.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+
+def model_response(
+    content: Any, response: Response, status_code: Optional[int] = None
+) -> ModelResponse:
+    """
+    Builds the `ModelResponse` of an endpoint, with the headers and cookies set by the
+    dependencies on its `response` parameter (which FastAPI only merges into the
+    responses it builds itself).
+    """
+    result = ModelResponse(
+        content, status_code=status_code or response.status_code or 200
+    )
+    result.raw_headers.extend(dependency_headers(response))
+    return result
+
+
+def dependency_headers(response: Response) -> list:
+    """The headers set by the dependencies on the `response` parameter of an endpoint."""
+    return [header for header in response.raw_headers if header[0] != b"content-length"]
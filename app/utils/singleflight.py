@@ -0,0 +1,128 @@
+"""This module contains the coalescing of concurrent identical reads (single-flight)."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from fastapi import Request
+from pydantic import BaseModel
+
+from app.utils.metrics import COALESCED_REQUESTS
+from app.utils.responses import render_json
+
+
+class Flight:
+    """
+    The result of a fetch, shared by the coalesced requests, and its JSON body.
+
+    The body is only rendered when a request sends it (not for a 304 answered from
+    the ETag of `value`), then kept for the other requests of the flight.
+    """
+
+    __slots__ = ("value", "_body")
+
+    def __init__(self, value: BaseModel) -> None:
+        self.value = value
+        self._body: Optional[bytes] = None
+
+    @property
+    def body(self) -> bytes:
+        if self._body is None:
+            self._body = render_json(self.value)
+        return self._body
+
+
+# Called by the endpoints with their fetch, returns its (possibly shared) flight
+Coalesce = Callable[[Callable[[], Awaitable[BaseModel]]], Awaitable[Flight]]
+
+
+async def fly(fetch: Callable[[], Awaitable[BaseModel]]) -> Flight:
+    """Runs the fetch of a request that is not coalesced."""
+    return Flight(await fetch())
+
+
+class SingleFlight:
+    """
+    Shares one execution of a fetch between the concurrent calls with the same key.
+
+    The first call runs the fetch; the calls arriving while it runs wait for it and
+    get the same `Flight` (or exception) instead of querying the database again, and
+    share its body once rendered. When the first call is cancelled (the client
+    disconnected), one of the waiting calls runs the fetch instead.
+
+    A successful result can also be returned for `stale` seconds after it
+    completed, trading that much staleness for fewer fetches. The coalescing is
+    per worker process.
+
+    Args:
+        name: Name of the coalesced route, labelling the metrics.
+        stale: How long a completed result is still returned (0: only while in flight).
+        max_entries: Maximum number of completed results kept for the stale window.
+    """
+
+    def __init__(self, name: str, stale: float = 0.0, max_entries: int = 1000) -> None:
+        self.name = name
+        self.stale = stale
+        self.max_entries = max_entries
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._recent: OrderedDict[str, tuple[float, Flight]] = OrderedDict()
+
+    async def do(self, key: str, fetch: Callable[[], Awaitable[BaseModel]]) -> Flight:
+        recent = self._recent.get(key)
+        if recent is not None:
+            if recent[0] > time.monotonic():
+                COALESCED_REQUESTS.inc(self.name, "stale")
+                return recent[1]
+            del self._recent[key]
+
+        while key in self._in_flight:
+            flight, error = await asyncio.shield(self._in_flight[key])
+            if error is not None:
+                COALESCED_REQUESTS.inc(self.name, "coalesced")
+                raise error
+            if flight is not None:
+                COALESCED_REQUESTS.inc(self.name, "coalesced")
+                return flight
+            # The call running the fetch was cancelled: run it again
+
+        COALESCED_REQUESTS.inc(self.name, "executed")
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        # (flight, error) given to the waiting calls; (None, None) if cancelled
+        outcome: tuple[Optional[Flight], Optional[Exception]] = (None, None)
+        try:
+            flight = await fly(fetch)
+            outcome = (flight, None)
+        except Exception as error:
+            outcome = (None, error)
+            raise
+        finally:
+            del self._in_flight[key]
+            future.set_result(outcome)
+        if self.stale > 0:
+            self._remember(key, flight)
+        return flight
+
+    def _remember(self, key: str, flight: Flight) -> None:
+        now = time.monotonic()
+        self._recent[key] = (now + self.stale, flight)
+        self._recent.move_to_end(key)
+        while self._recent:
+            oldest_key, (expires_at, _) = next(iter(self._recent.items()))
+            if expires_at > now and len(self._recent) <= self.max_entries:
+                break
+            del self._recent[oldest_key]
+
+
+def request_key(request: Request) -> str:
+    """Key of the identical requests of a route: its path and sorted query parameters."""
+    query = "&".join(
+        f"{name}={value}" for name, value in sorted(request.query_params.multi_items())
+    )
+    return f"{request.url.path}?{query}"
+
+
+def build_single_flights(routes: dict) -> dict[str, SingleFlight]:
+    """The single-flight groups of `COALESCE_ROUTES_`: endpoint name -> stale seconds."""
+    return {name: SingleFlight(name, float(stale)) for name, stale in routes.items()}
@@ -0,0 +1,210 @@
+"""
+Helpers shared by the benchmark suites: the seeded database, the timing statistics
+and the JSON results (saving a baseline and comparing a run against it).
+"""
+
+import json
+import logging
+import math
+import platform
+import statistics
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.todos.models import Todo as TodoModel
+from app.api.users.models import User as UserModel
+from app.database.config import DBBase
+from app.utils.logger import logger
+
+# Metrics compared against the baseline, and whether higher values are better
+COMPARED_METRICS = {"ops_per_s": True, "p50_ms": False, "p95_ms": False}
+
+
+def discard_logs() -> None:
+    """Drops the application logs (and the DEBUG logs of the database drivers)."""
+    logger.handlers = [logging.NullHandler()]
+    logger.setLevel(logging.WARNING)
+
+
+def add_database_arguments(parser) -> None:
+    parser.add_argument(
+        "--url", help="Async SQLAlchemy URL (default: temporary SQLite database)"
+    )
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--todos-per-user", type=int, default=50)
+
+
+def add_results_arguments(parser) -> None:
+    parser.add_argument("--save", type=Path, help="Write the results to this JSON file")
+    parser.add_argument(
+        "--compare", type=Path, help="Compare the results with this baseline JSON file"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="Change (in %%) of a compared metric reported as a regression",
+    )
+
+
+@asynccontextmanager
+async def seeded_database(url: Optional[str], users: int, todos_per_user: int):
+    """
+    Creates and seeds the schema, yielding an async session factory bound to it.
+
+    The URL defaults to a throwaway SQLite file. With a `postgresql+asyncpg://` URL,
+    the tables are created in (and dropped from) that database, so use a scratch one.
+    """
+    tmp_file = None
+    if url is None:
+        tmp_file = Path(tempfile.gettempdir()) / f"fapoc-benchmark-{time.time_ns()}.db"
+        url = f"sqlite+aiosqlite:///{tmp_file}"
+    engine = create_async_engine(url)
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(DBBase.metadata.create_all)
+            await seed(connection, users, todos_per_user)
+        yield async_sessionmaker(bind=engine, autoflush=False)
+    finally:
+        async with engine.begin() as connection:
+            await connection.run_sync(DBBase.metadata.drop_all)
+        await engine.dispose()
+        if tmp_file is not None:
+            tmp_file.unlink(missing_ok=True)
+
+
+async def seed(connection, users: int, todos_per_user: int) -> None:
+    # Ids are left to the database, so its sequences stay usable by the writes
+    now = datetime.now(timezone.utc)
+    await connection.execute(
+        insert(UserModel.__table__),
+        [
+            {
+                "name": f"user {user_id}",
+                "email": f"user{user_id}@example.com",
+                "created_at": now,
+                "updated_at": now,
+            }
+            for user_id in range(1, users + 1)
+        ],
+    )
+    user_ids = (await connection.scalars(select(UserModel.id))).all()
+    await connection.execute(
+        insert(TodoModel.__table__),
+        [
+            {
+                "title": f"todo {nth}",
+                "description": None,
+                "done": nth % 3 == 0,
+                "created_at": now,
+                "updated_at": now,
+                "user_id": user_id,
+            }
+            for nth in range(todos_per_user)
+            for user_id in user_ids
+        ],
+    )
+
+
+async def todo_keys(session_factory) -> list[tuple[int, int]]:
+    """The (todo id, user id) pairs of the seeded todos."""
+    async with session_factory() as db:
+        result = await db.execute(select(TodoModel.id, TodoModel.user_id))
+        return [tuple(row) for row in result]
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def summarize(timings: list[float], elapsed: Optional[float] = None) -> dict:
+    """
+    Statistics of a list of timings, in seconds.
+
+    `elapsed` is the wall time of the whole run, when the timed operations
+    overlapped (concurrent requests); the throughput is derived from it.
+    """
+    timings = sorted(timings)
+    elapsed = sum(timings) if elapsed is None else elapsed
+    return {
+        "count": len(timings),
+        "ops_per_s": len(timings) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(timings) * 1000,
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p95_ms": percentile(timings, 95) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000,
+    }
+
+
+def save_results(path: Path, suite: str, options: dict, results: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = {
+        "suite": suite,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "options": options,
+        "results": results,
+    }
+    path.write_text(json.dumps(document, indent=2) + "\n")
+
+
+def print_results(results: dict) -> None:
+    print(
+        f"  {'':<36} {'ops/s':>10} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)"
+    )
+    for name, result in results.items():
+        print(
+            f"  {name:<36} {result['ops_per_s']:>10.1f} {result['mean_ms']:>9.3f} "
+            f"{result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f} {result['p99_ms']:>9.3f}"
+        )
+
+
+def compare_results(baseline_path: Path, results: dict, threshold: float) -> int:
+    """
+    Prints the change of the compared metrics against a baseline file.
+
+    Returns:
+        int: The number of metrics that regressed by more than `threshold` percent.
+    """
+    baseline = json.loads(baseline_path.read_text())["results"]
+    regressions = 0
+    print(f"\nCompared with {baseline_path} (regression threshold {threshold:.0f}%)")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"  {name:<36} (not in baseline)")
+            continue
+        changes = []
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before, after = baseline[name][metric], result[metric]
+            change = (after - before) / before * 100 if before else 0.0
+            regressed = (-change if higher_is_better else change) > threshold
+            regressions += regressed
+            changes.append(f"{metric} {change:+6.1f}%{' !' if regressed else '  '}")
+        print(f"  {name:<36} " + "  ".join(changes))
+    return regressions
+
+
+def report(args, suite: str, results: dict) -> int:
+    """Prints, saves and compares the results; returns the process exit code."""
+    print_results(results)
+    if args.save:
+        options = {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+            if key not in ("save", "compare", "threshold")
+        }
+        save_results(args.save, suite, options, results)
+        print(f"\nResults written to {args.save}")
+    if args.compare:
+        return 1 if compare_results(args.compare, results, args.threshold) else 0
+    return 0
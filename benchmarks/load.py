@@ -0,0 +1,149 @@
+"""
+In-process load generator: sends concurrent requests to the application built by
+`create_app()` and reports the throughput and latency percentiles of every route.
+
+Requests go through an httpx AsyncClient on an ASGI transport (no network, no
+server), with the full middleware stack, against a seeded database. Every route is
+loaded on its own by `--concurrency` clients until `--requests` requests were sent.
+
+Usage:
+    python -m benchmarks.load [--url URL] [--concurrency N] [--requests N]
+        [--route NAME ...] [--save FILE] [--compare FILE]
+
+The URL defaults to a throwaway SQLite file; pass a `postgresql+asyncpg://` URL to
+run against a local PostgreSQL database (its tables are dropped when done).
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from httpx import ASGITransport, AsyncClient
+
+from app import API_PREFIX, create_app
+from app.core.config import get_app_config
+from app.utils.dependencies import get_db
+
+from .common import (
+    add_database_arguments,
+    add_results_arguments,
+    discard_logs,
+    report,
+    seeded_database,
+    summarize,
+    todo_keys,
+)
+
+# Route name -> function building the (method, path, json body) of a request from
+# a random seeded (todo id, user id) pair.
+ROUTES = {
+    "GET /users": lambda todo_id, user_id: ("GET", "/users", None),
+    "GET /user/{user_id}": lambda todo_id, user_id: ("GET", f"/user/{user_id}", None),
+    "GET /users/{user_id}/todos": lambda todo_id, user_id: (
+        "GET",
+        f"/users/{user_id}/todos",
+        None,
+    ),
+    "GET /users/{user_id}/todos/{todo_id}": lambda todo_id, user_id: (
+        "GET",
+        f"/users/{user_id}/todos/{todo_id}",
+        None,
+    ),
+    "POST /users/{user_id}/todos": lambda todo_id, user_id: (
+        "POST",
+        f"/users/{user_id}/todos",
+        {"title": "benchmark"},
+    ),
+    "PUT /users/{user_id}/todos/{todo_id}": lambda todo_id, user_id: (
+        "PUT",
+        f"/users/{user_id}/todos/{todo_id}",
+        {"done": True},
+    ),
+}
+
+
+async def load_route(client, build_request, keys, concurrency: int, requests: int):
+    timings = []
+    errors = 0
+    shed = 0
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining, errors, shed
+        while remaining > 0:
+            remaining -= 1
+            method, path, body = build_request(*random.choice(keys))
+            while True:
+                start = time.perf_counter()
+                response = await client.request(method, path, json=body)
+                if response.status_code != 503 or "retry-after" not in response.headers:
+                    break
+                # Shed by the admission control: back off like a well-behaved client
+                shed += 1
+                await asyncio.sleep(float(response.headers["retry-after"]))
+            timings.append(time.perf_counter() - start)
+            errors += response.status_code >= 400
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = summarize(timings, time.perf_counter() - start)
+    result["errors"] = errors
+    result["shed"] = shed
+    return result
+
+
+async def run(args) -> dict:
+    async with seeded_database(args.url, args.users, args.todos_per_user) as sessions:
+        keys = await todo_keys(sessions)
+
+        async def override_get_db():
+            async with sessions() as db:
+                yield db
+
+        app = create_app()
+        app.dependency_overrides[get_db] = override_get_db
+        base_url = f"http://benchmark{API_PREFIX}/{get_app_config().API_VERSION_}"
+        results = {}
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=base_url
+        ) as client:
+            for name in args.route or ROUTES:
+                build_request = ROUTES[name]
+                # Warm up the route (connections, caches) before measuring it
+                await load_route(client, build_request, keys, args.concurrency, 50)
+                results[name] = await load_route(
+                    client, build_request, keys, args.concurrency, args.requests
+                )
+        return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_database_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument(
+        "--route",
+        action="append",
+        choices=list(ROUTES),
+        help="Route to load (repeatable; default: all)",
+    )
+    add_results_arguments(parser)
+    args = parser.parse_args()
+
+    discard_logs()
+    results = asyncio.run(run(args))
+    print(f"{args.requests} requests per route, {args.concurrency} concurrent clients")
+    exit_code = report(args, "load", results)
+    for name, result in results.items():
+        if result["errors"]:
+            print(f"  {name}: {result['errors']} error responses")
+        if result["shed"]:
+            print(f"  {name}: {result['shed']} requests shed and retried")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Compares the per-request overhead of the pure ASGI `LogMiddleware` with the previous
+`BaseHTTPMiddleware` based implementation, and measures the `MetricsMiddleware`.
+
+Requests are sent straight to the ASGI application (no network, no HTTP client) for
+a small JSON response and a streamed response, so the timings only contain the
+routing, the endpoint and the middleware. Log records are created as usual but
+discarded by a NullHandler.
+
+Usage:
+    python -m benchmarks.log_middleware [--requests N] [--sample-rate N]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from app.middleware.logger import LogMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.utils.logger import logger
+
+
+class LegacyLogMiddleware(BaseHTTPMiddleware):
+    """The `BaseHTTPMiddleware` implementation LogMiddleware replaced."""
+
+    async def dispatch(self, request, call_next) -> Response:
+        response = await call_next(request)
+        logger.info(
+            "Incoming request",
+            extra={
+                "req": {"method": request.method, "url": str(request.url)},
+                "res": {
+                    "status_code": response.status_code,
+                },
+            },
+        )
+        return response
+
+
+async def json_endpoint(request):
+    return JSONResponse({"id": 1, "title": "todo", "done": False})
+
+
+async def stream_endpoint(request):
+    async def chunks():
+        for _ in range(20):
+            yield b"x" * 512
+
+    return StreamingResponse(chunks())
+
+
+def build_app(middleware=None, **options) -> Starlette:
+    app = Starlette(
+        routes=[Route("/json", json_endpoint), Route("/stream", stream_endpoint)]
+    )
+    if middleware is not None:
+        app.add_middleware(middleware, **options)
+    return app
+
+
+async def call(app, path: str) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if request_sent:
+            # Like a server, block until the client disconnects (never, here)
+            await asyncio.Event().wait()
+        request_sent = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def run(app, path: str, requests: int) -> float:
+    for _ in range(min(requests, 200)):
+        await call(app, path)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, path)
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--sample-rate", type=int, default=10)
+    args = parser.parse_args()
+
+    logger.handlers = [logging.NullHandler()]
+    logger.setLevel(logging.INFO)
+
+    apps = {
+        "no middleware": build_app(),
+        "BaseHTTPMiddleware (legacy)": build_app(LegacyLogMiddleware),
+        "LogMiddleware": build_app(LogMiddleware),
+        f"LogMiddleware 1/{args.sample_rate}": build_app(
+            LogMiddleware, sample_rate=args.sample_rate
+        ),
+        "MetricsMiddleware": build_app(MetricsMiddleware),
+    }
+
+    print(f"{args.requests} sequential requests per case, mean us/request")
+    for path in ("/json", "/stream"):
+        print(f"\n== GET {path}")
+        baseline = None
+        for name, app in apps.items():
+            elapsed = await run(app, path, args.requests)
+            baseline = elapsed if baseline is None else baseline
+            print(f"  {name:<30} {elapsed:8.1f}us  (+{elapsed - baseline:.1f}us)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
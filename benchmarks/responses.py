@@ -0,0 +1,138 @@
+"""
+Compares the serialization of a `GET /users` page (users with their embedded todos)
+by FastAPI's `response_model`, which validates the returned model again before
+serializing it, with the `ModelResponse` returned by the endpoints, which only
+serializes it once.
+
+Both endpoints return the same prebuilt `Page[User]` and requests are sent straight
+to the ASGI application (no database, no network), so the timings only contain the
+routing, the endpoint and the response. The work of `response_model` depends on the
+FastAPI version: the locked one (0.111) converts the validated model with
+`jsonable_encoder` then `json.dumps`, recent ones serialize it with
+`TypeAdapter.dump_json`; both are also timed on their own.
+
+Usage:
+    python -m benchmarks.responses [--requests N] [--users N] [--todos-per-user N]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+
+import fastapi
+from fastapi import FastAPI, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.api.todos.schemas import Todo
+from app.api.users.schemas import User
+from app.utils.pagination import Page
+from app.utils.responses import ModelResponse, model_response
+
+from .log_middleware import call
+
+
+def build_page(users: int, todos_per_user: int) -> Page[User]:
+    now = datetime.now(timezone.utc)
+    return Page[User](
+        items=[
+            User(
+                id=user_id,
+                name=f"User {user_id}",
+                email=f"user{user_id}@example.com",
+                created_at=now,
+                updated_at=now,
+                todos=[
+                    Todo(
+                        id=user_id * todos_per_user + i,
+                        title=f"Todo {i}",
+                        description="benchmark",
+                        done=i % 2 == 0,
+                        created_at=now,
+                        updated_at=now,
+                        user_id=user_id,
+                    )
+                    for i in range(todos_per_user)
+                ],
+            )
+            for user_id in range(users)
+        ],
+        next_cursor="MTA",
+    )
+
+
+def build_app(page: Page[User]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/response_model", response_model=Page[User])
+    async def with_response_model() -> Page[User]:
+        return page
+
+    @app.get("/model_response", response_model=Page[User])
+    async def with_model_response(response: Response) -> Response:
+        return model_response(page, response)
+
+    return app
+
+
+def measure(serialize, runs: int) -> float:
+    for _ in range(min(runs, 200)):
+        serialize()
+    start = time.perf_counter()
+    for _ in range(runs):
+        serialize()
+    return (time.perf_counter() - start) / runs * 1_000_000
+
+
+async def run(app, path: str, requests: int) -> float:
+    for _ in range(min(requests, 200)):
+        await call(app, path)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, path)
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--todos-per-user", type=int, default=10)
+    args = parser.parse_args()
+
+    page = build_page(args.users, args.todos_per_user)
+    app = build_app(page)
+    adapter = TypeAdapter(Page[User])
+
+    print(
+        f"{args.requests} sequential runs per case, mean us/run "
+        f"({args.users} users x {args.todos_per_user} todos)"
+    )
+    print(f"\n== Requests (FastAPI {fastapi.__version__})")
+    baseline = None
+    for path in ("/response_model", "/model_response"):
+        elapsed = await run(app, path, args.requests)
+        baseline = elapsed if baseline is None else baseline
+        print(f"  GET {path:<36} {elapsed:8.1f}us  ({elapsed / baseline:.2f}x)")
+
+    print("\n== Serialization")
+    cases = {
+        "response_model (FastAPI 0.111)": lambda: json.dumps(
+            jsonable_encoder(adapter.validate_python(page))
+        ).encode(),
+        "response_model (recent FastAPI)": lambda: adapter.dump_json(
+            adapter.validate_python(page)
+        ),
+        "ModelResponse": lambda: ModelResponse(page),
+    }
+    baseline = None
+    for name, serialize in cases.items():
+        elapsed = measure(serialize, args.requests)
+        baseline = elapsed if baseline is None else baseline
+        print(f"  {name:<40} {elapsed:8.1f}us  ({elapsed / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Micro-benchmarks of the `UserService`/`TodoService` methods and of the Pydantic
+serialization of their results.
+
+Every case is called sequentially on a seeded database and timed individually; the
+reads pick a random seeded user/todo on each call.
+
+Usage:
+    python -m benchmarks.services [--url URL] [--runs N] [--save FILE] [--compare FILE]
+
+The URL defaults to a throwaway SQLite file; pass a `postgresql+asyncpg://` URL to
+run against a local PostgreSQL database (its tables are dropped when done).
+"""
+
+import argparse
+import asyncio
+import inspect
+import random
+import sys
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from app.api.todos.schemas import TodoCreate, TodoUpdate
+from app.api.todos.services import TodoService
+from app.api.users.services import UserService
+from app.api.users.schemas import User
+from app.utils.pagination import Page
+
+from .common import (
+    add_database_arguments,
+    add_results_arguments,
+    discard_logs,
+    report,
+    seeded_database,
+    summarize,
+    todo_keys,
+)
+
+
+async def measure(call, runs: int) -> dict:
+    """Times `runs` sequential calls of `call` (a function or a coroutine function)."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = call()
+        if inspect.isawaitable(result):
+            await result
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+async def run(args) -> dict:
+    async with seeded_database(args.url, args.users, args.todos_per_user) as sessions:
+        keys = await todo_keys(sessions)
+        async with sessions() as db:
+            users = UserService(db)
+            todos = TodoService(db)
+            user_page = await users.get_users(limit=args.page_size)
+            user = await users.get_user(keys[0][1])
+
+            async def get_user():
+                _, user_id = random.choice(keys)
+                await users.get_user(user_id)
+
+            async def get_todo_by_id():
+                todo_id, user_id = random.choice(keys)
+                await todos.get_todo_by_id(todo_id, user_id)
+
+            async def get_todo_by_user_id():
+                _, user_id = random.choice(keys)
+                await todos.get_todo_by_user_id(user_id, limit=args.page_size)
+
+            async def create_todo():
+                _, user_id = random.choice(keys)
+                await todos.create_todo(TodoCreate(title="benchmark"), user_id)
+
+            async def update_todo():
+                todo_id, user_id = random.choice(keys)
+                await todos.update_todo(todo_id, TodoUpdate(done=True), user_id)
+
+            user_json = user_page.model_dump_json()
+            cases = {
+                "UserService.get_user": get_user,
+                "UserService.get_users": lambda: users.get_users(limit=args.page_size),
+                "TodoService.get_todo_by_id": get_todo_by_id,
+                "TodoService.get_todo_by_user_id": get_todo_by_user_id,
+                "TodoService.create_todo": create_todo,
+                "TodoService.update_todo": update_todo,
+                "User.model_dump_json": user.model_dump_json,
+                "User jsonable_encoder": lambda: jsonable_encoder(user),
+                "Page[User].model_dump_json": user_page.model_dump_json,
+                "Page[User] jsonable_encoder": lambda: jsonable_encoder(user_page),
+                "Page[User].model_validate_json": lambda: Page[
+                    User
+                ].model_validate_json(user_json),
+            }
+            results = {}
+            for name, call in cases.items():
+                await measure(call, min(args.runs, 50))  # warm up
+                results[name] = await measure(call, args.runs)
+            return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_database_arguments(parser)
+    parser.add_argument("--runs", type=int, default=1_000)
+    parser.add_argument("--page-size", type=int, default=10)
+    add_results_arguments(parser)
+    args = parser.parse_args()
+
+    discard_logs()
+    results = asyncio.run(run(args))
+    print(f"{args.runs} sequential calls per case")
+    return report(args, "services", results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Compares the query plans and latencies of the todo lookups before and after
+revision c7b00aaa42a0 (todos(user_id, id) index, duplicate title index removed).
+
+The schema is built with the Alembic migrations at the initial revision, seeded,
+and every lookup is explained and timed. The database is then upgraded to head
+and the same lookups are explained and timed again.
+
+Usage:
+    python -m benchmarks.todo_index_plans [--url URL] [--users N] [--todos-per-user M] [--runs K]
+
+The URL defaults to a throwaway SQLite file; pass a `postgresql://` URL to compare
+the plans on a local PostgreSQL database (its tables are dropped when done).
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from sqlalchemy import create_engine, insert, text
+
+from app.api.todos.models import Todo as TodoModel
+from app.api.users.models import User as UserModel
+
+ROOT = Path(__file__).resolve().parent.parent
+INITIAL_REVISION = "562f8281d2ff"
+
+LOOKUPS = {
+    "todo by id and user": (
+        "SELECT * FROM todos WHERE id = :todo_id AND user_id = :user_id"
+    ),
+    "first todos page of user": (
+        "SELECT * FROM todos WHERE user_id = :user_id ORDER BY id LIMIT 11"
+    ),
+    "next todos page of user": (
+        "SELECT * FROM todos WHERE user_id = :user_id AND id > :after_id "
+        "ORDER BY id LIMIT 11"
+    ),
+}
+
+
+def migrate(connection, revision: str, downgrade: bool = False) -> None:
+    # Alembic must own the transaction for the autocommit (CONCURRENTLY) blocks.
+    connection.commit()
+    alembic_config = AlembicConfig(str(ROOT / "alembic.ini"))
+    alembic_config.set_main_option("script_location", str(ROOT / "alembic"))
+    alembic_config.attributes["connection"] = connection
+    if downgrade:
+        command.downgrade(alembic_config, revision)
+    else:
+        command.upgrade(alembic_config, revision)
+    connection.commit()
+
+
+def seed(connection, users: int, todos_per_user: int) -> None:
+    now = datetime.now(timezone.utc)
+    connection.execute(
+        insert(UserModel.__table__),
+        [
+            {
+                "id": user_id,
+                "name": f"user {user_id}",
+                "email": f"user{user_id}@example.com",
+                "created_at": now,
+                "updated_at": now,
+            }
+            for user_id in range(1, users + 1)
+        ],
+    )
+    # Todos are inserted round-robin across users, like real traffic, so the
+    # rows of one user are spread over the whole table.
+    todo_id = 0
+    for _ in range(todos_per_user):
+        rows = []
+        for user_id in range(1, users + 1):
+            todo_id += 1
+            rows.append(
+                {
+                    "id": todo_id,
+                    "title": f"todo {todo_id}",
+                    "description": None,
+                    "done": todo_id % 3 == 0,
+                    "created_at": now,
+                    "updated_at": now,
+                    "user_id": user_id,
+                }
+            )
+        connection.execute(insert(TodoModel.__table__), rows)
+    connection.execute(text("ANALYZE"))
+    connection.commit()
+
+
+def explain(connection, statement: str, params: dict) -> list[str]:
+    if connection.dialect.name == "sqlite":
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {statement}"), params)
+        return [row[-1] for row in rows]
+    rows = connection.execute(text(f"EXPLAIN {statement}"), params)
+    return [row[0] for row in rows]
+
+
+def lookup_params(users: int, todos_per_user: int) -> dict:
+    user_id = random.randint(1, users)
+    nth = random.randint(0, todos_per_user - 1)
+    return {
+        "user_id": user_id,
+        "todo_id": nth * users + user_id,
+        "after_id": nth * users + user_id,
+    }
+
+
+def measure(connection, users: int, todos_per_user: int, runs: int) -> dict:
+    report = {}
+    for name, statement in LOOKUPS.items():
+        plan = explain(connection, statement, lookup_params(users, todos_per_user))
+        timings = []
+        for _ in range(runs):
+            params = lookup_params(users, todos_per_user)
+            start = time.perf_counter()
+            connection.execute(text(statement), params).all()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        report[name] = {
+            "plan": plan,
+            "mean_ms": statistics.fmean(timings),
+            "p95_ms": timings[int(len(timings) * 0.95) - 1],
+        }
+    return report
+
+
+def print_report(before: dict, after: dict) -> None:
+    for name in LOOKUPS:
+        print(f"\n== {name}")
+        for label, report in (("before", before), ("after", after)):
+            result = report[name]
+            print(
+                f"  {label:<6} mean={result['mean_ms']:.3f}ms p95={result['p95_ms']:.3f}ms"
+            )
+            for line in result["plan"]:
+                print(f"         {line}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="Sync SQLAlchemy URL (default: temporary SQLite)")
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--todos-per-user", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        url = args.url or f"sqlite:///{Path(tmp_dir) / 'todo_index_plans.db'}"
+        engine = create_engine(url)
+        with engine.connect() as connection:
+            migrate(connection, INITIAL_REVISION)
+            try:
+                seed(connection, args.users, args.todos_per_user)
+                before = measure(connection, args.users, args.todos_per_user, args.runs)
+                migrate(connection, "head")
+                connection.execute(text("ANALYZE"))
+                connection.commit()
+                after = measure(connection, args.users, args.todos_per_user, args.runs)
+            finally:
+                connection.rollback()
+                migrate(connection, "base", downgrade=True)
+        engine.dispose()
+
+    print(
+        f"{engine.dialect.name}: {args.users} users x {args.todos_per_user} todos, "
+        f"{args.runs} runs per lookup"
+    )
+    print_report(before, after)
+
+
+if __name__ == "__main__":
+    main()
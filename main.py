@@ -8,13 +8,19 @@ app_config = get_app_config()
 app = create_app()
 
 if __name__ == "__main__":
-    import uvicorn
+    import argparse
 
-    # Run the application using Uvicorn ASGI server
-    uvicorn.run(
-        app="main:app",  # The application instance to run
-        host=app_config.APP_HOST_,  # Host address to bind the server
-        port=app_config.APP_PORT_,  # Port number to bind the server
-        log_config=None,  # Logging configuration (None to use default)
-        reload=True,  # Enable auto-reload for code changes
+    from app.core.server import run_development, run_production
+
+    parser = argparse.ArgumentParser(description="Run the application with Uvicorn")
+    parser.add_argument(
+        "--production",
+        action="store_true",
+        help="one worker per CPU core and graceful shutdown, instead of auto-reload",
     )
+
+    # Run the application using Uvicorn ASGI server
+    if parser.parse_args().production:
+        run_production()
+    else:
+        run_development()
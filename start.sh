@@ -4,4 +4,4 @@
 alembic upgrade head
 
 # Start the server
-python main.py
\ No newline at end of file
+exec python main.py --production
\ No newline at end of file
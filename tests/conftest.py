@@ -1,16 +1,25 @@
+import os
+from contextlib import contextmanager
+
 import pytest
-from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
 from testcontainers.core.waiting_utils import wait_for_logs
 from testcontainers.postgres import PostgresContainer
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, clear_mappers
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import clear_mappers
 
+from app.core.config import get_app_config
 from app.database.config import DBBase
-from app.utils.dependencies import get_db
+from app.database.instrumentation import instrument_engine
+from app.utils.dependencies import get_db, get_read_sessionmaker
 from main import app
 
 Base = DBBase
 
+# Database backend used by the test suite: "sqlite" (aiosqlite, default) or "postgres"
+TEST_DB_BACKEND = os.getenv("TEST_DB_BACKEND", "sqlite")
+
 # Constants for PostgreSQL container configuration
 POSTGRES_IMAGE = "postgres:13"
 POSTGRES_USER = "postgres"
@@ -20,19 +29,27 @@ POSTGRES_CONTAINER_PORT = 5432
 
 
 @pytest.fixture(scope="session")
-def postgres_container() -> PostgresContainer:
+def database_url(tmp_path_factory) -> str:
     """
-    Fixture to setup and teardown a PostgreSQL container for testing.
+    Fixture to provide the async database URL used by the test suite.
+
+    A local aiosqlite database is used by default. Setting TEST_DB_BACKEND=postgres
+    runs the suite against a PostgreSQL container through asyncpg instead.
 
     Yields:
-        PostgresContainer: The running PostgreSQL container.
+        str: The SQLAlchemy async database URL.
     """
+    if TEST_DB_BACKEND != "postgres":
+        yield f"sqlite+aiosqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+        return
+
     postgres = PostgresContainer(
         image=POSTGRES_IMAGE,
         username=POSTGRES_USER,
         password=POSTGRES_PASSWORD,
         dbname=POSTGRES_DATABASE,
         port=POSTGRES_CONTAINER_PORT,
+        driver="asyncpg",
     )
     with postgres:
         wait_for_logs(
@@ -40,65 +57,115 @@ def postgres_container() -> PostgresContainer:
             r"UTC \[1\] LOG:  database system is ready to accept connections",
             10,
         )
-        yield postgres
+        yield postgres.get_connection_url()
 
 
 @pytest.fixture(scope="session")
-def engine(postgres_container):
+async def engine(database_url):
     """
-    Fixture to setup and teardown the SQLAlchemy engine.
+    Fixture to setup and teardown the SQLAlchemy async engine.
 
     Args:
-        postgres_container (PostgresContainer): The running PostgreSQL container.
+        database_url (str): The async database URL.
 
     Yields:
-        Engine: The SQLAlchemy engine connected to the PostgreSQL container.
+        AsyncEngine: The SQLAlchemy async engine connected to the test database.
     """
-    engine = create_engine(postgres_container.get_connection_url())
-    Base.metadata.create_all(engine)
+    engine = create_async_engine(database_url)
+    # Instrumented like the application engine, for the per-request query stats
+    instrument_engine(
+        engine.sync_engine, slow_query_ms=get_app_config().LOG_SLOW_QUERY_MS_
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
     yield engine
-    Base.metadata.drop_all(engine)
-    engine.dispose()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
 
 
 @pytest.fixture(scope="session")
-def db_session(engine):
+async def db_session(engine):
     """
-    Fixture to setup and teardown the SQLAlchemy session.
+    Fixture to setup and teardown the SQLAlchemy async session.
 
     Args:
-        engine (Engine): The SQLAlchemy engine.
+        engine (AsyncEngine): The SQLAlchemy async engine.
 
     Yields:
-        Session: The SQLAlchemy session.
+        AsyncSession: The SQLAlchemy async session.
     """
-    Session = sessionmaker(bind=engine)
+    Session = async_sessionmaker(bind=engine)
     session = Session()
     yield session
-    session.rollback()
-    session.close()
+    await session.rollback()
+    await session.close()
     clear_mappers()
 
 
+class QueryCounter:
+    """Collects the SQL statements emitted while a `query_counter` block is active."""
+
+    def __init__(self) -> None:
+        self.statements = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
 @pytest.fixture(scope="function")
-def test_client(db_session):
+def query_counter(engine):
     """
-    Fixture to setup and teardown the FastAPI test client.
+    Fixture to count the SQL statements sent to the database.
 
     Args:
-        db_session (Session): The SQLAlchemy session.
+        engine (AsyncEngine): The SQLAlchemy async engine.
+
+    Returns:
+        Callable: A context manager yielding a `QueryCounter`.
+    """
+
+    @contextmanager
+    def count_queries():
+        counter = QueryCounter()
+        event.listen(engine.sync_engine, "before_cursor_execute", counter)
+        try:
+            yield counter
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", counter)
+
+    return count_queries
+
+
+@pytest.fixture(scope="function")
+async def test_client(db_session):
+    """
+    Fixture to setup and teardown the async FastAPI test client.
+
+    Args:
+        db_session (AsyncSession): The SQLAlchemy async session.
 
     Yields:
-        TestClient: The FastAPI test client.
+        AsyncClient: The httpx client bound to the FastAPI application.
     """
 
-    def override_get_db():
+    async def override_get_db():
         try:
             yield db_session
         finally:
-            db_session.close()
+            await db_session.close()
 
     app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as client:
+    # Sessions of the streamed responses, on the same database
+    app.dependency_overrides[get_read_sessionmaker] = lambda: async_sessionmaker(
+        bind=db_session.bind
+    )
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
         yield client
     app.dependency_overrides.clear()
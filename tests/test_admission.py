@@ -0,0 +1,131 @@
+import asyncio
+
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.middleware.admission import AdaptiveLimit, AdmissionMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.utils.metrics import ADMISSION_REJECTED, HTTP_REQUESTS
+
+release = asyncio.Event()
+
+
+async def slow(request):
+    await release.wait()
+    return PlainTextResponse("ok")
+
+
+async def health(request):
+    return PlainTextResponse("ok")
+
+
+def build_client(max_limit: int = 2) -> AsyncClient:
+    app = Starlette(
+        routes=[
+            Route("/slow", slow, methods=["GET", "POST"]),
+            Route("/health", health),
+        ]
+    )
+    app.add_middleware(
+        AdmissionMiddleware,
+        min_limit=1,
+        max_limit=max_limit,
+        latency_target=1.0,
+        retry_after=2,
+        exempt_paths=("/health",),
+        routes=app.routes,
+    )
+    app.add_middleware(MetricsMiddleware)
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def test_adaptive_limit():
+    """
+    Test the AIMD adjustments of the concurrency limit.
+
+    Asserts:
+        - No request is admitted above the limit.
+        - A slow request lowers the limit once per latency target, down to the minimum.
+        - Fast requests raise it again, up to the maximum.
+    """
+    limit = AdaptiveLimit(min_limit=2, max_limit=4, latency_target=10, backoff=0.75)
+
+    assert [limit.try_acquire() for _ in range(5)] == [True] * 4 + [False]
+    limit.release(latency=11)
+    limit.release(latency=11)
+    assert limit.limit == 3
+    limit._decreased_at -= 10
+    limit.release(latency=0.1, failed=True)
+    assert limit.limit == 2.25
+    limit._decreased_at -= 10
+    limit.release(latency=11)
+    assert limit.limit == 2
+    assert limit.in_flight == 0
+
+    for _ in range(20):
+        admitted = sum(limit.try_acquire() for _ in range(limit.max_limit))
+        for _ in range(admitted):
+            limit.release(latency=0.1)
+    assert limit.limit == 4
+
+
+async def test_requests_above_the_limit_are_rejected():
+    """
+    Test that the middleware sheds the requests above the limit of their class.
+
+    Asserts:
+        - A read above the limit gets a 503 with a Retry-After header.
+        - Writes are limited separately from the reads.
+        - Exempt paths are always admitted.
+        - The slot is released once the admitted request completes.
+        - The rejection is counted with the template of the route it targeted.
+    """
+    release.clear()
+    rejected_before = ADMISSION_REJECTED.values.get(("/slow", "read"), 0)
+    requests_before = HTTP_REQUESTS.values.get(("GET", "/slow", 503), 0)
+    async with build_client() as client:
+        admitted = asyncio.create_task(client.get("/slow"))
+        await asyncio.sleep(0.05)
+        rejected = await client.get("/slow")
+        health = await client.get("/health")
+        write = asyncio.create_task(client.post("/slow"))
+        await asyncio.sleep(0.05)
+        release.set()
+        responses = await asyncio.gather(admitted, write)
+        after = await client.get("/slow")
+
+    assert rejected.status_code == 503
+    assert rejected.headers["retry-after"] == "2"
+    assert rejected.json() == {"detail": "Server overloaded, retry later"}
+    assert health.status_code == 200
+    assert [response.status_code for response in responses] == [200, 200]
+    assert after.status_code == 200
+    assert ADMISSION_REJECTED.values[("/slow", "read")] == rejected_before + 1
+    assert HTTP_REQUESTS.values[("GET", "/slow", 503)] == requests_before + 1
+
+
+async def test_classes_share_the_connections():
+    """
+    Test the limit of the requests of both classes together.
+
+    Asserts:
+        - A class is limited to the connections minus the minimum of the other one.
+        - Once all the connections are in use, a class below its own limit is
+          rejected as well.
+    """
+    release.clear()
+    async with build_client(max_limit=3) as client:
+        reads = [asyncio.create_task(client.get("/slow")) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        rejected_read = await client.get("/slow")
+        write = asyncio.create_task(client.post("/slow"))
+        await asyncio.sleep(0.05)
+        rejected_write = await client.post("/slow")
+        release.set()
+        responses = await asyncio.gather(*reads, write)
+
+    assert rejected_read.status_code == 503
+    assert rejected_write.status_code == 503
+    assert [response.status_code for response in responses] == [200] * 3
@@ -0,0 +1,139 @@
+import pytest
+
+from app.api.todos.schemas import TodoCreate, TodoUpdate
+from app.api.todos.services import TodoService
+from app.api.users.schemas import UserCreate, UserUpdate
+from app.api.users.services import UserService
+from app.utils.cache import MemoryCache, RedisCache
+from app.utils.common import unique_email
+
+
+USER_NAME = "Pancho Mancho"
+
+
+async def test_memory_cache_lru_eviction():
+    """
+    Test that the memory cache evicts the least recently used entry when full.
+
+    Asserts:
+        - A read refreshes the entry, so the other one is evicted.
+        - Hits, misses and evictions are counted.
+    """
+    cache = MemoryCache(max_entries=2)
+    await cache.set("a", b"1")
+    await cache.set("b", b"2")
+    assert await cache.get("a") == b"1"
+
+    await cache.set("c", b"3")
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == b"1"
+    assert len(cache) == 2
+    assert cache.stats.as_dict() == {"hits": 2, "misses": 1, "evictions": 1}
+
+
+async def test_memory_cache_ttl():
+    """
+    Test that the memory cache expires entries after their TTL.
+
+    Asserts:
+        - An expired entry is a miss and is removed.
+        - Deleted entries are misses.
+    """
+    cache = MemoryCache()
+    await cache.set("expired", b"1", ttl=0)
+    await cache.set("deleted", b"2")
+    await cache.delete("deleted")
+
+    assert await cache.get("expired") is None
+    assert await cache.get("deleted") is None
+    assert len(cache) == 0
+    assert cache.stats.misses == 2
+
+
+async def test_redis_cache():
+    """
+    Test the Redis cache backend against an in-process fake Redis server.
+
+    Asserts:
+        - Values are stored under the prefixed key with the TTL in milliseconds.
+        - Hits and misses are counted and deleted keys are gone.
+    """
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeAsyncRedis()
+    cache = RedisCache(client, ttl=30)
+
+    await cache.set("user:1", b"{}")
+    assert await cache.get("user:1") == b"{}"
+    assert 0 < await client.pttl("fapoc:user:1") <= 30000
+
+    await cache.delete("user:1")
+    assert await cache.get("user:1") is None
+    assert cache.stats.as_dict() == {"hits": 1, "misses": 1, "evictions": 0}
+
+
+async def test_get_user_is_cached(db_session, query_counter):
+    """
+    Test that a cached user is served without querying the database until updated.
+
+    Args:
+        db_session: The database session fixture.
+        query_counter: The statement counter fixture.
+
+    Asserts:
+        - The second read sends no statement to the database.
+        - The user is reloaded after an update.
+    """
+    user_service = UserService(db_session, MemoryCache())
+    user = await user_service.create_user(
+        UserCreate(name=USER_NAME, email=unique_email())
+    )
+
+    await user_service.get_user(user.id)
+    with query_counter() as counter:
+        cached_user = await user_service.get_user(user.id)
+
+    await user_service.update_user(user.id, UserUpdate(name="Updated"))
+    updated_user = await user_service.get_user(user.id)
+
+    assert counter.count == 0
+    assert cached_user == user
+    assert updated_user.name == "Updated"
+
+
+async def test_todo_writes_invalidate_the_cache(db_session, query_counter):
+    """
+    Test that the todo writes invalidate the cached todos and user of their owner.
+
+    Args:
+        db_session: The database session fixture.
+        query_counter: The statement counter fixture.
+
+    Asserts:
+        - Cached todo and todo list reads send no statement to the database.
+        - Creating a todo is visible in the user and todo list reads.
+        - Updating a todo is visible in the todo read.
+    """
+    cache = MemoryCache()
+    user_service = UserService(db_session, cache)
+    todo_service = TodoService(db_session, cache)
+    user = await user_service.create_user(
+        UserCreate(name=USER_NAME, email=unique_email())
+    )
+    todo = await todo_service.create_todo(TodoCreate(title="Todo 1"), user.id)
+
+    await todo_service.get_todo_by_id(todo.id, user.id)
+    await todo_service.get_todo_by_user_id(user.id)
+    await user_service.get_user(user.id)
+    with query_counter() as counter:
+        await todo_service.get_todo_by_id(todo.id, user.id)
+        await todo_service.get_todo_by_user_id(user.id)
+        await user_service.get_user(user.id)
+
+    await todo_service.create_todo(TodoCreate(title="Todo 2"), user.id)
+    await todo_service.update_todo(todo.id, TodoUpdate(done=True), user.id)
+
+    assert counter.count == 0
+    assert len((await todo_service.get_todo_by_user_id(user.id)).items) == 2
+    assert len((await user_service.get_user(user.id)).todos) == 2
+    assert (await todo_service.get_todo_by_id(todo.id, user.id)).done is True
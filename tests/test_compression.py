@@ -0,0 +1,118 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from app.middleware.compression import CompressionMiddleware, negotiate
+from app.utils.metrics import COMPRESSED_RESPONSES
+from app.utils.responses import ModelResponse
+
+ITEMS = [{"id": i, "title": f"Todo {i}", "done": i % 2 == 0} for i in range(200)]
+
+# Libraries of the optional encodings (compression extra)
+LIBRARIES = {"br": "brotli", "zstd": "zstandard"}
+
+
+def decompress(encoding: str, body: bytes) -> bytes:
+    if encoding == "br":
+        import brotli
+
+        return brotli.decompress(body)
+    if encoding == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    return gzip.decompress(body)
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items(count: int = len(ITEMS)):
+        return ModelResponse(ITEMS[:count], headers={"ETag": f'W/"{count}"'})
+
+    @app.get("/export")
+    async def export():
+        async def rows():
+            for item in ITEMS:
+                yield f"{item['id']},{item['title']}\n".encode()
+
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    app.add_middleware(
+        CompressionMiddleware, minimum_size=500, cache_max_bytes=1024 * 1024
+    )
+    return app
+
+
+async def raw_get(client: AsyncClient, path: str, accept_encoding: str):
+    async with client.stream(
+        "GET", path, headers={"Accept-Encoding": accept_encoding}
+    ) as response:
+        body = b"".join([chunk async for chunk in response.aiter_raw()])
+    return response, body
+
+
+async def test_negotiate():
+    """
+    Test the choice of the encoding from the Accept-Encoding header.
+
+    Asserts:
+        - The encoding with the highest quality wins, ties going to the order of
+          preference of the server.
+        - Refused (q=0) and unknown encodings are never chosen; `*` accepts the others.
+    """
+    encodings = ["zstd", "br", "gzip"]
+    assert negotiate("gzip, deflate, br, zstd", encodings) == "zstd"
+    assert negotiate("gzip, br;q=0.5", encodings) == "gzip"
+    assert negotiate("gzip;q=0, deflate", encodings) is None
+    assert negotiate("*;q=0.1, gzip;q=0", encodings) == "zstd"
+    assert negotiate("", encodings) is None
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+async def test_compressed_response(encoding):
+    """
+    Test the compression of the responses.
+
+    Args:
+        encoding: The encoding accepted by the client.
+
+    Asserts:
+        - Large bodies are compressed with the accepted encoding, with a matching
+          Content-Length and a Vary header; small bodies are sent as they are.
+        - The compressed body of a payload served again (same ETag) comes from the cache.
+        - Streamed bodies are compressed as a whole stream.
+    """
+    if encoding in LIBRARIES:
+        pytest.importorskip(LIBRARIES[encoding])
+    expected = ModelResponse(ITEMS).body
+    async with AsyncClient(
+        transport=ASGITransport(app=build_app()), base_url="http://test"
+    ) as client:
+        response, body = await raw_get(client, "/items", encoding)
+        assert response.headers["content-encoding"] == encoding
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) == len(body) < len(expected)
+        assert decompress(encoding, body) == expected
+
+        cached = COMPRESSED_RESPONSES.values.get((encoding, "cached"), 0)
+        _, body_again = await raw_get(client, "/items", encoding)
+        assert body_again == body
+        assert COMPRESSED_RESPONSES.values[(encoding, "cached")] == cached + 1
+
+        response, body = await raw_get(client, "/items?count=2", encoding)
+        assert "content-encoding" not in response.headers
+        assert body == ModelResponse(ITEMS[:2]).body
+
+        response, body = await raw_get(client, "/export", encoding)
+        assert response.headers["content-encoding"] == encoding
+        assert "content-length" not in response.headers
+        assert decompress(encoding, body).decode().splitlines()[-1] == "199,Todo 199"
+
+        response, body = await raw_get(client, "/items", "identity")
+        assert "content-encoding" not in response.headers
+        assert body == expected
@@ -0,0 +1,108 @@
+from fastapi import status
+
+from app.utils.common import unique_email
+from app.utils import singleflight
+from app.utils.etag import etag_matches
+
+
+API = "/api/v1"
+
+
+def test_etag_matches():
+    """
+    Test the weak comparison of `If-None-Match` headers.
+
+    Asserts:
+        - Strong and weak forms of the same tag match, in a list of tags too.
+        - `*` matches any tag and missing or different tags do not match.
+    """
+    etag = 'W/"abc"'
+
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"xyz", W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('W/"xyz"', etag)
+
+
+async def test_get_todo_not_modified(test_client, mocker):
+    """
+    Test the conditional GET of a todo.
+
+    Args:
+        test_client: The API test client fixture.
+        mocker: The mocker fixture, to count the serializations.
+
+    Asserts:
+        - The todo is returned with an ETag.
+        - A request with the same ETag is answered with an empty 304, without
+          serializing the todo.
+        - The ETag changes once the todo is updated.
+    """
+    user = (
+        await test_client.post(
+            f"{API}/users", json={"name": "Pancho Mancho", "email": unique_email()}
+        )
+    ).json()
+    todo = (
+        await test_client.post(
+            f"{API}/users/{user['id']}/todos", json={"title": "Todo 1"}
+        )
+    ).json()
+    url = f"{API}/users/{user['id']}/todos/{todo['id']}"
+
+    response = await test_client.get(url)
+    etag = response.headers["etag"]
+    render_json = mocker.spy(singleflight, "render_json")
+    not_modified = await test_client.get(url, headers={"If-None-Match": etag})
+    assert render_json.call_count == 0
+    await test_client.put(url, json={"done": True})
+    modified = await test_client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    assert not_modified.headers["cache-control"] == "no-cache"
+    assert modified.status_code == status.HTTP_200_OK
+    assert modified.headers["etag"] != etag
+    assert modified.json()["done"] is True
+
+
+async def test_get_todos_not_modified(test_client):
+    """
+    Test the conditional GET of a todo list and of the user embedding it.
+
+    Args:
+        test_client: The API test client fixture.
+
+    Asserts:
+        - An unchanged list and user are answered with 304.
+        - Adding a todo changes the ETags of the list and of the user.
+    """
+    user = (
+        await test_client.post(
+            f"{API}/users", json={"name": "Pancho Mancho", "email": unique_email()}
+        )
+    ).json()
+    todos_url = f"{API}/users/{user['id']}/todos"
+    user_url = f"{API}/user/{user['id']}"
+    await test_client.post(todos_url, json={"title": "Todo 1"})
+
+    todos_etag = (await test_client.get(todos_url)).headers["etag"]
+    user_etag = (await test_client.get(user_url)).headers["etag"]
+    unchanged = [
+        await test_client.get(todos_url, headers={"If-None-Match": todos_etag}),
+        await test_client.get(user_url, headers={"If-None-Match": user_etag}),
+    ]
+    await test_client.post(todos_url, json={"title": "Todo 2"})
+    changed = [
+        await test_client.get(todos_url, headers={"If-None-Match": todos_etag}),
+        await test_client.get(user_url, headers={"If-None-Match": user_etag}),
+    ]
+
+    assert [r.status_code for r in unchanged] == [status.HTTP_304_NOT_MODIFIED] * 2
+    assert [r.status_code for r in changed] == [status.HTTP_200_OK] * 2
+    assert len(changed[0].json()["items"]) == 2
+    assert len(changed[1].json()["todos"]) == 2
@@ -0,0 +1,115 @@
+import asyncio
+import csv
+import io
+import json
+import sys
+
+import pytest
+from fastapi import status
+
+from app.api.todos.services import TodoService
+from app.utils.common import unique_email
+from main import app
+
+
+@pytest.fixture(scope="function")
+async def user_with_todos(test_client, monkeypatch):
+    """
+    Fixture creating a user with 5 todos, exported in chunks of 2 rows.
+
+    Yields:
+        int: The id of the user.
+    """
+    services = sys.modules[TodoService.__module__]
+    monkeypatch.setattr(services, "EXPORT_BATCH_SIZE", 2)
+    user = await test_client.post(
+        "/api/v1/users", json={"name": "Pancho Mancho", "email": unique_email()}
+    )
+    user_id = user.json()["id"]
+    await test_client.post(
+        f"/api/v1/users/{user_id}/todos:batch",
+        json={"items": [{"title": f"Todo {i}", "done": i == 0} for i in range(5)]},
+    )
+    yield user_id
+
+
+async def test_export_todos(test_client, user_with_todos):
+    """
+    Test the NDJSON and CSV exports of the todos of a user.
+
+    Args:
+        test_client: The API test client fixture.
+        user_with_todos: The id of a user with 5 todos.
+
+    Asserts:
+        - The NDJSON export has one JSON todo per line, like the list endpoint.
+        - The CSV export has a header line then one line per todo.
+    """
+    url = f"/api/v1/users/{user_with_todos}/todos"
+    todos = (await test_client.get(url)).json()["items"]
+
+    ndjson = await test_client.get(f"{url}:export")
+    exported = await test_client.get(f"{url}:export", params={"format": "csv"})
+    rows = list(csv.DictReader(io.StringIO(exported.text)))
+
+    assert ndjson.status_code == status.HTTP_200_OK
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in ndjson.text.splitlines()] == todos
+    assert exported.headers["content-type"] == "text/csv; charset=utf-8"
+    assert "todos-" in exported.headers["content-disposition"]
+    assert [row["title"] for row in rows] == [todo["title"] for todo in todos]
+    assert [row["done"] for row in rows] == ["true", "false", "false", "false", "false"]
+
+
+async def test_export_client_disconnect(test_client, user_with_todos, engine):
+    """
+    Test that a client disconnecting in the middle of an export frees its connection.
+
+    Args:
+        test_client: The API test client fixture (for its dependency overrides).
+        user_with_todos: The id of a user with 5 todos.
+        engine: The SQLAlchemy async engine fixture.
+
+    Asserts:
+        - The stream stops before the end of the export.
+        - The connection of the export is returned to the pool.
+    """
+    path = f"/api/v1/users/{user_with_todos}/todos:export"
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"test")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+    }
+    chunks = []
+    first_row = asyncio.Event()
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await first_row.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            chunks.append(message["body"])
+            first_row.set()
+            # Give the disconnect the time to be noticed
+            await asyncio.sleep(0.01)
+
+    checked_out = engine.pool.checkedout()
+    await app(scope, receive, send)
+
+    assert 0 < len(b"".join(chunks).splitlines()) < 5
+    assert engine.pool.checkedout() == checked_out
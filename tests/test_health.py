@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+from fastapi import status
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.api.health.api import get_readiness_probe
+from app.api.health.services import ReadinessProbe, migration_heads
+from main import app
+
+
+@pytest.fixture(scope="function")
+async def probe_engine(tmp_path):
+    """
+    Fixture providing an engine on an empty database for the readiness probe.
+
+    Yields:
+        AsyncEngine: The SQLAlchemy async engine.
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'probe.db'}")
+    yield engine
+    await engine.dispose()
+
+
+async def stamp_head(engine) -> None:
+    async with engine.begin() as connection:
+        await connection.execute(
+            text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)")
+        )
+        for head in migration_heads():
+            await connection.execute(
+                text("INSERT INTO alembic_version VALUES (:head)"), {"head": head}
+            )
+
+
+async def test_liveness(test_client):
+    """
+    Test that the liveness endpoints answer without checking any dependency.
+
+    Args:
+        test_client: The API test client fixture.
+
+    Asserts:
+        - Both the legacy and the liveness endpoint return 200.
+        - The legacy endpoint keeps its original body.
+    """
+    legacy = await test_client.get("/api/v1/health")
+    live = await test_client.get("/api/v1/health/live")
+
+    assert legacy.status_code == status.HTTP_200_OK
+    assert legacy.json() == "Healthy"
+    assert live.status_code == status.HTTP_200_OK
+    assert live.json() == {"status": "ok"}
+
+
+async def test_readiness_checks_migrations(test_client, probe_engine):
+    """
+    Test the readiness of a database before and after its migrations are applied.
+
+    Args:
+        test_client: The API test client fixture.
+        probe_engine: The engine of the probed database.
+
+    Asserts:
+        - A database without the head revision is not ready (503).
+        - The result is cached until its TTL expires.
+        - The database is ready once at the head revision.
+    """
+    probe = ReadinessProbe(probe_engine, max_connections=10, ttl=0.5)
+    app.dependency_overrides[get_readiness_probe] = lambda: probe
+
+    outdated = await test_client.get("/api/v1/health/ready")
+    await stamp_head(probe_engine)
+    cached = await test_client.get("/api/v1/health/ready")
+    await asyncio.sleep(probe.ttl)
+    ready = await test_client.get("/api/v1/health/ready")
+
+    assert outdated.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert outdated.json()["checks"]["database"]["status"] == "ok"
+    assert outdated.json()["checks"]["migrations"]["status"] == "outdated"
+    assert cached.json() == outdated.json()
+    assert ready.status_code == status.HTTP_200_OK
+    assert ready.json()["status"] == "ready"
+    assert ready.json()["checks"]["migrations"]["current"] == list(migration_heads())
+
+
+async def test_readiness_pool_saturated(probe_engine):
+    """
+    Test that a saturated pool makes the application not ready.
+
+    Args:
+        probe_engine: The engine of the probed database.
+
+    Asserts:
+        - The pool check fails while the connections are checked out.
+        - The database is not queried when the pool is saturated.
+    """
+    await stamp_head(probe_engine)
+    probe = ReadinessProbe(probe_engine, max_connections=2, ttl=0, max_pool_usage=0.5)
+
+    async with probe_engine.connect():
+        result = await probe.check()
+
+    assert result["status"] == "not ready"
+    assert result["checks"]["pool"] == {
+        "status": "saturated",
+        "checked_out": 1,
+        "max_connections": 2,
+    }
+    assert "database" not in result["checks"]
+    assert (await probe.check())["status"] == "ready"
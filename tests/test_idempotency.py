@@ -0,0 +1,161 @@
+import asyncio
+import sys
+from datetime import timedelta
+
+from app.api.users.services import UserService
+from app.database.idempotency import (
+    IDEMPOTENCY_KEY_HEADER,
+    REPLAYED_HEADER,
+    IdempotencyKey,
+    _utcnow,
+)
+from app.utils.common import unique_email
+from app.utils.dependencies import idempotency
+
+USERS_URL = "/api/v1/users"
+
+
+async def test_create_user_is_replayed(test_client):
+    """
+    Test the retries of a POST request with an Idempotency-Key.
+
+    Args:
+        test_client: The async test client.
+
+    Asserts:
+        - A retry gets the response of the first request, marked as replayed,
+          although creating the same user again would fail.
+        - Reusing the key for another request is rejected with a 422.
+        - A failed request does not store its response: its key can be retried.
+    """
+    user = {"name": "Idem Potent", "email": unique_email()}
+    headers = {IDEMPOTENCY_KEY_HEADER: f"create-{user['email']}"}
+
+    first = await test_client.post(USERS_URL, json=user, headers=headers)
+    retry = await test_client.post(USERS_URL, json=user, headers=headers)
+    assert first.status_code == 200
+    assert REPLAYED_HEADER not in first.headers
+    assert retry.status_code == 200
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert retry.json() == first.json()
+
+    other = await test_client.post(
+        USERS_URL, json={**user, "name": "Someone Else"}, headers=headers
+    )
+    assert other.status_code == 422
+
+    # The email is taken: the 400 is not stored, so the key stays usable
+    headers = {IDEMPOTENCY_KEY_HEADER: f"duplicate-{user['email']}"}
+    failed = await test_client.post(USERS_URL, json=user, headers=headers)
+    assert failed.status_code == 400
+    user["email"] = unique_email()
+    # The body changed, but the failed attempt did not keep it
+    created = await test_client.post(USERS_URL, json=user, headers=headers)
+    assert created.status_code == 200
+    assert created.json()["email"] == user["email"]
+
+
+async def test_concurrent_duplicates_are_coalesced(test_client, monkeypatch):
+    """
+    Test concurrent requests with the same Idempotency-Key.
+
+    Args:
+        test_client: The async test client.
+        monkeypatch: Pytest fixture to slow down the creation of the users.
+
+    Asserts:
+        - The user is created once and every request gets the same response.
+    """
+    create_user = UserService.create_user
+    calls = []
+
+    async def slow_create_user(self, user_in):
+        calls.append(user_in)
+        await asyncio.sleep(0.05)
+        return await create_user(self, user_in)
+
+    # app.api rebinds `users` to its api module: patch the class itself
+    monkeypatch.setattr(
+        sys.modules[UserService.__module__].UserService,
+        "create_user",
+        slow_create_user,
+    )
+    user = {"name": "Co Alesced", "email": unique_email()}
+    headers = {IDEMPOTENCY_KEY_HEADER: f"coalesced-{user['email']}"}
+
+    responses = await asyncio.gather(
+        *(test_client.post(USERS_URL, json=user, headers=headers) for _ in range(3))
+    )
+
+    assert len(calls) == 1
+    assert [response.status_code for response in responses] == [200] * 3
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert sum(REPLAYED_HEADER in response.headers for response in responses) == 2
+
+
+async def test_key_is_kept_once_created(test_client, monkeypatch):
+    """
+    Test a request whose response could not be stored after the creation.
+
+    Args:
+        test_client: The async test client.
+        monkeypatch: Pytest fixture to make the storage of the response fail.
+
+    Asserts:
+        - The created todo is still returned.
+        - The key was committed with the todo: a retry gets a 409 instead of
+          creating the todo again.
+    """
+    user = await test_client.post(
+        USERS_URL, json={"name": "Un Stored", "email": unique_email()}
+    )
+    todos_url = f"{USERS_URL}/{user.json()['id']}/todos"
+
+    async def failing_save(self, db, key, stored):
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(type(idempotency), "_save", failing_save)
+    headers = {IDEMPOTENCY_KEY_HEADER: f"unstored-{unique_email()}"}
+
+    created = await test_client.post(todos_url, json={"title": "Once"}, headers=headers)
+    retry = await test_client.post(todos_url, json={"title": "Once"}, headers=headers)
+    todos = (await test_client.get(todos_url)).json()["items"]
+
+    assert created.status_code == 200
+    assert retry.status_code == 409
+    assert [todo["title"] for todo in todos] == ["Once"]
+
+
+async def test_sweep_expired_keys(db_session):
+    """
+    Test the deletion of the expired idempotency keys.
+
+    Args:
+        db_session: The database session.
+
+    Asserts:
+        - Only the expired keys are deleted.
+    """
+    now = _utcnow()
+    db_session.add_all(
+        [
+            IdempotencyKey(
+                key=f"sweep-{name}",
+                fingerprint="0" * 64,
+                status_code=200,
+                body="{}",
+                created_at=now,
+                expires_at=now + delta,
+            )
+            for name, delta in (
+                ("expired", timedelta(seconds=-1)),
+                ("valid", timedelta(hours=1)),
+            )
+        ]
+    )
+    await db_session.commit()
+
+    await idempotency.sweep(db_session)
+
+    assert await db_session.get(IdempotencyKey, "sweep-expired") is None
+    assert await db_session.get(IdempotencyKey, "sweep-valid") is not None
@@ -0,0 +1,99 @@
+import logging
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.middleware.logger import LogMiddleware
+
+
+async def ok(request):
+    return PlainTextResponse("ok")
+
+
+async def not_found(request):
+    return PlainTextResponse("missing", status_code=404)
+
+
+async def stream(request):
+    async def chunks():
+        for _ in range(3):
+            yield b"chunk"
+
+    return StreamingResponse(chunks())
+
+
+async def boom(request):
+    raise RuntimeError("boom")
+
+
+def build_client(sample_rate: int = 1) -> AsyncClient:
+    app = Starlette(
+        routes=[
+            Route("/ok", ok),
+            Route("/missing", not_found),
+            Route("/stream", stream),
+            Route("/boom", boom),
+        ]
+    )
+    app.add_middleware(LogMiddleware, sample_rate=sample_rate)
+    transport = ASGITransport(app=app, raise_app_exceptions=False)
+    return AsyncClient(transport=transport, base_url="http://test")
+
+
+def request_records(caplog) -> list:
+    return [record for record in caplog.records if record.msg == "Incoming request"]
+
+
+async def test_log_middleware_logs_request(caplog):
+    """
+    Test that a request is logged with its method, path, status, size and durations.
+
+    Args:
+        caplog: The log capture fixture.
+
+    Asserts:
+        - One record is logged with the request (full URL) and response details.
+        - The size of a streamed body is the sum of its chunks.
+    """
+    caplog.set_level(logging.INFO)
+    async with build_client() as client:
+        await client.get("/ok", params={"q": "a b"})
+        await client.get("/stream")
+
+    first, second = request_records(caplog)
+    assert first.req == {"method": "GET", "url": "http://test/ok?q=a+b"}
+    assert first.res["status_code"] == 200
+    assert first.res["size"] == 2
+    assert first.res["duration_ms"] >= 0
+    assert first.res["cpu_ms"] >= 0
+    assert second.res["size"] == len(b"chunk") * 3
+
+
+@pytest.mark.parametrize("sample_rate", [3])
+async def test_log_middleware_samples_successes(caplog, sample_rate):
+    """
+    Test that only 1 in N successes is logged while errors are always logged.
+
+    Args:
+        caplog: The log capture fixture.
+        sample_rate: The middleware sample rate.
+
+    Asserts:
+        - 6 successes with a sample rate of 3 produce 2 records.
+        - Every client error and unhandled exception is logged.
+    """
+    caplog.set_level(logging.INFO)
+    async with build_client(sample_rate) as client:
+        for _ in range(6):
+            await client.get("/ok")
+        for _ in range(2):
+            await client.get("/missing")
+        await client.get("/boom")
+
+    status_codes = [record.res["status_code"] for record in request_records(caplog)]
+    assert status_codes.count(200) == 2
+    assert status_codes.count(404) == 2
+    assert status_codes.count(500) == 1
@@ -0,0 +1,123 @@
+import io
+import json
+import logging
+import queue
+import sys
+
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import Config
+from app.utils.logger import BatchStreamHandler, BoundedQueueHandler, JsonFormatter
+
+
+class CountingStream(io.StringIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        return super().write(text)
+
+
+def make_record(message: str = "Incoming request", **extra) -> logging.LogRecord:
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, message, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_queue_handler_drops_when_full():
+    """
+    Test that the queue handler drops records instead of blocking when the queue is full.
+
+    Asserts:
+        - Records beyond the queue size are dropped and counted.
+    """
+    log_queue = queue.Queue(maxsize=2)
+    handler = BoundedQueueHandler(log_queue)
+
+    for _ in range(5):
+        handler.handle(make_record())
+
+    assert log_queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_queue_full_policy_is_validated():
+    """
+    Test the validation of the policy of a full log queue.
+
+    Asserts:
+        - "drop" and "block" are accepted, anything else fails at startup.
+    """
+    assert Config(LOG_QUEUE_FULL_POLICY_="block").LOG_QUEUE_FULL_POLICY_ == "block"
+    with pytest.raises(ValidationError):
+        Config(LOG_QUEUE_FULL_POLICY_="blcok")
+
+
+def test_serializer_is_validated(monkeypatch):
+    """
+    Test the validation of the serializer of the log records.
+
+    Args:
+        monkeypatch: The monkeypatch fixture.
+
+    Asserts:
+        - An unknown serializer fails at startup.
+        - The orjson serializer fails when orjson is not installed, instead of
+          falling back to json.
+    """
+    with pytest.raises(ValidationError):
+        Config(LOG_SERIALIZER_="ujson")
+
+    monkeypatch.setattr(sys.modules[JsonFormatter.__module__], "orjson", None)
+    with pytest.raises(ImportError):
+        JsonFormatter("orjson")
+    assert JsonFormatter("json").dumps is json.dumps
+
+
+def test_batch_stream_handler_writes_in_batches():
+    """
+    Test that the stream handler writes buffered records once per batch.
+
+    Asserts:
+        - Nothing is written while the batch is incomplete and records are pending.
+        - A full batch is written with a single write.
+        - The remaining records are written once the queue is drained.
+    """
+    log_queue = queue.Queue()
+    log_queue.put(make_record())  # pending record: the queue is not drained yet
+    stream = CountingStream()
+    handler = BatchStreamHandler(log_queue, batch_size=3, stream=stream)
+    handler.setFormatter(JsonFormatter())
+
+    handler.handle(make_record("first"))
+    handler.handle(make_record("second"))
+    assert stream.writes == 0
+
+    handler.handle(make_record("third"))
+    assert stream.writes == 1
+
+    log_queue.get_nowait()
+    handler.handle(make_record("fourth"))
+    assert stream.writes == 2
+    messages = [json.loads(line)["message"] for line in stream.getvalue().splitlines()]
+    assert messages == ["first", "second", "third", "fourth"]
+
+
+def test_json_formatter_orjson_matches_json():
+    """
+    Test that the orjson serializer produces the same records as the json one.
+
+    Asserts:
+        - Both serializers produce equivalent JSON documents.
+    """
+    pytest.importorskip("orjson")
+    record = make_record(
+        req={"method": "GET", "url": "http://test/"}, res={"status_code": 200}
+    )
+
+    assert json.loads(JsonFormatter("orjson").format(record)) == json.loads(
+        JsonFormatter().format(record)
+    )
@@ -0,0 +1,73 @@
+from fastapi import status
+
+from app.utils.common import unique_email
+from app.utils.metrics import Counter, Histogram
+
+
+def test_histogram_render():
+    """
+    Test the Prometheus rendering of a histogram.
+
+    Asserts:
+        - Buckets are cumulative, inclusive of their bound and end with +Inf.
+        - The sum and count of the observations are rendered.
+    """
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, "/todos")
+
+    assert list(histogram.samples()) == [
+        'latency_seconds_bucket{route="/todos",le="0.1"} 2',
+        'latency_seconds_bucket{route="/todos",le="1.0"} 3',
+        'latency_seconds_bucket{route="/todos",le="+Inf"} 4',
+        'latency_seconds_sum{route="/todos"} 2.65',
+        'latency_seconds_count{route="/todos"} 4',
+    ]
+
+
+def test_counter_escapes_labels():
+    """
+    Test that label values are escaped in the Prometheus text format.
+
+    Asserts:
+        - Quotes and backslashes of the label values are escaped.
+    """
+    counter = Counter("requests_total", "Requests.", ("path",))
+    counter.inc('a"b\\c')
+
+    assert list(counter.samples()) == ['requests_total{path="a\\"b\\\\c"} 1']
+
+
+async def test_metrics_endpoint(test_client):
+    """
+    Test that the requests are exposed by the metrics endpoint.
+
+    Args:
+        test_client: The API test client fixture.
+
+    Asserts:
+        - Requests are counted under the path template of their route.
+        - Requests matching no route are counted under a single label.
+        - The pool and thread limiter gauges and the dropped log records are exposed.
+    """
+    user = (
+        await test_client.post(
+            "/api/v1/users", json={"name": "Pancho Mancho", "email": unique_email()}
+        )
+    ).json()
+    await test_client.get(f"/api/v1/user/{user['id']}")
+    await test_client.get("/api/v1/does-not-exist")
+
+    response = await test_client.get("/metrics")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert '/user/{user_id}",status_code="200"}' in response.text
+    assert (
+        'http_requests_total{method="GET",route="unmatched",status_code="404"}'
+        in response.text
+    )
+    assert 'http_request_duration_seconds_count{method="POST",route="' in response.text
+    assert 'db_pool_connections{state="size"}' in response.text
+    assert 'threadpool_tokens{state="total"}' in response.text
+    assert "\nlog_records_dropped_total " in response.text
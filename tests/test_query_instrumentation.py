@@ -0,0 +1,100 @@
+import logging
+import re
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database.instrumentation import (
+    QueryStats,
+    instrument_engine,
+    normalize_sql,
+    query_stats,
+)
+from app.utils.common import unique_email
+
+
+def test_normalize_sql():
+    """
+    Test the normalization of the statements written in the slow-query log.
+
+    Asserts:
+        - Whitespace is collapsed.
+        - Parameter lists and multi-row VALUES are shortened whatever their length.
+    """
+    assert (
+        normalize_sql("SELECT *\n  FROM todos\n WHERE id IN (?, ?, ?)")
+        == "SELECT * FROM todos WHERE id IN (...)"
+    )
+    assert (
+        normalize_sql("INSERT INTO t (a, b) VALUES ($1, $2), ($3, $4), ($5, $6)")
+        == "INSERT INTO t (a, b) VALUES (...)"
+    )
+
+
+async def test_slow_queries_are_logged(tmp_path, caplog):
+    """
+    Test that statements above the threshold are counted and logged.
+
+    Args:
+        tmp_path: A temporary directory for the database.
+        caplog: The log capture fixture.
+
+    Asserts:
+        - The statements are counted in the stats of the current request.
+        - A slow-query record is logged with the normalized SQL and the request.
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'slow.db'}")
+    instrument_engine(engine.sync_engine, slow_query_ms=0)
+    stats = QueryStats({"method": "GET", "url": "http://test/slow"})
+    token = query_stats.set(stats)
+    try:
+        with caplog.at_level(logging.WARNING):
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1 WHERE 1 IN (1, 2)"))
+    finally:
+        query_stats.reset(token)
+        await engine.dispose()
+
+    records = [record for record in caplog.records if record.msg == "Slow query"]
+    assert stats.count == 1
+    assert stats.duration > 0
+    assert records[0].query["sql"] == "SELECT 1 WHERE 1 IN (1, 2)"
+    assert records[0].req == {"method": "GET", "url": "http://test/slow"}
+
+
+async def test_server_timing_header(test_client, engine, caplog):
+    """
+    Test that the statements of a request are reported in its Server-Timing header.
+
+    Args:
+        test_client: The API test client fixture.
+        engine: The SQLAlchemy async engine fixture.
+        caplog: The log capture fixture.
+
+    Asserts:
+        - The header counts the statements sent while handling the request.
+        - The request log record contains the same count.
+    """
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    user = (
+        await test_client.post(
+            "/api/v1/users", json={"name": "Pancho Mancho", "email": unique_email()}
+        )
+    ).json()
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        with caplog.at_level(logging.INFO):
+            response = await test_client.get(f"/api/v1/user/{user['id']}")
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+    timing = re.fullmatch(
+        r'db;dur=[\d.]+;desc="(\d+) queries"', response.headers["server-timing"]
+    )
+    record = [r for r in caplog.records if r.msg == "Incoming request"][-1]
+    assert int(timing.group(1)) == len(statements) > 0
+    assert record.res["db"]["queries"] == len(statements)
@@ -0,0 +1,168 @@
+import sys
+
+import pytest
+from fastapi import status
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.api.todos.api import get_todo_changes
+from app.api.users.models import User as UserModel
+from app.database.config import DBBase
+from app.database.routing import (
+    LEAST_CONNECTIONS,
+    READ_YOUR_WRITES_COOKIE,
+    ReplicaSet,
+)
+from app.utils.cache import MemoryCache
+from app.utils.common import unique_email
+from app.utils.dependencies import get_cache, get_replicas
+from main import app
+
+
+@pytest.fixture(scope="function")
+async def replica_engines(tmp_path):
+    """
+    Fixture providing two empty databases standing in for the read replicas.
+
+    Yields:
+        list[AsyncEngine]: The SQLAlchemy async engines of the replicas.
+    """
+    engines = [
+        create_async_engine(f"sqlite+aiosqlite:///{tmp_path / f'replica{i}.db'}")
+        for i in range(2)
+    ]
+    for engine in engines:
+        async with engine.begin() as conn:
+            await conn.run_sync(DBBase.metadata.create_all)
+    yield engines
+    for engine in engines:
+        await engine.dispose()
+
+
+async def test_reads_go_to_replicas(test_client, replica_engines):
+    """
+    Test that the reads are sent to a replica unless the client just wrote.
+
+    Args:
+        test_client: The API test client fixture.
+        replica_engines: The engines of the replica databases.
+
+    Asserts:
+        - A write pins the client to the primary, which has the new user.
+        - Without the cookie, the read is answered from the replica.
+    """
+    replica = replica_engines[0]
+    app.dependency_overrides[get_replicas] = lambda: ReplicaSet([replica])
+
+    created = await test_client.post(
+        "/api/v1/users", json={"name": "Pancho Mancho", "email": unique_email()}
+    )
+    user_id = created.json()["id"]
+    pinned = await test_client.get(f"/api/v1/user/{user_id}")
+    test_client.cookies.clear()
+    not_replicated = await test_client.get(f"/api/v1/user/{user_id}")
+    async with replica.begin() as conn:
+        await conn.execute(
+            insert(UserModel).values(id=user_id, name="Replica", email=unique_email())
+        )
+    replicated = await test_client.get(f"/api/v1/user/{user_id}")
+
+    assert READ_YOUR_WRITES_COOKIE in created.cookies
+    assert pinned.status_code == status.HTTP_200_OK
+    assert pinned.json()["name"] == "Pancho Mancho"
+    assert not_replicated.status_code == status.HTTP_404_NOT_FOUND
+    assert replicated.json()["name"] == "Replica"
+
+
+async def test_replica_reads_do_not_fill_the_cache(test_client, replica_engines):
+    """
+    Test the cache of the reads with a lagging replica.
+
+    Args:
+        test_client: The API test client fixture.
+        replica_engines: The engines of the replica databases.
+
+    Asserts:
+        - A read from the replica is not cached, so a client pinned to the primary
+          after its write does not get the old user back from the cache.
+        - The read of the pinned client fills the cache, then served to the others.
+    """
+    replica = replica_engines[0]
+    app.dependency_overrides[get_replicas] = lambda: ReplicaSet([replica])
+    cache = MemoryCache()
+    app.dependency_overrides[get_cache] = lambda: cache
+
+    created = await test_client.post(
+        "/api/v1/users", json={"name": "Pancho Mancho", "email": unique_email()}
+    )
+    user_id = created.json()["id"]
+    cookie = created.cookies[READ_YOUR_WRITES_COOKIE]
+    async with replica.begin() as conn:
+        await conn.execute(
+            insert(UserModel).values(id=user_id, name="Lagging", email=unique_email())
+        )
+    test_client.cookies.clear()
+    lagging = await test_client.get(f"/api/v1/user/{user_id}")
+    test_client.cookies.set(READ_YOUR_WRITES_COOKIE, cookie)
+    pinned = await test_client.get(f"/api/v1/user/{user_id}")
+    test_client.cookies.clear()
+    cached = await test_client.get(f"/api/v1/user/{user_id}")
+
+    assert lagging.json()["name"] == "Lagging"
+    assert pinned.json()["name"] == "Pancho Mancho"
+    assert cached.json()["name"] == "Pancho Mancho"
+
+
+async def test_change_feed_reads_the_primary(test_client, replica_engines, monkeypatch):
+    """
+    Test that the change feed ignores the replicas.
+
+    Args:
+        test_client: The API test client fixture.
+        replica_engines: The engines of the (empty, lagging) replica databases.
+        monkeypatch: Pytest fixture to disable the settle window.
+
+    Asserts:
+        - A client that is not pinned gets the changes of the primary, which a
+          lagging replica does not have yet.
+    """
+    app.dependency_overrides[get_replicas] = lambda: ReplicaSet([replica_engines[0]])
+    monkeypatch.setattr(
+        sys.modules[get_todo_changes.__module__].app_config,
+        "CHANGES_SETTLE_SECONDS_",
+        0.0,
+    )
+    user = await test_client.post(
+        "/api/v1/users", json={"name": "Pancho Mancho", "email": unique_email()}
+    )
+    user_id = user.json()["id"]
+    todo = await test_client.post(
+        f"/api/v1/users/{user_id}/todos", json={"title": "Todo 1"}
+    )
+    test_client.cookies.clear()
+
+    changes = await test_client.get(f"/api/v1/users/{user_id}/todos/changes")
+
+    assert [change["id"] for change in changes.json()["changes"]] == [todo.json()["id"]]
+
+
+async def test_replica_selection(replica_engines):
+    """
+    Test the selection strategies of the replicas.
+
+    Args:
+        replica_engines: The engines of the replica databases.
+
+    Asserts:
+        - Round-robin alternates between the replicas.
+        - Least-connections avoids the replica with a checked-out connection.
+    """
+    first, second = replica_engines
+    round_robin = ReplicaSet(replica_engines)
+    least_connections = ReplicaSet(replica_engines, strategy=LEAST_CONNECTIONS)
+
+    assert [round_robin.choose() for _ in range(3)] == [first, second, first]
+    async with first.connect():
+        assert least_connections.choose() is second
+    async with second.connect():
+        assert least_connections.choose() is first
@@ -0,0 +1,32 @@
+from fastapi import status
+
+from app.api.users.schemas import User
+from app.utils.common import unique_email
+
+
+async def test_model_response(test_client):
+    """
+    Test the responses serialized once from the models built by the services.
+
+    Args:
+        test_client: The API test client fixture.
+
+    Asserts:
+        - The body is the JSON of the response model, with its content type.
+        - The headers set by the dependencies are kept.
+        - Endpoints returning a subset of the model only return its fields.
+    """
+    email = unique_email()
+    created = await test_client.post(
+        "/api/v1/users", json={"name": "Pancho Mancho", "email": email}
+    )
+    response = await test_client.get(f"/api/v1/user/{created.json()['id']}")
+    updated = await test_client.put(
+        f"/api/v1/user/{created.json()['id']}", json={"name": "Pancho"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["x-frame-options"] == "Deny"
+    assert User.model_validate_json(response.content).email == email
+    assert updated.json() == {"name": "Pancho", "email": email}
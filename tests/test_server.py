@@ -0,0 +1,51 @@
+import asyncio
+import signal
+
+from fastapi import status
+
+from app.core.server import draining, install_drain_handler
+from app.database.config import per_worker
+
+
+def test_per_worker_connections():
+    """
+    Test the split of the database connections between the worker processes.
+
+    Asserts:
+        - The connections are divided evenly, rounded down but at least one.
+        - Zero and unlimited (-1) values are kept as is.
+    """
+    assert per_worker(40, 0) == 40
+    assert per_worker(40, 3) == 13
+    assert per_worker(40, 64) == 1
+    assert per_worker(0, 4) == 0
+    assert per_worker(-1, 4) == -1
+
+
+async def test_drain_on_sigterm(test_client):
+    """
+    Test that SIGTERM first drains the server before stopping it.
+
+    Args:
+        test_client: The API test client fixture.
+
+    Asserts:
+        - The readiness probe fails as soon as SIGTERM is received.
+        - The server's own handler only runs after the drain delay.
+    """
+    received = []
+    previous = signal.signal(signal.SIGTERM, lambda sig, frame: received.append(sig))
+    try:
+        install_drain_handler(0.1)
+        signal.raise_signal(signal.SIGTERM)
+        response = await test_client.get("/api/v1/health/ready")
+        drained_early = list(received)
+        await asyncio.sleep(0.2)
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+        draining.clear()
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json() == {"status": "draining"}
+    assert drained_early == []
+    assert received == [signal.SIGTERM]
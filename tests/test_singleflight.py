@@ -0,0 +1,142 @@
+import asyncio
+import sys
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.todos.schemas import TodoStats
+from app.api.users.schemas import UserCreate
+from app.api.users.services import UserService
+from app.utils.common import unique_email
+from app.utils.metrics import COALESCED_REQUESTS
+from app.utils.singleflight import SingleFlight
+
+STATS = TodoStats(
+    total=2,
+    done=1,
+    open=1,
+    completion_rate=0.5,
+    recent_days=7,
+    created_recently=2,
+    updated_recently=1,
+)
+
+
+class SlowFetch:
+    """Fetch counting its calls, completing when `release` is set."""
+
+    def __init__(self, error: Exception = None) -> None:
+        self.calls = 0
+        self.error = error
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> TodoStats:
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return STATS
+
+
+async def test_single_flight():
+    """
+    Test the coalescing of concurrent calls with the same key.
+
+    Asserts:
+        - Concurrent calls with the same key run the fetch once and share its
+          result and serialized body; another key runs its own fetch.
+        - An exception of the fetch is raised to every coalesced call.
+        - When the call running the fetch is cancelled, a waiting call runs it.
+    """
+    single_flight = SingleFlight("test")
+    fetch = SlowFetch()
+    calls = [
+        asyncio.create_task(single_flight.do(key, fetch))
+        for key in ("a", "a", "a", "b")
+    ]
+    await asyncio.sleep(0)
+    fetch.release.set()
+    flights = await asyncio.gather(*calls)
+    assert fetch.calls == 2
+    assert all(flight.value is STATS for flight in flights)
+    assert flights[0].body == STATS.model_dump_json().encode()
+
+    fetch = SlowFetch(error=HTTPException(status_code=404))
+    calls = [asyncio.create_task(single_flight.do("a", fetch)) for _ in range(2)]
+    await asyncio.sleep(0)
+    fetch.release.set()
+    errors = await asyncio.gather(*calls, return_exceptions=True)
+    assert fetch.calls == 1
+    assert [error.status_code for error in errors] == [404, 404]
+
+    fetch = SlowFetch()
+    leader, waiter = (
+        asyncio.create_task(single_flight.do("a", fetch)) for _ in range(2)
+    )
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    fetch.release.set()
+    assert (await waiter).value is STATS
+    assert fetch.calls == 2
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+async def test_single_flight_stale_window():
+    """
+    Test the reuse of completed results within the stale window.
+
+    Asserts:
+        - A call after the fetch completed reuses its result within the window.
+        - Without a stale window, every sequential call runs the fetch.
+    """
+    for stale, expected_calls in ((60.0, 1), (0.0, 2)):
+        single_flight = SingleFlight("test", stale=stale)
+        fetch = SlowFetch()
+        fetch.release.set()
+        await single_flight.do("a", fetch)
+        await single_flight.do("a", fetch)
+        assert fetch.calls == expected_calls
+
+
+async def test_get_user_is_coalesced(test_client, db_session, monkeypatch):
+    """
+    Test concurrent identical requests to a coalesced route.
+
+    Args:
+        test_client: The async test client.
+        db_session: The database session.
+        monkeypatch: Pytest fixture to count the service calls.
+
+    Asserts:
+        - The user is fetched once for all the concurrent requests, which get the
+          same body and ETag.
+        - The coalesced requests are counted.
+    """
+    user = await UserService(db_session).create_user(
+        UserCreate(name="Hot User", email=unique_email())
+    )
+    get_user = UserService.get_user
+    fetches = []
+
+    async def slow_get_user(self, user_id):
+        fetches.append(user_id)
+        await asyncio.sleep(0.05)
+        return await get_user(self, user_id)
+
+    # app.api rebinds `users` to its api module: patch the class itself
+    monkeypatch.setattr(
+        sys.modules[UserService.__module__].UserService, "get_user", slow_get_user
+    )
+    coalesced = COALESCED_REQUESTS.values.get(("get_user", "coalesced"), 0)
+
+    responses = await asyncio.gather(
+        *(test_client.get(f"/api/v1/user/{user.id}") for _ in range(5))
+    )
+
+    assert fetches == [user.id]
+    assert [response.status_code for response in responses] == [200] * 5
+    assert len({response.content for response in responses}) == 1
+    assert len({response.headers["etag"] for response in responses}) == 1
+    assert COALESCED_REQUESTS.values[("get_user", "coalesced")] == coalesced + 4
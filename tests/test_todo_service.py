@@ -1,17 +1,32 @@
+from datetime import datetime, timedelta, timezone
+
 import pytest
 
 from fastapi import HTTPException, status
+from sqlalchemy import select, update
 from sqlalchemy.exc import SQLAlchemyError
-from app.api.todos.services import TodoService
+from app.api.todos.models import TodoTombstone
+from app.api.todos.services import TodoService, delete_expired_tombstones
 from app.api.users.services import UserService
 from app.api.users.schemas import UserCreate
-from app.api.todos.schemas import TodoCreate, TodoUpdate
+from app.api.todos.schemas import (
+    TodoBatchCreate,
+    TodoBatchDelete,
+    TodoBatchUpdate,
+    TodoBatchUpdateItem,
+    TodoCreate,
+    TodoFilters,
+    TodoSort,
+    TodoUpdate,
+)
+from app.utils.cache import MemoryCache
 from app.utils.common import unique_email
+from app.utils.pagination import encode_cursor
 
 USER_NAME = "Pancho"
 
 
-def test_create_todo_for_user(db_session):
+async def test_create_todo_for_user(db_session):
     """
     Test the creation of a todo item for a user.
 
@@ -28,13 +43,13 @@ def test_create_todo_for_user(db_session):
 
     # Create a user to associate with the todo
     user_in = UserCreate(name=USER_NAME, email=unique_email())
-    user = user_service.create_user(user_in)
+    user = await user_service.create_user(user_in)
 
     # Create a todo for the user
     todo_in = TodoCreate(
         title="Test Todo", description="This is a test todo", done=False
     )
-    todo = todo_service.create_todo(todo_in, user.id)
+    todo = await todo_service.create_todo(todo_in, user.id)
 
     assert todo.id is not None
     assert todo.title == "Test Todo"
@@ -43,7 +58,7 @@ def test_create_todo_for_user(db_session):
     assert todo.user_id == user.id
 
 
-def test_get_todo_by_id(db_session):
+async def test_get_todo_by_id(db_session):
     """
     Test retrieving a todo item by its id.
 
@@ -58,14 +73,14 @@ def test_get_todo_by_id(db_session):
 
     # Create a user to associate with the todo
     user_in = UserCreate(name=USER_NAME, email=unique_email())
-    user = user_service.create_user(user_in)
+    user = await user_service.create_user(user_in)
 
     # Create a todo for the user
     todo_in = TodoCreate(title="Todo 1", description="First todo", done=False)
-    created_todo = todo_service.create_todo(todo_in, user.id)
+    created_todo = await todo_service.create_todo(todo_in, user.id)
 
     # Retrieve the todo by id
-    todo = todo_service.get_todo_by_id(created_todo.id, user.id)
+    todo = await todo_service.get_todo_by_id(created_todo.id, user.id)
 
     assert todo.id == created_todo.id
     assert todo.title == "Todo 1"
@@ -74,7 +89,7 @@ def test_get_todo_by_id(db_session):
     assert todo.user_id == user.id
 
 
-def test_get_todos_for_user(db_session):
+async def test_get_todos_for_user(db_session):
     """
     Test retrieving all todo items for a user.
 
@@ -90,23 +105,255 @@ def test_get_todos_for_user(db_session):
 
     # Create a user to associate with the todos
     user_in = UserCreate(name=USER_NAME, email=unique_email())
-    user = user_service.create_user(user_in)
+    user = await user_service.create_user(user_in)
 
     # Create multiple todos for the user
     todo_in1 = TodoCreate(title="Todo 1", description="First todo", done=False)
     todo_in2 = TodoCreate(title="Todo 2", description="Second todo", done=False)
-    todo_service.create_todo(todo_in1, user.id)
-    todo_service.create_todo(todo_in2, user.id)
+    await todo_service.create_todo(todo_in1, user.id)
+    await todo_service.create_todo(todo_in2, user.id)
 
     # Retrieve todos for the user
-    todos = todo_service.get_todo_by_user_id(user.id)
+    todos = await todo_service.get_todo_by_user_id(user.id)
+
+    assert len(todos.items) == 2
+    assert todos.items[0].title == "Todo 1"
+    assert todos.items[1].title == "Todo 2"
+    assert todos.next_cursor is None
+
+
+async def test_get_todos_for_user_paginated(db_session):
+    """
+    Test paging through the todo items of a user with a cursor.
+
+    Args:
+        db_session: The database session fixture.
+
+    Asserts:
+        - Each page holds at most `limit` todos and links to the next page.
+        - The last page has no next cursor.
+        - Every todo is returned exactly once, in id order.
+    """
+    user_service = UserService(db_session)
+    todo_service = TodoService(db_session)
+
+    user_in = UserCreate(name=USER_NAME, email=unique_email())
+    user = await user_service.create_user(user_in)
+
+    for title in ("Todo 1", "Todo 2", "Todo 3"):
+        await todo_service.create_todo(TodoCreate(title=title), user.id)
+
+    first_page = await todo_service.get_todo_by_user_id(user.id, limit=2)
+    assert [todo.title for todo in first_page.items] == ["Todo 1", "Todo 2"]
+    assert first_page.next_cursor is not None
+
+    second_page = await todo_service.get_todo_by_user_id(
+        user.id, cursor=first_page.next_cursor, limit=2
+    )
+    assert [todo.title for todo in second_page.items] == ["Todo 3"]
+    assert second_page.next_cursor is None
+
+
+async def test_get_todos_for_user_invalid_cursor(db_session):
+    """
+    Test paging the todo items of a user with a malformed cursor.
+
+    Args:
+        db_session: The database session fixture.
+
+    Asserts:
+        - An HTTPException is raised with the expected status code and detail message,
+          for an undecodable cursor and for a boolean id.
+        - A timezone-aware time of a sorted cursor is compared in UTC.
+    """
+    todo_service = TodoService(db_session)
+
+    for cursor in ("not-a-cursor", encode_cursor(id=True)):
+        with pytest.raises(HTTPException) as exc_info:
+            await todo_service.get_todo_by_user_id(1, cursor=cursor)
+
+        assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+        assert exc_info.value.detail == "Invalid cursor"
+
+    cursor = encode_cursor(updated_at=datetime.now(timezone.utc).isoformat(), id=1)
+    todos = await todo_service.get_todo_by_user_id(
+        1, cursor=cursor, filters=TodoFilters(sort=TodoSort.UPDATED_AT)
+    )
+    assert todos.items == []
+
+
+async def test_get_todos_for_user_filtered(db_session):
+    """
+    Test filtering the todo items of a user by status and title.
+
+    Args:
+        db_session: The database session fixture.
+
+    Asserts:
+        - Only the todos matching every filter are returned.
+        - The title filters are case-insensitive and LIKE wildcards are literal.
+    """
+    user_service = UserService(db_session)
+    todo_service = TodoService(db_session)
+
+    user_in = UserCreate(name=USER_NAME, email=unique_email())
+    user = await user_service.create_user(user_in)
+    titles = ("Buy milk", "buy 100% juice", "Walk the dog", "Call Bob_x")
+    await todo_service.create_todos(
+        TodoBatchCreate(
+            items=[
+                TodoCreate(title=title, done=index % 2 == 0)
+                for index, title in enumerate(titles)
+            ]
+        ),
+        user.id,
+    )
+
+    async def titles_of(**filters) -> list:
+        page = await todo_service.get_todo_by_user_id(
+            user.id, filters=TodoFilters(**filters)
+        )
+        return [todo.title for todo in page.items]
+
+    assert await titles_of(done=True) == ["Buy milk", "Walk the dog"]
+    assert await titles_of(title_prefix="BUY") == ["Buy milk", "buy 100% juice"]
+    assert await titles_of(title_prefix="buy", done=False) == ["buy 100% juice"]
+    assert await titles_of(search="0% j") == ["buy 100% juice"]
+    assert await titles_of(search="%") == ["buy 100% juice"]
+    assert await titles_of(search="b_x") == ["Call Bob_x"]
+    assert await titles_of(search="the") == ["Walk the dog"]
 
-    assert len(todos) == 2
-    assert todos[0].title == "Todo 1"
-    assert todos[1].title == "Todo 2"
 
+async def test_get_todos_for_user_sorted(db_session):
+    """
+    Test paging through the todo items of a user sorted by a timestamp.
+
+    Args:
+        db_session: The database session fixture.
 
-def test_update_todo(db_session):
+    Asserts:
+        - The todos are ordered by the sort column, then by id in the same direction.
+        - Every todo is returned exactly once across the pages.
+        - The timestamp ranges include their lower bound.
+        - A cursor of another order is rejected.
+    """
+    user_service = UserService(db_session)
+    todo_service = TodoService(db_session)
+
+    user_in = UserCreate(name=USER_NAME, email=unique_email())
+    user = await user_service.create_user(user_in)
+    todos = [
+        await todo_service.create_todo(TodoCreate(title=f"Todo {index}"), user.id)
+        for index in range(5)
+    ]
+    await todo_service.update_todo(todos[2].id, TodoUpdate(done=True), user.id)
+    last_updated = await todo_service.update_todo(
+        todos[0].id, TodoUpdate(done=True), user.id
+    )
+
+    filters = TodoFilters(sort=TodoSort.UPDATED_AT_DESC)
+    ids, cursor = [], None
+    while True:
+        page = await todo_service.get_todo_by_user_id(
+            user.id, cursor=cursor, limit=2, filters=filters
+        )
+        ids += [todo.id for todo in page.items]
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert ids == [todos[index].id for index in (0, 2, 4, 3, 1)]
+
+    recent = await todo_service.get_todo_by_user_id(
+        user.id, filters=TodoFilters(updated_after=last_updated.updated_at)
+    )
+    assert [todo.id for todo in recent.items] == [todos[0].id]
+
+    by_id = await todo_service.get_todo_by_user_id(user.id, limit=2)
+    with pytest.raises(HTTPException) as exc_info:
+        await todo_service.get_todo_by_user_id(
+            user.id, cursor=by_id.next_cursor, filters=filters
+        )
+    assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+
+
+async def test_get_todo_stats(db_session, query_counter):
+    """
+    Test the stats of the todos of a user and of all users.
+
+    Args:
+        db_session: The database session fixture.
+        query_counter: The statement counter fixture.
+
+    Asserts:
+        - The todos are counted by status in a single statement.
+        - The cached stats are refreshed by the writes of the user.
+        - The global stats count the todos of every user.
+    """
+    user_service = UserService(db_session)
+    todo_service = TodoService(db_session, MemoryCache())
+
+    user_in = UserCreate(name=USER_NAME, email=unique_email())
+    user = await user_service.create_user(user_in)
+    todos = await todo_service.create_todos(
+        TodoBatchCreate(
+            items=[
+                TodoCreate(title=f"Todo {index}", done=index == 0) for index in range(4)
+            ]
+        ),
+        user.id,
+    )
+
+    with query_counter() as counter:
+        stats = await todo_service.get_todo_stats(user.id)
+        await todo_service.get_todo_stats(user.id)
+    await todo_service.update_todo(todos.items[1].id, TodoUpdate(done=True), user.id)
+    await todo_service.delete_todo(todos.items[3].id, user.id)
+    updated_stats = await todo_service.get_todo_stats(user.id)
+    global_stats = await todo_service.get_global_todo_stats()
+
+    assert counter.count == 1
+    assert (stats.total, stats.done, stats.open) == (4, 1, 3)
+    assert stats.completion_rate == 0.25
+    assert stats.created_recently == 4
+    assert stats.last_activity_at is not None
+    assert (updated_stats.total, updated_stats.done) == (3, 2)
+    assert global_stats.total >= updated_stats.total
+    assert global_stats.users >= 1
+
+
+async def test_get_global_todo_stats_cached(db_session, query_counter):
+    """
+    Test that the global stats are cached without a cache backend.
+
+    Args:
+        db_session: The database session fixture.
+        query_counter: The statement counter fixture.
+
+    Asserts:
+        - The stats are computed once per TTL of the stats cache, despite the writes.
+        - They are recomputed for the clients that must read their own writes.
+    """
+    user_service = UserService(db_session)
+    stats_cache = MemoryCache(ttl=60)
+    todo_service = TodoService(db_session, stats_cache=stats_cache)
+
+    user = await user_service.create_user(
+        UserCreate(name=USER_NAME, email=unique_email())
+    )
+    with query_counter() as counter:
+        stats = await todo_service.get_global_todo_stats()
+        await todo_service.create_todo(TodoCreate(title="Todo"), user.id)
+        cached_stats = await todo_service.get_global_todo_stats()
+
+    assert counter.count == 2
+    assert cached_stats == stats
+
+    pinned_service = TodoService(db_session, pinned=True, stats_cache=stats_cache)
+    fresh_stats = await pinned_service.get_global_todo_stats()
+    assert fresh_stats.total == stats.total + 1
+
+
+async def test_update_todo(db_session):
     """
     Test updating a todo item.
 
@@ -121,17 +368,17 @@ def test_update_todo(db_session):
 
     # Create a user to associate with the todo
     user_in = UserCreate(name=USER_NAME, email=unique_email())
-    user = user_service.create_user(user_in)
+    user = await user_service.create_user(user_in)
 
     # Create a todo for the user
     todo_in = TodoCreate(title="Todo 1", description="First todo", done=False)
-    created_todo = todo_service.create_todo(todo_in, user.id)
+    created_todo = await todo_service.create_todo(todo_in, user.id)
 
     # Update the todo
     todo_update = TodoUpdate(
         title="Updated Todo", description="Updated description", done=True
     )
-    updated_todo = todo_service.update_todo(created_todo.id, todo_update, user.id)
+    updated_todo = await todo_service.update_todo(created_todo.id, todo_update, user.id)
 
     assert updated_todo.id == created_todo.id
     assert updated_todo.title == "Updated Todo"
@@ -139,7 +386,7 @@ def test_update_todo(db_session):
     assert updated_todo.done is True
 
 
-def test_delete_todo(db_session):
+async def test_delete_todo(db_session):
     """
     Test deleting a todo item.
 
@@ -155,24 +402,63 @@ def test_delete_todo(db_session):
 
     # Create a user to associate with the todo
     user_in = UserCreate(name=USER_NAME, email=unique_email())
-    user = user_service.create_user(user_in)
+    user = await user_service.create_user(user_in)
 
     # Create a todo for the user
     todo_in = TodoCreate(title="Todo 1", description="First todo", done=False)
-    created_todo = todo_service.create_todo(todo_in, user.id)
+    created_todo = await todo_service.create_todo(todo_in, user.id)
 
     # Delete the todo
-    response = todo_service.delete_todo(created_todo.id, user.id)
+    response = await todo_service.delete_todo(created_todo.id, user.id)
 
     assert response == {"detail": "Todo deleted successfully"}
 
     # Ensure the todo no longer exists
     with pytest.raises(Exception) as e:
-        todo_service.get_todo_by_id(created_todo.id, user.id)
+        await todo_service.get_todo_by_id(created_todo.id, user.id)
     assert "Todo not found" in str(e.value)
 
 
-def test_create_todo_failure(db_session, mocker):
+async def test_todo_mutations_use_a_single_statement(db_session, query_counter):
+    """
+    Test that creating and updating a todo item each cost one statement.
+
+    Args:
+        db_session: The database session fixture.
+        query_counter: The statement counter fixture.
+
+    Asserts:
+        - Each mutation sends a single statement to the database, plus the INSERT
+          of the tombstone of a deletion.
+        - An update can set `done` back to False.
+    """
+    user_service = UserService(db_session)
+    todo_service = TodoService(db_session)
+
+    user_in = UserCreate(name=USER_NAME, email=unique_email())
+    user = await user_service.create_user(user_in)
+
+    with query_counter() as create_counter:
+        todo = await todo_service.create_todo(
+            TodoCreate(title="Todo 1", done=True), user.id
+        )
+
+    with query_counter() as update_counter:
+        updated_todo = await todo_service.update_todo(
+            todo.id, TodoUpdate(done=False), user.id
+        )
+
+    with query_counter() as delete_counter:
+        await todo_service.delete_todo(todo.id, user.id)
+
+    assert updated_todo.title == "Todo 1"
+    assert updated_todo.done is False
+    assert create_counter.count == 1
+    assert update_counter.count == 1
+    assert delete_counter.count == 2
+
+
+async def test_create_todo_failure(db_session, mocker):
     """
     Test failure to create a todo item due to a simulated database error.
 
@@ -187,24 +473,24 @@ def test_create_todo_failure(db_session, mocker):
     todo_service = TodoService(db_session)
 
     user_in = UserCreate(name=USER_NAME, email=unique_email())
-    user = user_service.create_user(user_in)
+    user = await user_service.create_user(user_in)
 
     todo_in = TodoCreate(
         title="Test Todo", description="This is a test todo", done=False
     )
 
     mocker.patch.object(
-        db_session, "add", side_effect=SQLAlchemyError("Simulated database error")
+        db_session, "execute", side_effect=SQLAlchemyError("Simulated database error")
     )
 
     with pytest.raises(HTTPException) as exc_info:
-        todo_service.create_todo(todo_in, user.id)
+        await todo_service.create_todo(todo_in, user.id)
 
     assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
     assert "Error creating todo" in exc_info.value.detail
 
 
-def test_get_todo_not_found(db_session):
+async def test_get_todo_not_found(db_session):
     """
     Test retrieving a non-existent todo item.
 
@@ -218,18 +504,18 @@ def test_get_todo_not_found(db_session):
     todo_service = TodoService(db_session)
 
     user_in = UserCreate(name=USER_NAME, email=unique_email())
-    user = user_service.create_user(user_in)
+    user = await user_service.create_user(user_in)
 
     non_existent_todo_id = 999
 
     with pytest.raises(HTTPException) as exc_info:
-        todo_service.get_todo_by_id(non_existent_todo_id, user.id)
+        await todo_service.get_todo_by_id(non_existent_todo_id, user.id)
 
     assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
     assert exc_info.value.detail == "Todo not found"
 
 
-def test_update_todo_not_found(db_session):
+async def test_update_todo_not_found(db_session):
     """
     Test updating a non-existent todo item.
 
@@ -243,7 +529,7 @@ def test_update_todo_not_found(db_session):
     todo_service = TodoService(db_session)
 
     user_in = UserCreate(name=USER_NAME, email=unique_email())
-    user = user_service.create_user(user_in)
+    user = await user_service.create_user(user_in)
 
     non_existent_todo_id = 999
     todo_update = TodoUpdate(
@@ -251,13 +537,13 @@ def test_update_todo_not_found(db_session):
     )
 
     with pytest.raises(HTTPException) as exc_info:
-        todo_service.update_todo(non_existent_todo_id, todo_update, user.id)
+        await todo_service.update_todo(non_existent_todo_id, todo_update, user.id)
 
     assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
     assert exc_info.value.detail == "Todo not found"
 
 
-def test_delete_todo_not_found(db_session):
+async def test_delete_todo_not_found(db_session):
     """
     Test deleting a non-existent todo item.
 
@@ -271,12 +557,318 @@ def test_delete_todo_not_found(db_session):
     todo_service = TodoService(db_session)
 
     user_in = UserCreate(name=USER_NAME, email=unique_email())
-    user = user_service.create_user(user_in)
+    user = await user_service.create_user(user_in)
 
     non_existent_todo_id = 999
 
     with pytest.raises(HTTPException) as exc_info:
-        todo_service.delete_todo(non_existent_todo_id, user.id)
+        await todo_service.delete_todo(non_existent_todo_id, user.id)
 
     assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
     assert exc_info.value.detail == "Todo not found"
+
+
+async def test_create_todos_batch(db_session, query_counter):
+    """
+    Test creating several todo items for a user in one batch.
+
+    Args:
+        db_session: The database session fixture.
+        query_counter: The statement counter fixture.
+
+    Asserts:
+        - Every item is created, in request order, with a 201 status.
+        - The whole batch is inserted with a single statement (SQLite cannot order the
+          rows returned by a multi-row INSERT, so it gets one statement per item).
+    """
+    user_service = UserService(db_session)
+    todo_service = TodoService(db_session)
+
+    user_in = UserCreate(name=USER_NAME, email=unique_email())
+    user = await user_service.create_user(user_in)
+
+    batch_in = TodoBatchCreate(
+        items=[TodoCreate(title=f"Todo {index}") for index in range(5)]
+    )
+    with query_counter() as counter:
+        result = await todo_service.create_todos(batch_in, user.id)
+
+    assert counter.count == (5 if db_session.bind.dialect.name == "sqlite" else 1)
+    assert [item.index for item in result.items] == list(range(5))
+    assert all(item.status_code == status.HTTP_201_CREATED for item in result.items)
+    assert [item.todo.title for item in result.items] == [
+        f"Todo {index}" for index in range(5)
+    ]
+    assert all(item.todo.user_id == user.id for item in result.items)
+
+    todos = await todo_service.get_todo_by_user_id(user.id)
+    assert [todo.id for todo in todos.items] == [item.id for item in result.items]
+
+
+async def test_update_todos_batch(db_session, query_counter):
+    """
+    Test updating several todo items for a user in one batch.
+
+    Args:
+        db_session: The database session fixture.
+        query_counter: The statement counter fixture.
+
+    Asserts:
+        - Existing todos are updated with only the fields provided.
+        - Unknown and repeated ids are reported per item.
+        - The whole batch is updated with a single statement.
+    """
+    user_service = UserService(db_session)
+    todo_service = TodoService(db_session)
+
+    user_in = UserCreate(name=USER_NAME, email=unique_email())
+    user = await user_service.create_user(user_in)
+
+    created = await todo_service.create_todos(
+        TodoBatchCreate(
+            items=[
+                TodoCreate(title="Todo 1", description="First todo"),
+                TodoCreate(title="Todo 2", description="Second todo", done=True),
+            ]
+        ),
+        user.id,
+    )
+    first_id, second_id = (item.id for item in created.items)
+
+    batch_in = TodoBatchUpdate(
+        items=[
+            TodoBatchUpdateItem(id=first_id, title="Updated Todo 1"),
+            TodoBatchUpdateItem(id=999, title="Missing"),
+            TodoBatchUpdateItem(id=second_id, done=False),
+            TodoBatchUpdateItem(id=first_id, done=True),
+        ]
+    )
+    with query_counter() as counter:
+        result = await todo_service.update_todos(batch_in, user.id)
+
+    assert counter.count == 1
+    assert [item.status_code for item in result.items] == [
+        status.HTTP_200_OK,
+        status.HTTP_404_NOT_FOUND,
+        status.HTTP_200_OK,
+        status.HTTP_400_BAD_REQUEST,
+    ]
+    assert result.items[0].todo.title == "Updated Todo 1"
+    assert result.items[0].todo.description == "First todo"
+    assert result.items[0].todo.done is False
+    assert result.items[2].todo.title == "Todo 2"
+    assert result.items[2].todo.done is False
+    assert result.items[1].detail == "Todo not found"
+
+
+async def test_delete_todos_batch(db_session, query_counter):
+    """
+    Test deleting several todo items for a user in one batch.
+
+    Args:
+        db_session: The database session fixture.
+        query_counter: The statement counter fixture.
+
+    Asserts:
+        - Existing todos are deleted and unknown ids are reported per item.
+        - The whole batch is deleted with a single statement (plus its tombstones).
+        - The deleted todos no longer exist.
+    """
+    user_service = UserService(db_session)
+    todo_service = TodoService(db_session)
+
+    user_in = UserCreate(name=USER_NAME, email=unique_email())
+    user = await user_service.create_user(user_in)
+
+    created = await todo_service.create_todos(
+        TodoBatchCreate(items=[TodoCreate(title="Todo 1"), TodoCreate(title="Todo 2")]),
+        user.id,
+    )
+    first_id, second_id = (item.id for item in created.items)
+
+    batch_in = TodoBatchDelete(ids=[first_id, 999, second_id])
+    with query_counter() as counter:
+        result = await todo_service.delete_todos(batch_in, user.id)
+
+    # The DELETE and the INSERT of the tombstones of the change feed
+    assert counter.count == 2
+    assert [item.status_code for item in result.items] == [
+        status.HTTP_200_OK,
+        status.HTTP_404_NOT_FOUND,
+        status.HTTP_200_OK,
+    ]
+
+    todos = await todo_service.get_todo_by_user_id(user.id)
+    assert todos.items == []
+
+
+async def test_get_todo_changes(db_session):
+    """
+    Test the change feed of the todos of a user.
+
+    Args:
+        db_session: The database session fixture.
+
+    Asserts:
+        - A sync without a token returns all the todos of the user.
+        - A sync with the token of the previous one returns only the todos created,
+          updated or deleted since, oldest first, the deletions without the todo.
+        - A sync without new changes returns nothing and a token still usable.
+    """
+    user_service = UserService(db_session)
+    todo_service = TodoService(db_session)
+    user = await user_service.create_user(
+        UserCreate(name=USER_NAME, email=unique_email())
+    )
+    other_user = await user_service.create_user(
+        UserCreate(name=USER_NAME, email=unique_email())
+    )
+    first = await todo_service.create_todo(TodoCreate(title="Todo 1"), user.id)
+    second = await todo_service.create_todo(TodoCreate(title="Todo 2"), user.id)
+    await todo_service.create_todo(TodoCreate(title="Other"), other_user.id)
+
+    changes = await todo_service.get_todo_changes(user.id)
+    assert [change.id for change in changes.changes] == [first.id, second.id]
+    assert changes.has_more is False
+
+    await todo_service.update_todo(first.id, TodoUpdate(done=True), user.id)
+    await todo_service.delete_todo(second.id, user.id)
+    third = await todo_service.create_todo(TodoCreate(title="Todo 3"), user.id)
+
+    changes = await todo_service.get_todo_changes(user.id, changes.next_token)
+    assert [(change.id, change.deleted) for change in changes.changes] == [
+        (first.id, False),
+        (second.id, True),
+        (third.id, False),
+    ]
+    assert changes.changes[0].todo.done is True
+    assert changes.changes[1].todo is None
+
+    changes = await todo_service.get_todo_changes(user.id, changes.next_token)
+    assert changes.changes == []
+    changes = await todo_service.get_todo_changes(user.id, changes.next_token)
+    assert changes.changes == []
+
+
+async def test_get_todo_changes_pages(db_session):
+    """
+    Test the paging of a change feed with more changes than the limit.
+
+    Args:
+        db_session: The database session fixture.
+
+    Asserts:
+        - The changes are split in pages of `limit` changes, `has_more` telling
+          whether another call is needed, without missing or repeating a todo.
+    """
+    user_service = UserService(db_session)
+    todo_service = TodoService(db_session)
+    user = await user_service.create_user(
+        UserCreate(name=USER_NAME, email=unique_email())
+    )
+    created = await todo_service.create_todos(
+        TodoBatchCreate(items=[TodoCreate(title=f"Todo {i}") for i in range(5)]),
+        user.id,
+    )
+
+    ids, pages, token = [], [], None
+    while True:
+        changes = await todo_service.get_todo_changes(user.id, token, limit=2)
+        ids.extend(change.id for change in changes.changes)
+        pages.append(changes.has_more)
+        token = changes.next_token
+        if not changes.has_more:
+            break
+
+    assert ids == [item.id for item in created.items]
+    assert pages == [True, True, False]
+
+
+async def test_get_todo_changes_invalid_token(db_session):
+    """
+    Test the change feed with unusable tokens.
+
+    Args:
+        db_session: The database session fixture.
+
+    Asserts:
+        - A malformed token is a 400 Bad Request.
+        - A token older than the retention of the tombstones is a 410 Gone.
+        - A token with timezone-aware times is accepted (compared in UTC).
+    """
+    todo_service = TodoService(db_session)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await todo_service.get_todo_changes(1, "not-a-token")
+    assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+
+    token = encode_cursor(
+        changed_at=None,
+        id=None,
+        deleted=False,
+        synced_at=(
+            datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=40)
+        ).isoformat(),
+    )
+    with pytest.raises(HTTPException) as exc_info:
+        await todo_service.get_todo_changes(1, token, retention=timedelta(days=30))
+    assert exc_info.value.status_code == status.HTTP_410_GONE
+
+    bad_id = encode_cursor(
+        changed_at=datetime(2026, 1, 1).isoformat(),
+        id=True,
+        deleted=False,
+        synced_at=datetime(2026, 1, 1).isoformat(),
+    )
+    with pytest.raises(HTTPException) as exc_info:
+        await todo_service.get_todo_changes(1, bad_id)
+    assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+
+    # Timezone-aware times are compared in UTC
+    aware = encode_cursor(
+        changed_at=None,
+        id=None,
+        deleted=False,
+        synced_at=(datetime.now(timezone.utc) - timedelta(hours=1)).isoformat(),
+    )
+    changes = await todo_service.get_todo_changes(
+        1, aware, retention=timedelta(days=30)
+    )
+    assert changes.changes == []
+
+
+async def test_delete_expired_tombstones(db_session):
+    """
+    Test the deletion of the expired tombstones.
+
+    Args:
+        db_session: The database session fixture.
+
+    Asserts:
+        - Only the tombstones older than the retention are deleted.
+    """
+    user_service = UserService(db_session)
+    todo_service = TodoService(db_session)
+    user = await user_service.create_user(
+        UserCreate(name=USER_NAME, email=unique_email())
+    )
+    old = await todo_service.create_todo(TodoCreate(title="Old"), user.id)
+    recent = await todo_service.create_todo(TodoCreate(title="Recent"), user.id)
+    await todo_service.delete_todo(old.id, user.id)
+    await todo_service.delete_todo(recent.id, user.id)
+    await db_session.execute(
+        update(TodoTombstone)
+        .where(TodoTombstone.todo_id == old.id)
+        .values(
+            deleted_at=datetime.now(timezone.utc).replace(tzinfo=None)
+            - timedelta(days=40)
+        )
+    )
+    await db_session.commit()
+
+    await delete_expired_tombstones(db_session, timedelta(days=30))
+
+    deleted = await db_session.scalars(
+        select(TodoTombstone.todo_id).where(TodoTombstone.user_id == user.id)
+    )
+    assert deleted.all() == [recent.id]
@@ -4,7 +4,6 @@ from fastapi import HTTPException, status
 from sqlalchemy.exc import SQLAlchemyError
 from app.api.todos.schemas import TodoCreate
 from app.api.todos.services import TodoService
-from app.api.users.models import User as UserModel
 from app.api.users.schemas import UserCreate, UserUpdate
 from app.api.users.services import UserService
 from app.utils.common import unique_email
@@ -13,7 +12,7 @@ from app.utils.common import unique_email
 USER = "Pancho Mancho"
 
 
-def test_create_user(db_session):
+async def test_create_user(db_session):
     """
     Test the creation of a user.
 
@@ -28,14 +27,14 @@ def test_create_user(db_session):
     user_service = UserService(db_session)
     email = unique_email()
     user_in = UserCreate(name=USER, email=email)
-    user = user_service.create_user(user_in)
+    user = await user_service.create_user(user_in)
 
     assert user.id is not None
     assert user.name == USER
     assert user.email == email
 
 
-def test_get_user(db_session):
+async def test_get_user(db_session):
     """
     Test retrieving a user by ID.
 
@@ -51,9 +50,9 @@ def test_get_user(db_session):
     user_service = UserService(db_session)
     email = unique_email()
     user_in = UserCreate(name=USER, email=email)
-    user = user_service.create_user(user_in)
+    user = await user_service.create_user(user_in)
 
-    retrieved_user = user_service.get_user(user.id)
+    retrieved_user = await user_service.get_user(user.id)
 
     assert retrieved_user.id == user.id
     assert retrieved_user.name == USER
@@ -61,7 +60,7 @@ def test_get_user(db_session):
     assert retrieved_user.todos == []
 
 
-def test_create_todo_for_user(db_session):
+async def test_create_todo_for_user(db_session):
     """
     Test creating a todo for a user.
 
@@ -81,12 +80,12 @@ def test_create_todo_for_user(db_session):
     email = unique_email()
 
     user_in = UserCreate(name=USER, email=email)
-    user = user_service.create_user(user_in)
+    user = await user_service.create_user(user_in)
 
     todo_in = TodoCreate(
         title="Test Todo", description="This is a test todo", done=False
     )
-    todo = todo_service.create_todo(todo_in, user.id)
+    todo = await todo_service.create_todo(todo_in, user.id)
 
     assert todo.id is not None
     assert todo.title == "Test Todo"
@@ -95,7 +94,7 @@ def test_create_todo_for_user(db_session):
     assert todo.user_id == user.id
 
 
-def test_get_user_with_todos(db_session):
+async def test_get_user_with_todos(db_session):
     """
     Test retrieving a user with todos.
 
@@ -113,15 +112,15 @@ def test_get_user_with_todos(db_session):
     email = unique_email()
 
     user_in = UserCreate(name=USER, email=email)
-    user = user_service.create_user(user_in)
+    user = await user_service.create_user(user_in)
 
     todo_in = TodoCreate(title="Todo 1", description="First todo", done=False)
-    todo_service.create_todo(todo_in, user.id)
+    await todo_service.create_todo(todo_in, user.id)
 
     todo_in = TodoCreate(title="Todo 2", description="Second todo", done=False)
-    todo_service.create_todo(todo_in, user.id)
+    await todo_service.create_todo(todo_in, user.id)
 
-    retrieved_user = user_service.get_user(user.id)
+    retrieved_user = await user_service.get_user(user.id)
 
     assert retrieved_user.id == user.id
     assert len(retrieved_user.todos) == 2
@@ -129,7 +128,64 @@ def test_get_user_with_todos(db_session):
     assert retrieved_user.todos[1].title == "Todo 2"
 
 
-def test_create_user_failure(db_session, mocker):
+async def test_update_user(db_session, query_counter):
+    """
+    Test updating a user.
+
+    Args:
+        db_session: The database session.
+        query_counter: The statement counter fixture.
+
+    Asserts:
+        - Only the provided fields are updated.
+        - The todos of the user are returned with it.
+        - The update costs the UPDATE ... RETURNING and the todos query.
+    """
+    user_service = UserService(db_session)
+    todo_service = TodoService(db_session)
+
+    email = unique_email()
+    user = await user_service.create_user(UserCreate(name=USER, email=email))
+    await todo_service.create_todo(TodoCreate(title="Todo 1"), user.id)
+
+    with query_counter() as counter:
+        updated_user = await user_service.update_user(
+            user.id, UserUpdate(name="Updated User")
+        )
+
+    assert updated_user.name == "Updated User"
+    assert updated_user.email == email
+    assert [todo.title for todo in updated_user.todos] == ["Todo 1"]
+    assert counter.count == 2
+
+
+async def test_delete_user_with_todos(db_session):
+    """
+    Test deleting a user that has todos.
+
+    Args:
+        db_session: The database session.
+
+    Asserts:
+        - The response indicates successful deletion.
+        - The user and its todos no longer exist.
+    """
+    user_service = UserService(db_session)
+    todo_service = TodoService(db_session)
+
+    user = await user_service.create_user(UserCreate(name=USER, email=unique_email()))
+    await todo_service.create_todo(TodoCreate(title="Todo 1"), user.id)
+
+    response = await user_service.delete_user(user.id)
+
+    assert response == {"detail": "User deleted successfully"}
+    with pytest.raises(HTTPException):
+        await user_service.get_user(user.id)
+    todos = await todo_service.get_todo_by_user_id(user.id)
+    assert todos.items == []
+
+
+async def test_create_user_failure(db_session, mocker):
     """
     Test user creation failure due to a simulated database error.
 
@@ -145,20 +201,20 @@ def test_create_user_failure(db_session, mocker):
     email = unique_email()
     user_in = UserCreate(name=USER, email=email)
 
-    # Simulate an exception when adding a user
+    # Simulate an exception when inserting a user
     mocker.patch.object(
-        db_session, "add", side_effect=SQLAlchemyError("Simulated database error")
+        db_session, "execute", side_effect=SQLAlchemyError("Simulated database error")
     )
 
     # Act & Assert
     with pytest.raises(HTTPException) as exc_info:
-        user_service.create_user(user_in)
+        await user_service.create_user(user_in)
 
     assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
     assert "Error creating user" in exc_info.value.detail
 
 
-def test_get_user_not_found(db_session):
+async def test_get_user_not_found(db_session):
     """
     Test retrieving a user that does not exist.
 
@@ -172,18 +228,15 @@ def test_get_user_not_found(db_session):
     user_service = UserService(db_session)
     user_id = 999
 
-    # Simulate user not found
-    db_session.query(UserModel).filter().first = None
-
     # Act & Assert
     with pytest.raises(HTTPException) as exc_info:
-        user_service.get_user(user_id)
+        await user_service.get_user(user_id)
 
     assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
     assert exc_info.value.detail == "User not found"
 
 
-def test_update_user_not_found(db_session):
+async def test_update_user_not_found(db_session):
     """
     Test updating a user that does not exist.
 
@@ -199,18 +252,15 @@ def test_update_user_not_found(db_session):
     email = unique_email()
     user_in = UserUpdate(name=USER, email=email)
 
-    # Simulate user not found
-    db_session.query(UserModel).filter().first = None
-
     # Act & Assert
     with pytest.raises(HTTPException) as exc_info:
-        user_service.update_user(user_id, user_in)
+        await user_service.update_user(user_id, user_in)
 
     assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
     assert exc_info.value.detail == "User not found"
 
 
-def test_delete_user_not_found(db_session):
+async def test_delete_user_not_found(db_session):
     """
     Test deleting a user that does not exist.
 
@@ -224,12 +274,98 @@ def test_delete_user_not_found(db_session):
     user_service = UserService(db_session)
     user_id = 999
 
-    # Simulate user not found
-    db_session.query(UserModel).filter().first = None
-
     # Act & Assert
     with pytest.raises(HTTPException) as exc_info:
-        user_service.delete_user(user_id)
+        await user_service.delete_user(user_id)
 
     assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
     assert exc_info.value.detail == "User not found"
+
+
+async def test_get_users_paginated(db_session):
+    """
+    Test paging through all users with a cursor.
+
+    Args:
+        db_session: The database session.
+
+    Asserts:
+        - Every user is returned exactly once across the pages, in id order.
+        - A page is never larger than the requested limit.
+    """
+    user_service = UserService(db_session)
+
+    for _ in range(3):
+        await user_service.create_user(UserCreate(name=USER, email=unique_email()))
+
+    ids = []
+    cursor = None
+    while True:
+        page = await user_service.get_users(cursor=cursor, limit=2)
+        assert len(page.items) <= 2
+        ids.extend(user.id for user in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert len(ids) >= 3
+    assert ids == sorted(set(ids))
+
+
+async def test_get_users_query_count_is_constant(db_session, query_counter):
+    """
+    Test that listing users does not lazy load the todos of every user.
+
+    Args:
+        db_session: The database session.
+        query_counter: The statement counter fixture.
+
+    Asserts:
+        - Listing one user and listing several users with todos each cost the
+          same number of statements (users + one batched todos query).
+    """
+    user_service = UserService(db_session)
+    todo_service = TodoService(db_session)
+
+    for _ in range(5):
+        user = await user_service.create_user(
+            UserCreate(name=USER, email=unique_email())
+        )
+        for title in ("Todo 1", "Todo 2"):
+            await todo_service.create_todo(TodoCreate(title=title), user.id)
+
+    with query_counter() as single_page:
+        users = await user_service.get_users(limit=1)
+    assert len(users.items) == 1
+
+    with query_counter() as full_page:
+        users = await user_service.get_users(limit=5)
+    assert len(users.items) == 5
+
+    assert single_page.count == 2
+    assert full_page.count == single_page.count
+
+
+async def test_get_user_query_count(db_session, query_counter):
+    """
+    Test that retrieving a user loads its todos in a single batched statement.
+
+    Args:
+        db_session: The database session.
+        query_counter: The statement counter fixture.
+
+    Asserts:
+        - The user and its todos are loaded with two statements.
+    """
+    user_service = UserService(db_session)
+    todo_service = TodoService(db_session)
+
+    user = await user_service.create_user(UserCreate(name=USER, email=unique_email()))
+    for title in ("Todo 1", "Todo 2", "Todo 3"):
+        await todo_service.create_todo(TodoCreate(title=title), user.id)
+
+    with query_counter() as counter:
+        retrieved_user = await user_service.get_user(user.id)
+
+    assert len(retrieved_user.todos) == 3
+    assert counter.count == 2